@@ -0,0 +1,32 @@
+from database.connection import pg_engine
+from sqlalchemy import text
+import logging
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def add_column():
+    if not pg_engine:
+        logger.error("No PostgreSQL engine available.")
+        return
+
+    with pg_engine.connect() as conn:
+        try:
+            check_query = text("SELECT column_name FROM information_schema.columns WHERE table_name='sync_watermarks' AND column_name='signature';")
+            result = conn.execute(check_query).fetchone()
+            
+            if not result:
+                logger.info("Adding signature column to sync_watermarks table...")
+                conn.execute(text("ALTER TABLE sync_watermarks ADD COLUMN signature TEXT;"))
+                conn.commit()
+                # Without a signature the next sales sync reloads the whole history (off-peak)
+                logger.info("Column added successfully.")
+            else:
+                logger.info("Column signature already exists.")
+                
+        except Exception as e:
+            logger.error(f"Error adding column: {e}")
+
+if __name__ == "__main__":
+    add_column()
@@ -0,0 +1,78 @@
+"""
+Benchmark du temps d'import au démarrage.
+
+Lance un interpréteur neuf avec -X importtime pour chaque module de
+démarrage, plusieurs fois, et affiche la médiane du temps cumulé, les
+modules les plus lourds et les dépendances lourdes chargées trop tôt.
+
+Usage: python benchmark_imports.py [--runs 5] [--top 15] [module ...]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+# Modules imported before the main window shows (see main.py)
+STARTUP_MODULES = ['ui.main_window', 'database.connection', 'database.cache', 'ui.inventory_widget']
+# Should only be imported on first use or by the background warm-up
+HEAVY_MODULES = ['pandas', 'numpy', 'pyodbc', 'reportlab', 'pyttsx3', 'openpyxl']
+
+
+def import_times(module):
+    """{module: cumulative microseconds} for one fresh 'import module'."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"import {module} failed")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+def benchmark(module, runs, top):
+    totals = []
+    last = {}
+    for _ in range(runs):
+        last = import_times(module)
+        totals.append(last.get(module, 0))
+
+    print(f"\n=== {module} ===")
+    print(f"Temps d'import (médiane sur {runs}): {statistics.median(totals) / 1000:.1f} ms "
+          f"(min {min(totals) / 1000:.1f}, max {max(totals) / 1000:.1f})")
+
+    heavy = [name for name in HEAVY_MODULES if name in last]
+    print("Dépendances lourdes chargées: " + (", ".join(heavy) if heavy else "aucune"))
+
+    print(f"Top {top} (cumulé, dernier passage):")
+    for name, us in sorted(last.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+    return statistics.median(totals)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du temps d'import au démarrage")
+    parser.add_argument('modules', nargs='*', default=STARTUP_MODULES)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    medians = {}
+    for module in args.modules:
+        try:
+            medians[module] = benchmark(module, args.runs, args.top)
+        except RuntimeError as e:
+            print(f"\n=== {module} ===\nErreur: {e}")
+
+    if medians:
+        print("\n=== Résumé (médianes) ===")
+        for module, median in medians.items():
+            print(f"  {median / 1000:8.1f} ms  {module}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Micro-benchmark du codec des codes-barres d'emplacement (utils/location_codec).
+
+Vérifie d'abord que le codec donne les mêmes résultats que l'ancienne
+implémentation (regex + branches) sur tout l'espace des labels, puis compare
+les temps d'encodage/décodage unitaires et par lot.
+
+Usage: python benchmark_location_codec.py [--repeat 5] [--size 100000]
+"""
+import argparse
+import random
+import re
+import timeit
+
+from utils import location_codec
+
+
+# -- previous implementation of utils/barcode_utils, kept as the baseline ----
+
+def legacy_parse(barcode):
+    if not (barcode.startswith("000") and len(barcode) == 7 and barcode.isdigit()):
+        return None
+    xx = int(barcode[3:5])
+    yy = int(barcode[5:7])
+    special = {27: "DD", 28: "II", 29: "JJ", 30: "KK"}
+    letter_part = special.get(xx) or chr(xx + 64)
+    return f"{letter_part}{yy}"
+
+def legacy_generate(label):
+    match = re.match(r"([A-Z]+)(\d+)", label)
+    if not match:
+        return None
+    letters = match.group(1)
+    numbers = int(match.group(2))
+    special = {"DD": 27, "II": 28, "JJ": 29, "KK": 30}
+    if letters in special:
+        xx = special[letters]
+    elif len(letters) == 1:
+        xx = ord(letters) - 64
+    else:
+        return None
+    return f"000{xx:02d}{numbers:02d}"
+
+
+def check():
+    labels = location_codec.all_labels()
+    barcodes = location_codec.encode_many(labels)
+    errors = 0
+    for label, barcode in zip(labels, barcodes):
+        if barcode != legacy_generate(label) or location_codec.decode(barcode) != legacy_parse(barcode):
+            errors += 1
+    if location_codec.decode_many(barcodes) != labels:
+        errors += 1
+
+    # Invalid labels and barcodes (the old code accepted several of them)
+    rejected = ["A0", "A100", "AB1", "a1", " A1", "A1 ", "0000001", "0003101", "0000100", "000010", "00001011"]
+    for value in rejected:
+        if location_codec.encode(value) is not None or location_codec.decode(value) is not None:
+            print(f"  accepté à tort: {value!r}")
+            errors += 1
+
+    print(f"Vérification: {len(labels)} labels, {errors} erreur(s)")
+    return errors == 0
+
+def bench(name, func, repeat):
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    print(f"  {name:<40} {best * 1000:9.2f} ms")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark du codec des emplacements")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--size', type=int, default=100000)
+    args = parser.parse_args()
+
+    if not check():
+        raise SystemExit(1)
+
+    rng = random.Random(0)
+    labels = rng.choices(location_codec.all_labels(), k=args.size)
+    barcodes = location_codec.encode_many(labels)
+
+    print(f"\nEncodage de {args.size} labels (meilleur de {args.repeat}):")
+    old = bench("ancien (regex, un par un)", lambda: [legacy_generate(l) for l in labels], args.repeat)
+    new = bench("codec.encode (un par un)", lambda: [location_codec.encode(l) for l in labels], args.repeat)
+    batch = bench("codec.encode_many", lambda: location_codec.encode_many(labels), args.repeat)
+    print(f"  gain: x{old / new:.1f} unitaire, x{old / batch:.1f} par lot")
+
+    print(f"\nDécodage de {args.size} codes-barres (meilleur de {args.repeat}):")
+    old = bench("ancien (branches, un par un)", lambda: [legacy_parse(b) for b in barcodes], args.repeat)
+    new = bench("codec.decode (un par un)", lambda: [location_codec.decode(b) for b in barcodes], args.repeat)
+    batch = bench("codec.decode_many", lambda: location_codec.decode_many(barcodes), args.repeat)
+    print(f"  gain: x{old / new:.1f} unitaire, x{old / batch:.1f} par lot")
+
+if __name__ == "__main__":
+    main()
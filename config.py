@@ -23,6 +23,29 @@ class Config:
     SQL_PASSWORD = os.getenv("SQL_PASSWORD") or "ounmadhr"
     SQL_DRIVER = os.getenv("SQL_DRIVER") or "ODBC Driver 17 for SQL Server"
 
+    # Sales warehouse (server mode ETL)
+    SALES_SYNC_INTERVAL_MIN = int(os.getenv("SALES_SYNC_INTERVAL_MIN") or 30)
+    SALES_HISTORY_START = os.getenv("SALES_HISTORY_START") or "2020-01-01"
+    SALES_RELOAD_DAYS = int(os.getenv("SALES_RELOAD_DAYS") or 2) # Days re-aggregated on each run (late validations)
+
+    # Background synchronization (server mode scheduler)
+    SYNC_NOMENCLATURE_INTERVAL_MIN = int(os.getenv("SYNC_NOMENCLATURE_INTERVAL_MIN") or 360)
+    SYNC_CACHE_INTERVAL_MIN = int(os.getenv("SYNC_CACHE_INTERVAL_MIN") or 120)
+    SYNC_INVOICES_INTERVAL_MIN = int(os.getenv("SYNC_INVOICES_INTERVAL_MIN") or 15)
+    SYNC_OFF_PEAK_START = os.getenv("SYNC_OFF_PEAK_START") or "20:00" # Heavy tasks only run between these hours
+    SYNC_OFF_PEAK_END = os.getenv("SYNC_OFF_PEAK_END") or "08:00"
+    SYNC_JITTER_PCT = int(os.getenv("SYNC_JITTER_PCT") or 10) # Random spread of the intervals
+
+    # Near-expiry alerts (server mode scheduler)
+    EXPIRY_ALERT_INTERVAL_MIN = int(os.getenv("EXPIRY_ALERT_INTERVAL_MIN") or 720)
+    EXPIRY_ALERT_DAYS = int(os.getenv("EXPIRY_ALERT_DAYS") or 90) # Lots expiring within this many days are notified
+    EXPIRY_URGENT_DAYS = int(os.getenv("EXPIRY_URGENT_DAYS") or 30) # ... as urgent within this many days
+
+    # Supply list walking order (utils/pick_route.py)
+    PICK_ROUTE_AISLES = os.getenv("PICK_ROUTE_AISLES") or "" # Rows sharing an aisle, in walking order: "A,B;C,D;..." (unlisted rows: one aisle each)
+    PICK_ROUTE_AISLE_SPACING = float(os.getenv("PICK_ROUTE_AISLE_SPACING") or 2.0) # Meters between two aisles
+    PICK_ROUTE_FLOOR_SPACING = float(os.getenv("PICK_ROUTE_FLOOR_SPACING") or 0.5) # Meters between two floors of a row
+
     @property
     def POSTGRES_URI(self):
         return f"postgresql://{self.PG_USER}:{self.PG_PASSWORD}@{self.PG_HOST}:{self.PG_PORT}/{self.PG_DB}"
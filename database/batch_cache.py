@@ -0,0 +1,145 @@
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BatchFetchThread(QThread):
+    """Runs fetch(keys) off the GUI thread."""
+    loaded = pyqtSignal(object, object) # requested keys, dict key -> value (None on failure)
+
+    def __init__(self, fetch, keys):
+        super().__init__()
+        self.fetch = fetch
+        self.keys = keys
+
+    def run(self):
+        values = None
+        try:
+            values = self.fetch(self.keys)
+        except Exception as e:
+            logger.error(f"Batch fetch error: {e}")
+        self.loaded.emit(self.keys, values)
+
+
+class BatchCache(QObject):
+    """
+    Per-key cache of values fetched from XpertPharm several keys at a time.
+
+    Keys not cached are queued and fetched in one background batch (fetch()
+    is overridden by subclasses and returns a dict, or None when XpertPharm is
+    unreachable). Entries expire after ttl seconds. With refresh_interval_ms,
+    the keys prefetched within the last watch_window seconds are re-fetched
+    before they expire, so widgets showing them stay current without a miss.
+    Only prefetch() (a list loaded or shown) watches keys: get() is also
+    used to repaint after each load and must not keep them watched forever.
+    """
+    loaded = pyqtSignal(object) # set of keys now in the cache
+    failed = pyqtSignal(object) # set of keys that could not be loaded
+
+    def __init__(self, ttl, max_entries, refresh_interval_ms=None, watch_window=300):
+        super().__init__()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.watch_window = watch_window
+        self._cache = {}        # key -> (expires_at, value)
+        self._watched = {}      # key -> last time it was read or requested
+        self._queued = []       # keys waiting for the running fetch to finish
+        self._in_flight = set()
+        self._thread = None
+
+        self._refresh_timer = None
+        if refresh_interval_ms:
+            self._refresh_timer = QTimer(self)
+            self._refresh_timer.timeout.connect(self.refresh_watched)
+            self._refresh_timer.start(refresh_interval_ms)
+
+    def fetch(self, keys):
+        """dict key -> value for keys (runs in a worker thread). None on failure."""
+        raise NotImplementedError
+
+    def default(self, key):
+        """Value cached for a requested key absent from the fetch result."""
+        return None
+
+    def get(self, key):
+        """Cached value of key, None if unknown or expired."""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._cache[key]
+            return None
+        return entry[1]
+
+    def prefetch(self, keys, priority=False):
+        """
+        Loads in the background the keys not cached yet. With priority, they go
+        before those already queued (e.g. the row the user is looking at).
+        """
+        keys = [k for k in dict.fromkeys(keys) if k]
+        if self._refresh_timer is not None:
+            now = time.monotonic()
+            for key in keys:
+                self._watched[key] = now
+        self._enqueue([k for k in keys if k not in self._in_flight and self.get(k) is None], priority)
+
+    def unwatch(self, keys):
+        """Stops refreshing keys in the background (e.g. their widget was hidden)."""
+        for key in keys:
+            self._watched.pop(key, None)
+
+    def invalidate(self, keys=None):
+        if keys is None:
+            self._cache.clear()
+        else:
+            for key in keys:
+                self._cache.pop(key, None)
+
+    def refresh_watched(self):
+        """Re-fetches the recently used keys that expire before the next refresh."""
+        now = time.monotonic()
+        horizon = now + self._refresh_timer.interval() / 1000
+        for key in [k for k, seen in self._watched.items() if seen < now - self.watch_window]:
+            del self._watched[key]
+        due = [k for k in self._watched
+               if k in self._cache and self._cache[k][0] <= horizon and k not in self._in_flight]
+        self._enqueue(due, priority=False)
+
+    def _enqueue(self, keys, priority):
+        if not keys:
+            return
+        new_keys = set(keys)
+        queued = [k for k in self._queued if k not in new_keys]
+        self._queued = keys + queued if priority else queued + keys
+        self._start_next()
+
+    def _start_next(self):
+        if self._thread is not None or not self._queued:
+            return
+        keys, self._queued = self._queued, []
+        self._in_flight = set(keys)
+        self._thread = BatchFetchThread(self.fetch, keys)
+        self._thread.loaded.connect(self._on_loaded)
+        self._thread.finished.connect(self._on_finished)
+        self._thread.start()
+
+    def _on_loaded(self, keys, values):
+        if values is None:
+            # XpertPharm unreachable: nothing cached, a later request retries
+            self.failed.emit(set(keys))
+            return
+        expires_at = time.monotonic() + self.ttl
+        for key in keys:
+            self._cache[key] = (expires_at, values[key] if key in values else self.default(key))
+        if len(self._cache) > self.max_entries:
+            for key in sorted(self._cache, key=lambda k: self._cache[k][0])[:len(self._cache) - self.max_entries]:
+                del self._cache[key]
+        self.loaded.emit(set(keys))
+
+    def _on_finished(self):
+        self._thread.deleteLater()
+        self._thread = None
+        self._in_flight = set()
+        self._start_next()
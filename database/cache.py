@@ -1,29 +1,35 @@
 from PyQt6.QtCore import QObject, pyqtSignal, QThread
-import pandas as pd
+from utils.lazy_import import lazy_import
 from database.connection import get_all_products_from_xpertpharm
 import logging
 
+pd = lazy_import('pandas')
+
 logger = logging.getLogger(__name__)
 
+def fetch_products_dataframe(progress=None):
+    """
+    Loads the XpertPharm product list as a DataFrame (empty on error). Blocking.
+    progress(rows_read, total) is called after each fetched batch.
+    """
+    try:
+        # Columnar fetch: arrays are filled from the cursor batches, no row objects
+        result = get_all_products_from_xpertpharm(columnar=True, progress=progress)
+        if result is not None and len(result):
+            df = result.to_dataframe()
+            # Ensure columns are what we expect
+            if 'CODE_PRODUIT' in df.columns and 'designation' in df.columns:
+                return df
+            logger.error("Cache loader: Missing columns in data")
+    except Exception as e:
+        logger.error(f"Cache loader error: {e}")
+    return pd.DataFrame()
+
 class CacheLoaderThread(QThread):
     loaded = pyqtSignal(object) # Emits DataFrame
 
     def run(self):
-        try:
-            data = get_all_products_from_xpertpharm()
-            if data:
-                df = pd.DataFrame(data)
-                # Ensure columns are what we expect
-                if 'CODE_PRODUIT' in df.columns and 'designation' in df.columns:
-                    self.loaded.emit(df)
-                else:
-                    logger.error("Cache loader: Missing columns in data")
-                    self.loaded.emit(pd.DataFrame())
-            else:
-                self.loaded.emit(pd.DataFrame())
-        except Exception as e:
-            logger.error(f"Cache loader error: {e}")
-            self.loaded.emit(pd.DataFrame())
+        self.loaded.emit(fetch_products_dataframe())
 
 class ProductCache(QObject):
     _instance = None
@@ -37,10 +43,16 @@ class ProductCache(QObject):
 
     def __init__(self):
         super().__init__()
-        self.products_df = pd.DataFrame()
+        self._products_df = None  # pandas is only imported once products are needed
         self.is_loading = False
         self._loader_thread = None
 
+    @property
+    def products_df(self):
+        if self._products_df is None:
+            self._products_df = pd.DataFrame()
+        return self._products_df
+
     def load_cache(self):
         if self.is_loading:
             return
@@ -56,8 +68,15 @@ class ProductCache(QObject):
         self.load_cache()
 
     def _on_cache_loaded(self, df):
-        self.products_df = df
         self.is_loading = False
+        self.set_products(df)
+
+    def set_products(self, df):
+        """Replaces the cached products (e.g. with a DataFrame loaded by the sync scheduler)."""
+        if df.empty and not self.products_df.empty:
+            logger.warning("Product cache reload returned no data, keeping the previous products.")
+            return
+        self._products_df = df
         logger.info(f"Product cache loaded. {len(self.products_df)} products.")
         self.cache_updated.emit()
 
@@ -0,0 +1,148 @@
+import decimal
+import logging
+from database.streaming import FETCH_CHUNK
+from utils.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+
+logger = logging.getLogger(__name__)
+
+
+def _numeric_dtype(python_type):
+    """NumPy dtype for the Python type pyodbc reports in cursor.description (None: object)."""
+    return {
+        int: np.int64,
+        bool: np.bool_,
+        float: np.float64,
+        decimal.Decimal: np.float64,
+    }.get(python_type)
+
+
+class ColumnarResult:
+    """
+    Query result stored column by column in NumPy arrays.
+    Categorical columns hold int32 codes into a list of distinct values
+    (-1 = NULL), which keeps repeated strings (designations, month names,
+    user names) stored once.
+    """
+
+    def __init__(self, columns, arrays, categories):
+        self.columns = columns
+        self.arrays = arrays          # name -> ndarray (codes for categorical columns)
+        self.categories = categories  # name -> list of distinct values
+
+    def __len__(self):
+        return len(self.arrays[self.columns[0]]) if self.columns else 0
+
+    def is_categorical(self, name):
+        return name in self.categories
+
+    def codes(self, name):
+        return self.arrays[name]
+
+    def column(self, name):
+        """Decoded values of a column."""
+        values = self.arrays[name]
+        if name not in self.categories:
+            return values
+        lookup = np.empty(len(self.categories[name]) + 1, dtype=object)
+        lookup[:-1] = self.categories[name]
+        lookup[-1] = None
+        return lookup[values]  # -1 picks the trailing None
+
+    def to_dataframe(self):
+        import pandas as pd
+        data = {}
+        for name in self.columns:
+            if name in self.categories:
+                data[name] = pd.Categorical.from_codes(self.arrays[name], categories=self.categories[name])
+            else:
+                data[name] = self.arrays[name]
+        return pd.DataFrame(data, columns=self.columns)
+
+    def to_arrow(self):
+        """pyarrow Table (optional dependency), categorical columns become dictionary arrays."""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("pyarrow n'est pas installé (pip install pyarrow).")
+        arrays = []
+        for name in self.columns:
+            if name in self.categories:
+                codes = pa.array(self.arrays[name], mask=self.arrays[name] < 0)
+                arrays.append(pa.DictionaryArray.from_arrays(codes, pa.array(self.categories[name])))
+            else:
+                arrays.append(pa.array(self.arrays[name]))
+        return pa.Table.from_arrays(arrays, names=self.columns)
+
+
+class _CategoricalBuilder:
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def encode(self, column):
+        index = self.index
+        values = self.values
+        codes = np.empty(len(column), dtype=np.int32)
+        for i, value in enumerate(column):
+            if value is None:
+                codes[i] = -1
+                continue
+            code = index.get(value)
+            if code is None:
+                code = index[value] = len(values)
+                values.append(value)
+            codes[i] = code
+        return codes
+
+
+def _to_array(column, dtype):
+    if dtype is not None:
+        if None not in column:
+            return np.array(column, dtype=dtype)
+        if dtype is not np.bool_:
+            # NULLs in numeric columns become NaN
+            return np.array([np.nan if v is None else v for v in column], dtype=np.float64)
+    array = np.empty(len(column), dtype=object)
+    array[:] = column
+    return array
+
+
+def fetch_columnar(cursor, categorical=(), size=FETCH_CHUNK, on_batch=None):
+    """
+    Reads an executed cursor in fetchmany batches straight into per-column
+    NumPy arrays (no per-row dict or tuple list is kept).
+    categorical: column names to dictionary-encode.
+    on_batch: called with the number of rows read so far after each batch.
+    """
+    columns = [column[0] for column in cursor.description]
+    dtypes = [_numeric_dtype(column[1]) for column in cursor.description]
+    builders = {name: _CategoricalBuilder() for name in columns if name in categorical}
+    parts = {name: [] for name in columns}
+
+    count = 0
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            break
+        count += len(rows)
+        for name, dtype, values in zip(columns, dtypes, zip(*rows)):
+            if name in builders:
+                parts[name].append(builders[name].encode(values))
+            else:
+                parts[name].append(_to_array(values, dtype))
+        if on_batch is not None:
+            on_batch(count)
+
+    arrays = {}
+    for name, dtype in zip(columns, dtypes):
+        if parts[name]:
+            arrays[name] = np.concatenate(parts[name]) if len(parts[name]) > 1 else parts[name][0]
+        elif name in builders:
+            arrays[name] = np.empty(0, dtype=np.int32)
+        else:
+            arrays[name] = np.empty(0, dtype=dtype or object)
+
+    categories = {name: builder.values for name, builder in builders.items()}
+    return ColumnarResult(columns, arrays, categories)
@@ -1,10 +1,13 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from .models import Base
+from . import expiry_index  # Keeps expiry_summary in sync with every product flush
 from config import config
-import pyodbc
+from utils.lazy_import import lazy_import
 import logging
 
+pyodbc = lazy_import('pyodbc')
+
 # Setup Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -102,10 +105,17 @@ def auto_import_locations():
                 return
             
             # Import locations
+            from utils import location_codec
+            labels = [str(label).strip() for label in df['label']]
+            barcodes = [str(barcode).strip() if pd.notna(barcode) else '' for barcode in df['barcode']]
+            expected = location_codec.encode_many(labels)
+            
             imported_count = 0
-            for _, row in df.iterrows():
-                label = str(row['label']).strip()
-                barcode = str(row['barcode']).strip() if pd.notna(row['barcode']) else ''
+            for label, barcode, expected_barcode in zip(labels, barcodes, expected):
+                if not barcode and expected_barcode:
+                    barcode = expected_barcode
+                elif expected_barcode and barcode != expected_barcode:
+                    logger.warning(f"Auto-import: barcode {barcode} of '{label}' differs from the standard {expected_barcode}.")
                 
                 if label:  # Only import if label is not empty
                     location = Location(label=label, barcode=barcode)
@@ -198,6 +208,45 @@ def get_lots_by_product_code(product_code):
     finally:
         conn.close()
 
+def get_lots_by_product_codes(product_codes, batch_size=500):
+    """
+    Lots in stock of several products, one IN query per batch_size codes on a
+    single connection (same columns as get_lots_by_product_code).
+    Returns a dict CODE_PRODUIT -> list of lots sorted by expiry date, None if
+    XpertPharm cannot be reached.
+    """
+    product_codes = list(dict.fromkeys(c for c in product_codes if c))
+    if not product_codes:
+        return {}
+
+    conn = get_xpertpharm_connection()
+    if not conn:
+        return None
+    
+    try:
+        cursor = conn.cursor()
+        results = {code: [] for code in product_codes}
+        for i in range(0, len(product_codes), batch_size):
+            batch = product_codes[i:i + batch_size]
+            placeholders = ", ".join("?" for _ in batch)
+            query = f"""
+            SELECT ST.[CODE_PRODUIT], ST.[QUANTITE], ST.[CODE_BARRE_LOT], ST.[DATE_PEREMPTION], ST.[CREATED_ON] as DATE_ACHAT
+            FROM [XPERTPHARM5_7091_BOURENANE].[dbo].[STK_STOCK] ST
+            WHERE ST.[CODE_PRODUIT] IN ({placeholders}) AND ST.[QUANTITE] > 0
+            ORDER BY ST.[CODE_PRODUIT], ST.[DATE_PEREMPTION] ASC
+            """
+            cursor.execute(query, *batch)
+            columns = [column[0] for column in cursor.description]
+            for row in cursor.fetchall():
+                lot = dict(zip(columns, row))
+                results.setdefault(lot.pop('CODE_PRODUIT'), []).append(lot)
+        return results
+    except Exception as e:
+        logger.error(f"Error querying XpertPharm lots: {e}")
+        return None
+    finally:
+        conn.close()
+
 def get_latest_invoices():
     conn = get_xpertpharm_connection()
     if not conn:
@@ -226,9 +275,10 @@ def get_latest_invoices():
         conn.close()
 
 def get_invoice_details(code_doc):
+    """Detail rows of an invoice, None if XpertPharm is unreachable."""
     conn = get_xpertpharm_connection()
     if not conn:
-        return []
+        return None
     
     query = """
     select ST.[ID_STOCK] ID_STOCK,ST.[CODE_PRODUIT] CODE_PRODUIT,ST.[QUANTITE]  QUANTITE ,ST.[LOT] LOT ,ST.[DATE_PEREMPTION] DATE_PEREMPTION ,ST.[CODE_BARRE_LOT] CODE_BARRE_LOT ,ST.[CREATED_ON] CREATED_ON , ST.DESIGNATION_PRODUIT AS DESIGNATION_PRODUIT   
@@ -247,6 +297,75 @@ def get_invoice_details(code_doc):
         return results
     except Exception as e:
         logger.error(f"Error querying XpertPharm invoice details: {e}")
+        return None
+    finally:
+        conn.close()
+
+def get_invoices_details(code_docs):
+    """
+    Details of several invoices in a single round trip.
+    Returns a dict CODE_DOC -> list of detail rows (same columns as get_invoice_details).
+    """
+    code_docs = [c for c in code_docs if c]
+    if not code_docs:
+        return {}
+
+    conn = get_xpertpharm_connection()
+    if not conn:
+        return {}
+    
+    placeholders = ", ".join("?" for _ in code_docs)
+    query = f"""
+    select ST.[CODE_DOC] CODE_DOC, ST.[ID_STOCK] ID_STOCK,ST.[CODE_PRODUIT] CODE_PRODUIT,ST.[QUANTITE]  QUANTITE ,ST.[LOT] LOT ,ST.[DATE_PEREMPTION] DATE_PEREMPTION ,ST.[CODE_BARRE_LOT] CODE_BARRE_LOT ,ST.[CREATED_ON] CREATED_ON , ST.DESIGNATION_PRODUIT AS DESIGNATION_PRODUIT   
+    FROM [XPERTPHARM5_7091_BOURENANE].[dbo].[View_ACH_DOCUMENT_DETAIL] ST  
+    WHERE ST.[CODE_DOC] IN ({placeholders})    
+    ORDER BY DESIGNATION_PRODUIT 
+    """
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, *code_docs)
+        columns = [column[0] for column in cursor.description]
+        results = {code_doc: [] for code_doc in code_docs}
+        for row in cursor.fetchall():
+            detail = dict(zip(columns, row))
+            results.setdefault(detail['CODE_DOC'], []).append(detail)
+        return results
+    except Exception as e:
+        logger.error(f"Error querying XpertPharm invoices details: {e}")
+        return {}
+    finally:
+        conn.close()
+
+def get_product_families():
+    """Family designations (used by the rotation filters, which match F.DESIGNATION)."""
+    conn = get_xpertpharm_connection()
+    if not conn:
+        return []
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT DISTINCT DESIGNATION FROM dbo.BSE_PRODUIT_FAMILLE WHERE DESIGNATION IS NOT NULL ORDER BY DESIGNATION")
+        return [row[0] for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"Error querying XpertPharm families: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_product_labs():
+    """Laboratories as a list of dicts with CODE and DESIGNATION."""
+    conn = get_xpertpharm_connection()
+    if not conn:
+        return []
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT CODE, DESIGNATION FROM dbo.BSE_PRODUIT_LABO ORDER BY DESIGNATION")
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"Error querying XpertPharm labs: {e}")
         return []
     finally:
         conn.close()
@@ -287,11 +406,18 @@ def check_newer_barcodes(barcode, product_code, created_on):
     finally:
         conn.close()
 
-def get_all_products_from_xpertpharm():
-    """Fetch all products (Code, Designation) from XpertPharm for caching."""
+def get_all_products_from_xpertpharm(columnar=False, progress=None):
+    """
+    Fetch all products (Code, Designation) from XpertPharm for caching.
+    Returns (columns, rows) with rows as plain tuples fetched in chunks,
+    or a ColumnarResult (None on error) when columnar is True.
+    progress(rows_read, total) is called after each batch of the columnar fetch.
+    """
+    from .streaming import fetch_tuples
+    
     conn = get_xpertpharm_connection()
     if not conn:
-        return []
+        return None if columnar else ([], [])
     
     query = """
     SELECT p.CODE_PRODUIT, 
@@ -304,14 +430,18 @@ def get_all_products_from_xpertpharm():
     
     try:
         cursor = conn.cursor()
+        on_batch = None
+        if columnar and progress is not None:
+            cursor.execute("SELECT COUNT(*) FROM [XPERTPHARM5_7091_BOURENANE].[dbo].[STK_PRODUITS] WHERE ACTIF = 1")
+            total = cursor.fetchone()[0] or 0
+            on_batch = lambda count: progress(count, total)
         cursor.execute(query)
-        columns = [column[0] for column in cursor.description]
-        results = []
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
-        return results
+        if columnar:
+            from .columnar import fetch_columnar
+            return fetch_columnar(cursor, on_batch=on_batch)
+        return fetch_tuples(cursor)
     except Exception as e:
         logger.error(f"Error fetching all products from XpertPharm: {e}")
-        return []
+        return None if columnar else ([], [])
     finally:
         conn.close()
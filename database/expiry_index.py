@@ -0,0 +1,208 @@
+"""
+Expiry index: per location/product "next expiry" summary (expiry_summary),
+queries on lots expiring soon and the near-expiry alert job.
+
+The summary is maintained on every flush that inserts, moves, re-dates or
+deletes a Product (SQLAlchemy after_flush hook, same transaction), so all
+the widgets editing products keep it current without calling anything.
+"""
+from sqlalchemy import event, func, text
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from database.models import Product, ExpirySummary, Location, Nomenclature, Notification
+from collections import namedtuple
+from datetime import date, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Notifications raised by the alert job carry this sender (shown as an alert, not a request)
+EXPIRY_ALERT_SENDER = 'PEREMPTIONS'
+# Products listed in the message of one location alert
+ALERT_MAX_PRODUCTS = 8
+# Product attributes the summary depends on
+SUMMARY_ATTRIBUTES = ('location_id', 'code', 'expiry_date')
+
+# Recomputes the summary rows of the given (location_id, code) pairs from products
+REFRESH_SUMMARY_SQL = """
+WITH keys AS (
+    SELECT * FROM unnest(CAST(:location_ids AS integer[]), CAST(:codes AS varchar[])) AS k(location_id, code)
+),
+upserted AS (
+    INSERT INTO expiry_summary (location_id, product_code, next_expiry, lot_count, updated_at)
+    SELECT p.location_id, p.code, MIN(p.expiry_date), COUNT(*), now()
+    FROM products p
+    JOIN keys ON keys.location_id = p.location_id AND keys.code = p.code
+    GROUP BY p.location_id, p.code
+    ON CONFLICT (location_id, product_code) DO UPDATE SET
+        next_expiry = EXCLUDED.next_expiry,
+        lot_count = EXCLUDED.lot_count,
+        updated_at = EXCLUDED.updated_at
+    RETURNING location_id, product_code
+)
+DELETE FROM expiry_summary s
+USING keys
+WHERE s.location_id = keys.location_id AND s.product_code = keys.code
+    AND NOT EXISTS (SELECT 1 FROM upserted u WHERE u.location_id = s.location_id AND u.product_code = s.product_code)
+"""
+
+# Full rebuild (migration, or after products were changed outside the application)
+REBUILD_SUMMARY_SQL = """
+WITH fresh AS (
+    SELECT location_id, code, MIN(expiry_date) AS next_expiry, COUNT(*) AS lot_count
+    FROM products
+    WHERE location_id IS NOT NULL
+    GROUP BY location_id, code
+),
+upserted AS (
+    INSERT INTO expiry_summary (location_id, product_code, next_expiry, lot_count, updated_at)
+    SELECT location_id, code, next_expiry, lot_count, now() FROM fresh
+    ON CONFLICT (location_id, product_code) DO UPDATE SET
+        next_expiry = EXCLUDED.next_expiry,
+        lot_count = EXCLUDED.lot_count,
+        updated_at = EXCLUDED.updated_at
+    RETURNING location_id, product_code
+)
+DELETE FROM expiry_summary s
+WHERE NOT EXISTS (SELECT 1 FROM upserted u WHERE u.location_id = s.location_id AND u.product_code = s.product_code)
+"""
+
+# One lot of lots_expiring_within
+ExpiringLot = namedtuple('ExpiringLot', ['product_id', 'code', 'designation', 'barcode', 'expiry_date',
+                                         'location_id', 'location_label', 'days_left'])
+# One location of expiry_overview
+LocationExpiry = namedtuple('LocationExpiry', ['location_id', 'location_label', 'product_count', 'lot_count', 'next_expiry'])
+
+
+# ----------------------------------------------------------------------------
+# Summary maintenance
+# ----------------------------------------------------------------------------
+
+def _values(obj, attr):
+    """Current and pre-flush values of a product attribute."""
+    history = get_history(obj, attr)
+    values = set(history.added or ()) | set(history.unchanged or ()) | set(history.deleted or ())
+    return values or {getattr(obj, attr)}
+
+def _changed_keys(session):
+    keys = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Product):
+            keys.update((loc, code) for loc in _values(obj, 'location_id') for code in _values(obj, 'code'))
+    for obj in session.dirty:
+        # Only changes that affect the summary (not e.g. the cleaning flag)
+        if isinstance(obj, Product) and any(get_history(obj, attr).has_changes() for attr in SUMMARY_ATTRIBUTES):
+            keys.update((loc, code) for loc in _values(obj, 'location_id') for code in _values(obj, 'code'))
+    return {(loc, code) for loc, code in keys if loc is not None and code}
+
+def refresh_summary(connection, keys):
+    keys = list(keys)
+    if not keys:
+        return
+    connection.execute(text(REFRESH_SUMMARY_SQL), {
+        'location_ids': [loc for loc, _ in keys],
+        'codes': [code for _, code in keys]
+    })
+
+@event.listens_for(Session, 'after_flush')
+def _maintain_summary(session, flush_context):
+    keys = _changed_keys(session)
+    if keys:
+        # Same connection and transaction as the product changes
+        refresh_summary(session.connection(), keys)
+
+def rebuild_summary(db):
+    """Recomputes the whole summary (not committed)."""
+    db.execute(text(REBUILD_SUMMARY_SQL))
+
+
+# ----------------------------------------------------------------------------
+# Queries
+# ----------------------------------------------------------------------------
+
+def lots_expiring_within(days, location_id=None, include_expired=True):
+    """
+    Lots expiring in the next days days (and already expired ones with
+    include_expired), soonest first. Served by the expiry_date indexes.
+    """
+    from database.connection import get_db
+    today = date.today()
+    with get_db() as db:
+        if not db:
+            return []
+        query = db.query(
+            Product.id, Product.code, Nomenclature.designation, Product.barcode, Product.expiry_date,
+            Product.location_id, Location.label
+        ).outerjoin(Nomenclature, Nomenclature.code == Product.code)\
+            .outerjoin(Location, Location.id == Product.location_id)\
+            .filter(Product.expiry_date <= today + timedelta(days=days))
+        if not include_expired:
+            query = query.filter(Product.expiry_date >= today)
+        if location_id is not None:
+            query = query.filter(Product.location_id == location_id)
+        rows = query.order_by(Product.expiry_date, Location.label).all()
+        return [ExpiringLot(r[0], r[1], r[2] or "Inconnu", r[3], r[4], r[5], r[6], (r[4] - today).days) for r in rows]
+
+def expiry_overview(days):
+    """Per location: products and lots whose next expiry is within days days, from the summary."""
+    from database.connection import get_db
+    cutoff = date.today() + timedelta(days=days)
+    with get_db() as db:
+        if not db:
+            return []
+        rows = db.query(
+            ExpirySummary.location_id, Location.label,
+            func.count(ExpirySummary.product_code), func.sum(ExpirySummary.lot_count), func.min(ExpirySummary.next_expiry)
+        ).join(Location, Location.id == ExpirySummary.location_id)\
+            .filter(ExpirySummary.next_expiry <= cutoff)\
+            .group_by(ExpirySummary.location_id, Location.label)\
+            .order_by(func.min(ExpirySummary.next_expiry)).all()
+        return [LocationExpiry(*r) for r in rows]
+
+
+# ----------------------------------------------------------------------------
+# Alert job
+# ----------------------------------------------------------------------------
+
+def run_expiry_alerts(days, urgent_days):
+    """
+    Raises one notification per location holding products whose next expiry is
+    within days days and was not notified yet (urgent within urgent_days or
+    already expired). Returns the number of (location, product) pairs notified.
+    """
+    from database.connection import get_db
+    today = date.today()
+    with get_db() as db:
+        if not db:
+            raise ConnectionError("Base de données indisponible.")
+        rows = db.query(ExpirySummary, Location.label, Nomenclature.designation)\
+            .join(Location, Location.id == ExpirySummary.location_id)\
+            .outerjoin(Nomenclature, Nomenclature.code == ExpirySummary.product_code)\
+            .filter(ExpirySummary.next_expiry <= today + timedelta(days=days))\
+            .filter((ExpirySummary.alerted_expiry == None) | (ExpirySummary.alerted_expiry != ExpirySummary.next_expiry))\
+            .order_by(Location.label, ExpirySummary.next_expiry).all()
+
+        by_location = {}
+        for summary, label, designation in rows:
+            by_location.setdefault(label, []).append((summary, designation or summary.product_code))
+
+        for label, entries in by_location.items():
+            soonest = min(summary.next_expiry for summary, _ in entries)
+            lines = [f"{designation} ({summary.next_expiry:%m/%y})" for summary, designation in entries[:ALERT_MAX_PRODUCTS]]
+            if len(entries) > ALERT_MAX_PRODUCTS:
+                lines.append(f"... et {len(entries) - ALERT_MAX_PRODUCTS} autre(s)")
+            db.add(Notification(
+                sender_station=EXPIRY_ALERT_SENDER,
+                target_role='SERVER',
+                product_code=None,
+                product_name=f"Emplacement {label} : {len(entries)} produit(s) à vérifier",
+                quantity=sum(summary.lot_count for summary, _ in entries),
+                message=("Péremption proche : " + ", ".join(lines))[:500],
+                is_urgent=(soonest - today).days <= urgent_days
+            ))
+            for summary, _ in entries:
+                summary.alerted_expiry = summary.next_expiry
+        db.commit()
+        if rows:
+            logger.info(f"Expiry alerts: {len(rows)} product(s) in {len(by_location)} location(s).")
+        return len(rows)
@@ -0,0 +1,233 @@
+from PyQt6.QtCore import QObject, pyqtSignal, QThread, QTimer
+from sqlalchemy import func
+from database.connection import get_db, get_latest_invoices, get_invoices_details, get_invoice_details
+from database.models import Product, EventLog
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Interval used to pick up inventory events logged by other machines
+EVENT_POLL_INTERVAL_MS = 10000
+# Events that may take an invoice lot off the shelves (their details do not hold the barcode)
+REMOVAL_EVENTS = ('PRODUCT_DELETED', 'PRODUCT_MOVED', 'INVENTORY_CLEANING_LOSS')
+
+
+def _clean_barcode(value):
+    return str(value).strip() if value else ""
+
+
+def _shelved_barcodes(db, barcodes):
+    if not barcodes:
+        return set()
+    rows = db.query(Product.barcode).filter(Product.barcode.in_(list(barcodes))).all()
+    return {r.barcode for r in rows}
+
+
+class InvoicePrefetchThread(QThread):
+    """Loads the latest invoices, all their details and their local status in one pass."""
+    loaded = pyqtSignal(object, object, object, object) # invoices, details by CODE_DOC, shelved barcodes, last event id
+
+    def run(self):
+        invoices, details, shelved, last_event_id = [], {}, set(), 0
+        try:
+            invoices = get_latest_invoices()
+            details = get_invoices_details([inv.get('CODE_DOC') for inv in invoices])
+
+            barcodes = {_clean_barcode(d.get('CODE_BARRE_LOT')) for lines in details.values() for d in lines}
+            barcodes.discard("")
+
+            with get_db() as db:
+                if db:
+                    # Read the watermark first: events logged meanwhile are replayed by the poll
+                    last_event_id = db.query(func.max(EventLog.id)).scalar() or 0
+                    shelved = _shelved_barcodes(db, barcodes)
+        except Exception as e:
+            logger.error(f"Invoice prefetch error: {e}")
+        self.loaded.emit(invoices, details, shelved, last_event_id)
+
+
+class InvoiceEventPollThread(QThread):
+    """Replays the inventory events logged since last_event_id against the invoice barcodes."""
+    polled = pyqtSignal(object, object, object) # last event id, barcodes shelved, barcodes no longer shelved
+
+    def __init__(self, last_event_id, pending_barcodes, shelved_barcodes):
+        super().__init__()
+        self.last_event_id = last_event_id
+        self.pending_barcodes = pending_barcodes
+        self.shelved_barcodes = shelved_barcodes
+
+    def run(self):
+        last_event_id, added, removed = self.last_event_id, set(), set()
+        try:
+            with get_db() as db:
+                if db:
+                    events = db.query(EventLog.id, EventLog.event_type, EventLog.details).filter(
+                        EventLog.id > self.last_event_id,
+                        EventLog.event_type.in_(('INVENTORY_ADD',) + REMOVAL_EVENTS)
+                    ).all()
+                    if events:
+                        last_event_id = max(e.id for e in events)
+
+                        # Event details hold the product code, resolve them to the invoice barcodes
+                        codes = {e.details for e in events if e.event_type == 'INVENTORY_ADD' and e.details}
+                        if codes and self.pending_barcodes:
+                            added = {r.barcode for r in db.query(Product.barcode).filter(
+                                Product.code.in_(codes),
+                                Product.barcode.in_(self.pending_barcodes)
+                            ).all()}
+                        # Deletions only give an id or a count: re-check the shelved barcodes
+                        if self.shelved_barcodes and any(e.event_type in REMOVAL_EVENTS for e in events):
+                            removed = self.shelved_barcodes - _shelved_barcodes(db, self.shelved_barcodes)
+        except Exception as e:
+            logger.error(f"Invoice event poll error: {e}")
+            last_event_id, added, removed = self.last_event_id, set(), set()
+        self.polled.emit(last_event_id, added, removed)
+
+
+class InvoiceReconciler(QObject):
+    """
+    Keeps the recent invoices and their details in memory, keyed by CODE_DOC,
+    together with the shelved/pending status of every invoice line.
+    The status is updated incrementally from the inventory events (additions,
+    deletions, moves) so that the invoice list and the details never need to
+    query the databases again; the events are polled in a worker thread.
+    """
+    _instance = None
+    invoices_loaded = pyqtSignal()
+    invoice_updated = pyqtSignal(str) # CODE_DOC whose completion changed
+
+    @staticmethod
+    def instance():
+        if InvoiceReconciler._instance is None:
+            InvoiceReconciler._instance = InvoiceReconciler()
+        return InvoiceReconciler._instance
+
+    def __init__(self):
+        super().__init__()
+        self.invoices = []
+        self.is_loading = False
+        self._details = {}          # CODE_DOC -> detail rows
+        self._docs_by_barcode = {}  # barcode -> set of CODE_DOC containing it
+        self._pending = {}          # CODE_DOC -> number of lines not shelved yet
+        self._totals = {}           # CODE_DOC -> number of lines with a barcode
+        self._shelved = set()       # Invoice barcodes present in a location
+        self._last_event_id = 0
+        self._loader_thread = None
+        self._poll_thread = None
+
+        self._poll_timer = QTimer(self)
+        self._poll_timer.timeout.connect(self.poll_events)
+        self._poll_timer.start(EVENT_POLL_INTERVAL_MS)
+
+    def refresh(self):
+        if self.is_loading:
+            return
+        self.is_loading = True
+        self._loader_thread = InvoicePrefetchThread()
+        self._loader_thread.loaded.connect(self._on_loaded)
+        self._loader_thread.start()
+
+    def _on_loaded(self, invoices, details, shelved, last_event_id):
+        self.is_loading = False
+        self.invoices = invoices
+        self._details = {}
+        self._docs_by_barcode = {}
+        self._pending = {}
+        self._totals = {}
+        self._shelved = set(shelved)
+        self._last_event_id = max(self._last_event_id, last_event_id)
+
+        for code_doc, lines in details.items():
+            self._register(code_doc, lines)
+
+        logger.info(f"Invoice cache loaded. {len(self.invoices)} invoices.")
+        self.invoices_loaded.emit()
+
+    def _register(self, code_doc, lines):
+        self._details[code_doc] = lines
+        total = pending = 0
+        for line in lines:
+            barcode = _clean_barcode(line.get('CODE_BARRE_LOT'))
+            if not barcode:
+                continue
+            total += 1
+            self._docs_by_barcode.setdefault(barcode, set()).add(code_doc)
+            if barcode not in self._shelved:
+                pending += 1
+        self._totals[code_doc] = total
+        self._pending[code_doc] = pending
+
+    def get_details(self, code_doc):
+        """Details of an invoice; fetched (and cached) on demand if it was not prefetched."""
+        if code_doc not in self._details:
+            lines = get_invoice_details(code_doc)
+            if lines is None:
+                # XpertPharm unreachable: not cached, fetched again next time
+                return []
+            barcodes = {_clean_barcode(d.get('CODE_BARRE_LOT')) for d in lines}
+            barcodes.discard("")
+            with get_db() as db:
+                if db:
+                    self._shelved |= _shelved_barcodes(db, barcodes)
+            self._register(code_doc, lines)
+        return self._details[code_doc]
+
+    def is_shelved(self, barcode):
+        return _clean_barcode(barcode) in self._shelved
+
+    def completion(self, code_doc):
+        """Returns (shelved lines, lines with a barcode) or None if the invoice is unknown."""
+        if code_doc not in self._totals:
+            return None
+        total = self._totals[code_doc]
+        return total - self._pending[code_doc], total
+
+    def mark_shelved(self, barcode):
+        """Called when a barcode is put in a location (locally or seen in the event log)."""
+        barcode = _clean_barcode(barcode)
+        if not barcode or barcode in self._shelved:
+            return
+        docs = self._docs_by_barcode.get(barcode)
+        if not docs:
+            return
+        self._shelved.add(barcode)
+
+        for code_doc in docs:
+            lines = sum(1 for d in self._details[code_doc] if _clean_barcode(d.get('CODE_BARRE_LOT')) == barcode)
+            self._pending[code_doc] -= lines
+            self.invoice_updated.emit(code_doc)
+
+    def mark_unshelved(self, barcode):
+        """Called when the last lot of a barcode left the locations (seen in the event log)."""
+        barcode = _clean_barcode(barcode)
+        if barcode not in self._shelved:
+            return
+        self._shelved.discard(barcode)
+
+        for code_doc in self._docs_by_barcode.get(barcode, ()):
+            lines = sum(1 for d in self._details[code_doc] if _clean_barcode(d.get('CODE_BARRE_LOT')) == barcode)
+            self._pending[code_doc] += lines
+            self.invoice_updated.emit(code_doc)
+
+    def poll_events(self):
+        """Replays the inventory events logged since the last poll (other machines included)."""
+        if self.is_loading or not self._docs_by_barcode:
+            return
+        if self._poll_thread is not None and self._poll_thread.isRunning():
+            return
+        invoice_barcodes = set(self._docs_by_barcode)
+        self._poll_thread = InvoiceEventPollThread(
+            self._last_event_id, invoice_barcodes - self._shelved, invoice_barcodes & self._shelved
+        )
+        self._poll_thread.polled.connect(self._on_polled)
+        self._poll_thread.start()
+
+    def _on_polled(self, last_event_id, added, removed):
+        if self.is_loading:
+            # A reload started meanwhile: its snapshot supersedes this poll
+            return
+        self._last_event_id = max(self._last_event_id, last_event_id)
+        for barcode in added:
+            self.mark_shelved(barcode)
+        for barcode in removed:
+            self.mark_unshelved(barcode)
@@ -0,0 +1,125 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from sqlalchemy import func
+from database.connection import get_db, log_event
+from database.models import Location, EventLog
+from collections import namedtuple
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Logged by every location edit, lets the other stations reload their registry
+LOCATIONS_CHANGED_EVENT = 'LOCATIONS_CHANGED'
+CHANGE_POLL_INTERVAL_MS = 60000
+
+# Detached, read-only view of a location row (safe to keep across sessions and threads)
+LocationEntry = namedtuple('LocationEntry', ['id', 'label', 'barcode'])
+
+
+class LocationRegistry(QObject):
+    """
+    In-process cache of the locations table, indexed by id, label and barcode.
+    Loaded on first use and shared by all widgets; reloaded when a location
+    is edited on this station (notify_changed) or on another one (event poll).
+    """
+    _instance = None
+    changed = pyqtSignal()
+
+    @staticmethod
+    def instance():
+        if LocationRegistry._instance is None:
+            LocationRegistry._instance = LocationRegistry()
+        return LocationRegistry._instance
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._sorted = []
+        self._by_id = {}
+        self._by_label = {}
+        self._by_barcode = {}
+        self._last_event_id = 0
+
+        self._poll_timer = QTimer(self)
+        self._poll_timer.timeout.connect(self.poll_changes)
+        self._poll_timer.start(CHANGE_POLL_INTERVAL_MS)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.reload(emit=False)
+
+    def reload(self, emit=True):
+        with self._lock:
+            try:
+                with get_db() as db:
+                    if not db:
+                        return
+                    # Read before the rows: a change committed in between is then both
+                    # in the rows and replayed by the poll (at worst one extra reload),
+                    # never counted as seen while missing from the rows
+                    last_event_id = db.query(func.max(EventLog.id)).scalar() or 0
+                    rows = db.query(Location.id, Location.label, Location.barcode).order_by(Location.label).all()
+            except Exception as e:
+                logger.error(f"Location registry load error: {e}")
+                return
+
+            entries = [LocationEntry(r.id, r.label, r.barcode) for r in rows]
+            self._sorted = entries
+            self._by_id = {e.id: e for e in entries}
+            self._by_label = {e.label: e for e in entries}
+            self._by_barcode = {e.barcode: e for e in entries}
+            self._last_event_id = last_event_id
+            self._loaded = True
+        logger.info(f"Location registry loaded. {len(entries)} locations.")
+        if emit:
+            self.changed.emit()
+
+    # -- lookups (no database round trip once loaded) -----------------------
+
+    def all(self):
+        """Locations sorted by label."""
+        self._ensure_loaded()
+        return list(self._sorted)
+
+    def by_id(self, location_id):
+        self._ensure_loaded()
+        return self._by_id.get(location_id)
+
+    def by_label(self, label):
+        self._ensure_loaded()
+        return self._by_label.get(label)
+
+    def by_barcode(self, barcode):
+        self._ensure_loaded()
+        return self._by_barcode.get(barcode)
+
+    # -- invalidation --------------------------------------------------------
+
+    def notify_changed(self, details=None):
+        """Called after a location was added, edited or deleted on this station."""
+        log_event(LOCATIONS_CHANGED_EVENT, details=details, source='LocationRegistry')
+        self.reload()
+
+    def poll_changes(self):
+        """Reloads when another station logged a location change since the last load."""
+        if not self._loaded:
+            return
+        try:
+            with get_db() as db:
+                if not db:
+                    return
+                # Only the events logged since the last poll are scanned
+                newest = db.query(func.max(EventLog.id)).scalar() or 0
+                change = db.query(EventLog.id).filter(
+                    EventLog.id > self._last_event_id,
+                    EventLog.id <= newest,
+                    EventLog.event_type == LOCATIONS_CHANGED_EVENT
+                ).first()
+                if not change:
+                    self._last_event_id = max(self._last_event_id, newest)
+        except Exception as e:
+            logger.error(f"Location change poll error: {e}")
+            return
+        if change:
+            self.reload()
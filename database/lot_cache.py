@@ -0,0 +1,33 @@
+from database.batch_cache import BatchCache
+from database.connection import get_lots_by_product_codes
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Stock moves all day, lots shown for a product are refreshed after this delay
+LOT_CACHE_TTL = 120  # seconds
+LOT_CACHE_MAX = 2000  # products
+
+
+class LotCache(BatchCache):
+    """
+    XpertPharm lots in stock per product code, kept LOT_CACHE_TTL seconds.
+    The missing list prefetches all its products in one pass, so moving
+    through the list reads from memory.
+    """
+    _instance = None
+
+    @staticmethod
+    def instance():
+        if LotCache._instance is None:
+            LotCache._instance = LotCache()
+        return LotCache._instance
+
+    def __init__(self):
+        super().__init__(ttl=LOT_CACHE_TTL, max_entries=LOT_CACHE_MAX)
+
+    def fetch(self, product_codes):
+        return get_lots_by_product_codes(product_codes)
+
+    def default(self, product_code):
+        return []
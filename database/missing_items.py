@@ -0,0 +1,118 @@
+from sqlalchemy import func, text
+from database.connection import get_db
+from database.models import MissingItem, Nomenclature
+from collections import namedtuple
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One row of the missing list: latest report of a product and how many times it was reported
+MissingEntry = namedtuple('MissingEntry', ['id', 'product_code', 'designation', 'source', 'reported_at', 'report_count'])
+# Result of report_missing: inserted is False when an active row of the product was updated
+MissingReport = namedtuple('MissingReport', ['id', 'report_count', 'inserted'])
+
+# One statement: creates the nomenclature row if a designation is given and it
+# does not exist yet, then inserts the report or merges it into the active row
+# of the product (unique index ux_missing_items_active_code). xmax = 0 only
+# for a freshly inserted row.
+REPORT_SQL = """
+WITH nom AS (
+    INSERT INTO nomenclature (code, designation, last_edit_date)
+    SELECT :code, :designation, :now
+    WHERE :designation IS NOT NULL
+    ON CONFLICT (code) DO NOTHING
+)
+INSERT INTO missing_items (product_code, source, quantity, reported_at, is_deleted, report_count)
+VALUES (:code, :source, :quantity, :now, false, 1)
+ON CONFLICT (product_code) WHERE is_deleted = false
+DO UPDATE SET
+    source = EXCLUDED.source,
+    quantity = COALESCE(missing_items.quantity, 0) + EXCLUDED.quantity,
+    reported_at = EXCLUDED.reported_at,
+    report_count = COALESCE(missing_items.report_count, 1) + 1
+RETURNING id, report_count, (xmax = 0) AS inserted
+"""
+
+
+def _latest_per_product(db, date_from=None, date_to=None):
+    """
+    Subquery with the latest active report of each product (DISTINCT ON),
+    its nomenclature designation and the number of reports in the range.
+    The window sum is computed before DISTINCT ON keeps one row per product
+    (a single active row per product once migrate_missing_items.py has run).
+    """
+    query = db.query(
+        MissingItem.id,
+        MissingItem.product_code,
+        Nomenclature.designation,
+        MissingItem.source,
+        MissingItem.reported_at,
+        func.sum(func.coalesce(MissingItem.report_count, 1)).over(partition_by=MissingItem.product_code).label('report_count')
+    ).outerjoin(Nomenclature, MissingItem.product_code == Nomenclature.code)\
+        .filter(MissingItem.is_deleted == False)
+
+    if date_from is not None:
+        query = query.filter(MissingItem.reported_at >= date_from)
+    if date_to is not None:
+        query = query.filter(MissingItem.reported_at < date_to)
+
+    return query.distinct(MissingItem.product_code)\
+        .order_by(MissingItem.product_code, MissingItem.reported_at.desc(), MissingItem.id.desc())\
+        .subquery()
+
+def get_missing_list(date_from=None, date_to=None):
+    """
+    Missing products reported in [date_from, date_to), one MissingEntry per
+    product, most recently reported first. Runs as a single query whatever the
+    number of duplicate reports.
+    """
+    try:
+        with get_db() as db:
+            if not db:
+                return []
+            latest = _latest_per_product(db, date_from, date_to)
+            rows = db.query(latest).order_by(latest.c.reported_at.desc()).all()
+            return [MissingEntry(r.id, r.product_code, r.designation, r.source, r.reported_at, r.report_count) for r in rows]
+    except Exception as e:
+        logger.error(f"Missing list query error: {e}")
+        return []
+
+def delete_products(product_codes):
+    """Soft deletes every active report of the given products. Returns the number of reports deleted."""
+    codes = list(product_codes)
+    if not codes:
+        return 0
+    with get_db() as db:
+        if not db:
+            return 0
+        count = db.query(MissingItem).filter(
+            MissingItem.product_code.in_(codes),
+            MissingItem.is_deleted == False
+        ).update({MissingItem.is_deleted: True}, synchronize_session=False)
+        db.commit()
+        return count
+
+def upsert_missing(db, product_code, source, designation=None, quantity=1):
+    """
+    Reports product_code as missing within the caller's session (not committed),
+    so it is part of the same transaction as e.g. the deletion of its last product.
+    designation, if given, is used to create the nomenclature row when missing.
+    """
+    row = db.execute(text(REPORT_SQL), {
+        'code': product_code,
+        'designation': designation,
+        'source': source,
+        'quantity': quantity,
+        'now': datetime.now()
+    }).first()
+    return MissingReport(row.id, row.report_count, bool(row.inserted))
+
+def report_missing(product_code, source, designation=None, quantity=1):
+    """Reports product_code as missing and commits. Returns a MissingReport, None without database."""
+    with get_db() as db:
+        if not db:
+            return None
+        report = upsert_missing(db, product_code, source, designation, quantity)
+        db.commit()
+        return report
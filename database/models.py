@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Date, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Date, Float, Index, text
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 
@@ -35,13 +35,29 @@ class Product(Base):
     id = Column(Integer, primary_key=True)
     code = Column(String(50), ForeignKey('nomenclature.code'), nullable=False) # Code Produit (from XpertPharm)
     barcode = Column(String(50), nullable=False) # Code Barre Lot
-    expiry_date = Column(Date, nullable=True)
+    expiry_date = Column(Date, nullable=True, index=True)
     location_id = Column(Integer, ForeignKey('locations.id'))
     cleaning = Column(Boolean, default=False)
     
     location = relationship("Location", back_populates="products")
     nomenclature = relationship("Nomenclature", back_populates="products", foreign_keys=[code])
 
+    # Lots of a location by expiry (database/expiry_index.py), lots of a product by expiry (database/picking.py)
+    __table_args__ = (
+        Index('ix_products_location_expiry', 'location_id', 'expiry_date'),
+        Index('ix_products_code_expiry', 'code', 'expiry_date'),
+    )
+
+class ExpirySummary(Base):
+    """Next expiry of each product in each location, kept up to date by database/expiry_index.py."""
+    __tablename__ = 'expiry_summary'
+    location_id = Column(Integer, ForeignKey('locations.id', ondelete='CASCADE'), primary_key=True)
+    product_code = Column(String(50), primary_key=True)
+    next_expiry = Column(Date, nullable=True, index=True) # Earliest expiry date of the lots (None if none is dated)
+    lot_count = Column(Integer, nullable=False, default=0)
+    alerted_expiry = Column(Date, nullable=True) # next_expiry already notified by the alert job
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
 class SupplyList(Base):
     __tablename__ = 'supply_lists'
     id = Column(Integer, primary_key=True)
@@ -86,9 +102,19 @@ class MissingItem(Base):
     quantity = Column(Integer, default=1)
     reported_at = Column(DateTime, default=datetime.now)
     is_deleted = Column(Boolean, default=False)
+    report_count = Column(Integer, default=1) # Reports merged into this row by report_missing
 
     nomenclature = relationship("Nomenclature", primaryjoin="foreign(MissingItem.product_code) == Nomenclature.code", viewonly=True)
 
+    # Serves the latest-report-per-product query of the missing list (database/missing_items.py)
+    # and keeps a single active row per product (ON CONFLICT target of report_missing)
+    __table_args__ = (
+        Index('ix_missing_items_active_code_date', 'product_code', 'reported_at',
+              postgresql_where=text('is_deleted = false')),
+        Index('ux_missing_items_active_code', 'product_code', unique=True,
+              postgresql_where=text('is_deleted = false')),
+    )
+
 class Notification(Base):
     __tablename__ = 'notifications'
     id = Column(Integer, primary_key=True)
@@ -112,3 +138,42 @@ class EventLog(Base):
     source = Column(String(50), nullable=True) # Widget name
     machine_name = Column(String(100), nullable=True) # PC Name
     delay = Column(Float, nullable=True) # Délai en heures pour INVENTORY_ADD
+
+class SalesDaily(Base):
+    """Daily sales aggregate per product, copied from XpertPharm by the sales warehouse ETL"""
+    __tablename__ = 'sales_daily'
+    sale_date = Column(Date, primary_key=True)
+    product_code = Column(String(50), primary_key=True, index=True)
+    sale_type = Column(String(10), primary_key=True) # VC, RC, VM, BL, BR, VI, FV, FPN, FCN, FCS, FHC
+    quantity = Column(Float, default=0)
+    last_sale_at = Column(DateTime, nullable=True)
+
+class ProductStock(Base):
+    """XpertPharm product reference and current (non expired) stock, refreshed by the ETL"""
+    __tablename__ = 'product_stock'
+    product_code = Column(String(50), primary_key=True)
+    designation = Column(String(255))
+    family = Column(String(100), nullable=True)
+    lab = Column(String(50), nullable=True)
+    reference = Column(String(50), nullable=True)
+    quantity = Column(Float, nullable=True) # NULL = no valid stock line
+    refreshed_at = Column(DateTime, default=datetime.now)
+
+class SyncWatermark(Base):
+    __tablename__ = 'sync_watermarks'
+    name = Column(String(50), primary_key=True) # e.g. 'sales_daily'
+    last_code = Column(String(50), nullable=True) # CODE_VENTE
+    last_date = Column(DateTime, nullable=True) # DATE_VENTE
+    signature = Column(Text, nullable=True) # JSON: per source and day, document count / cancelled / last number
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class SyncRun(Base):
+    """History of the background synchronization tasks (server mode scheduler)"""
+    __tablename__ = 'sync_runs'
+    id = Column(Integer, primary_key=True)
+    task = Column(String(50), nullable=False, index=True) # sales, nomenclature, product_cache, invoices
+    started_at = Column(DateTime, default=datetime.now)
+    finished_at = Column(DateTime, nullable=True)
+    status = Column(String(20), default='running') # running, success, error
+    details = Column(String(500), nullable=True)
+    machine_name = Column(String(100), nullable=True)
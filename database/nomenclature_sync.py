@@ -0,0 +1,133 @@
+from sqlalchemy import text
+from database.connection import get_db, get_xpertpharm_connection
+from database.cache import ProductCache
+from database.columnar import fetch_columnar
+import csv
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Temporary copy of the XpertPharm catalog, dropped with the transaction
+CREATE_CATALOG_SQL = """
+CREATE TEMP TABLE xp_catalog (
+    code varchar(50) PRIMARY KEY,
+    designation varchar(255)
+) ON COMMIT DROP
+"""
+
+OBSOLETE_SQL = """
+SELECT n.code, n.designation
+FROM nomenclature n
+WHERE NOT EXISTS (SELECT 1 FROM xp_catalog x WHERE x.code = n.code)
+ORDER BY n.code
+"""
+
+NEW_CODES_SQL = """
+SELECT x.code, x.designation
+FROM xp_catalog x
+WHERE NOT EXISTS (SELECT 1 FROM nomenclature n WHERE n.code = x.code)
+ORDER BY x.code
+"""
+
+# The self-join on "o" exposes the designation as it was before the update
+RENAME_SQL = """
+UPDATE nomenclature n
+SET designation = x.designation, last_edit_date = now()
+FROM xp_catalog x, nomenclature o
+WHERE x.code = n.code
+  AND o.id = n.id
+  AND x.designation IS NOT NULL
+  AND n.designation IS DISTINCT FROM x.designation
+RETURNING n.code, o.designation, x.designation
+"""
+
+
+class ReconciliationResult:
+    def __init__(self):
+        self.renamed = []    # (code, old designation, new designation)
+        self.obsolete = []   # (code, local designation) no longer in XpertPharm
+        self.new_codes = []  # (code, XP designation) not yet in the nomenclature
+        self.catalog_size = 0
+
+
+def load_xp_catalog():
+    """
+    (code, designation) pairs of the XpertPharm catalog. The product cache is
+    used when loaded (same source the widgets always used), SQL Server otherwise.
+    """
+    df = ProductCache.instance().products_df
+    if not df.empty:
+        return zip(df['CODE_PRODUIT'], df['designation'])
+
+    conn = get_xpertpharm_connection()
+    if not conn:
+        raise ConnectionError("Impossible de se connecter à XpertPharm.")
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT CODE_PRODUIT, DESIGNATION FROM dbo.View_STK_PRODUITS")
+        result = fetch_columnar(cursor)
+        return zip(result.column('CODE_PRODUIT'), result.column('DESIGNATION'))
+    finally:
+        conn.close()
+
+
+def _copy_catalog(db, catalog):
+    """Loads the catalog into the xp_catalog temp table with COPY. Returns the row count."""
+    # Last occurrence wins for duplicated codes, like the previous loop did
+    rows = {}
+    for code, designation in catalog:
+        if code:
+            rows[str(code).strip()] = designation
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for code, designation in rows.items():
+        writer.writerow((code, designation if designation is not None else ''))
+    buffer.seek(0)
+
+    db.execute(text(CREATE_CATALOG_SQL))
+    cursor = db.connection().connection.cursor()
+    try:
+        if hasattr(cursor, 'copy_expert'):
+            cursor.copy_expert("COPY xp_catalog (code, designation) FROM STDIN WITH (FORMAT csv)", buffer)
+        else:
+            cursor.executemany("INSERT INTO xp_catalog (code, designation) VALUES (%s, %s)", list(rows.items()))
+    finally:
+        cursor.close()
+    db.execute(text("ANALYZE xp_catalog"))
+    return len(rows)
+
+
+def reconcile(apply_renames=False, catalog=None):
+    """
+    Compares the local nomenclature with the XpertPharm catalog using
+    set-based joins on a temp table. With apply_renames, the changed
+    designations are updated in a single UPDATE ... FROM and committed.
+    """
+    if catalog is None:
+        catalog = load_xp_catalog()
+
+    result = ReconciliationResult()
+    with get_db() as db:
+        if not db:
+            raise ConnectionError("Base de données locale indisponible.")
+        try:
+            result.catalog_size = _copy_catalog(db, catalog)
+            result.obsolete = [tuple(r) for r in db.execute(text(OBSOLETE_SQL)).fetchall()]
+            result.new_codes = [tuple(r) for r in db.execute(text(NEW_CODES_SQL)).fetchall()]
+
+            if apply_renames:
+                result.renamed = [tuple(r) for r in db.execute(text(RENAME_SQL)).fetchall()]
+                db.commit()
+            else:
+                db.rollback()
+        except Exception:
+            db.rollback()
+            raise
+
+    logger.info(
+        f"Nomenclature reconciliation: {result.catalog_size} XP codes, "
+        f"{len(result.renamed)} renamed, {len(result.obsolete)} obsolete, {len(result.new_codes)} new"
+    )
+    return result
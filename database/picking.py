@@ -0,0 +1,51 @@
+"""
+FEFO picking: for a product code, the lots in stock ordered by expiry date
+(first expired, first out) then shelf position, so a supply list takes its
+first/second lot from the database instead of the order of a search result.
+
+Each pick is a single query on the (code, expiry_date) index, so lots added,
+moved or deleted on any station are taken into account without an in-memory
+copy to keep in sync. Location labels come from the same query (join).
+"""
+from database.models import Product, Location
+from utils import location_codec
+from collections import namedtuple
+from datetime import date
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Shelf rank of lots whose location has no valid label (picked last)
+UNKNOWN_RANK = 10 ** 7
+
+# One lot to pick
+PickLot = namedtuple('PickLot', ['product_id', 'code', 'barcode', 'expiry_date', 'location_id', 'location_label'])
+
+
+def location_rank(label):
+    """Shelf position of a location (row then floor, as in its barcode)."""
+    barcode = location_codec.encode(label)
+    return int(barcode) if barcode else UNKNOWN_RANK
+
+def pick_key(lot):
+    """Earliest expiry first (undated lots last), then nearest shelf."""
+    return (
+        lot.expiry_date is None, lot.expiry_date or date.max,
+        location_rank(lot.location_label), lot.location_label or "", lot.product_id
+    )
+
+
+def get_picks(db, code, count=2):
+    """
+    The count lots to take first for a product code (fewer if not in stock).
+    db is an open session (get_db()).
+    """
+    rows = db.query(Product.id, Product.code, Product.barcode, Product.expiry_date,
+                    Product.location_id, Location.label)\
+        .outerjoin(Location, Product.location_id == Location.id)\
+        .filter(Product.code == code)\
+        .order_by(Product.expiry_date.asc().nullslast(), Location.label)\
+        .all()
+    # The shelf order (barcode rank) is not the label order: ties on the date are ranked here
+    lots = sorted((PickLot(*row) for row in rows), key=pick_key)
+    return lots[:count]
@@ -0,0 +1,307 @@
+from database.connection import get_xpertpharm_connection
+from database.sql_templates import get_template
+from database import sales_warehouse
+from database.streaming import iter_chunks
+from database.columnar import fetch_columnar
+from utils.lazy_import import lazy_import
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import unicodedata
+import time
+import logging
+
+np = lazy_import('numpy')
+
+logger = logging.getLogger(__name__)
+
+# Sales of past months do not change, a few minutes is enough for the current one
+ROTATION_CACHE_TTL = 600  # seconds
+ROTATION_CACHE_MAX = 200  # entries
+
+# Executed in the same batch as rotation.sql, reuses its @CODE_PRODUIT
+STOCK_SQL = """
+SELECT
+    ISNULL(stk.QTE_STOCK_TOTAL, 0) AS QTE_STOCK_TOTAL
+FROM dbo.STK_PRODUITS AS p
+LEFT JOIN (
+    SELECT CODE_PRODUIT, SUM(QUANTITE) AS QTE_STOCK_TOTAL
+    FROM dbo.STK_STOCK
+    WHERE (DATE_PEREMPTION > GETDATE() OR DATE_PEREMPTION IS NULL)
+        AND CODE_PRODUIT = @CODE_PRODUIT
+    GROUP BY CODE_PRODUIT
+) AS stk ON stk.CODE_PRODUIT = p.CODE_PRODUIT
+WHERE p.CODE_PRODUIT = @CODE_PRODUIT;
+"""
+
+# Batch counterpart: stock of every product matching the same filters, sold or not
+BATCH_STOCK_SQL = """
+SELECT
+    p.CODE_PRODUIT,
+    p.DESIGNATION_PRODUIT,
+    ISNULL(SUM(s.QUANTITE), 0) AS QTE_STOCK_TOTAL
+FROM dbo.STK_PRODUITS AS p
+LEFT JOIN dbo.BSE_PRODUIT_LABO LAB ON LAB.CODE = p.CODE_LABO
+LEFT JOIN BSE_PRODUIT_FAMILLE F ON F.CODE = p.CODE_FAMILLE
+LEFT JOIN dbo.STK_STOCK s ON s.CODE_PRODUIT = p.CODE_PRODUIT
+    AND (s.DATE_PEREMPTION > GETDATE() OR s.DATE_PEREMPTION IS NULL)
+WHERE (p.CODE_PRODUIT IN (SELECT * FROM SplitString(@CODES_PRODUIT)) OR ISNULL(@CODES_PRODUIT, '') = '')
+    AND (F.DESIGNATION = @FAMILLE_PRODUIT OR ISNULL(@FAMILLE_PRODUIT, '') = '')
+    AND (LAB.CODE = @LABO OR ISNULL(@LABO, '') = '')
+GROUP BY p.CODE_PRODUIT, p.DESIGNATION_PRODUIT;
+"""
+
+# Code lists are split in partitions executed on parallel connections
+BATCH_PARTITION_SIZE = 150
+BATCH_MAX_WORKERS = 4
+
+MONTH_NAMES = ["janvier", "fevrier", "mars", "avril", "mai", "juin",
+               "juillet", "aout", "septembre", "octobre", "novembre", "decembre"]
+
+def month_sort_key(name):
+    """Calendar order for the month labels returned by Get_Month_Name."""
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode().strip().lower()
+    if text in MONTH_NAMES:
+        return (MONTH_NAMES.index(text), text)
+    if text.isdigit():
+        return (int(text) - 1, text)
+    return (len(MONTH_NAMES), text)
+
+
+class RotationResult:
+    def __init__(self, rows, stock):
+        self.rows = rows    # (CODE_PRODUIT, PRODUIT, QUANTITE_VENDU, MOIS)
+        self.stock = stock
+
+
+class RotationMatrix:
+    """Product x month sales with totals and current stock."""
+
+    def __init__(self):
+        self.months = []    # Column labels, calendar order
+        self.products = {}  # CODE_PRODUIT -> {'designation', 'sales': {mois: qty}, 'total', 'stock'}
+
+    def _product(self, code, designation):
+        product = self.products.get(code)
+        if product is None:
+            product = {'designation': designation or code, 'sales': {}, 'total': 0, 'stock': 0}
+            self.products[code] = product
+        return product
+
+    def add_sales(self, rows):
+        months = set(self.months)
+        for code, designation, qty, mois in rows:
+            qty = qty or 0
+            product = self._product(code, designation)
+            product['sales'][mois] = product['sales'].get(mois, 0) + qty
+            product['total'] += qty
+            months.add(mois)
+        self.months = sorted(months, key=month_sort_key)
+
+    def add_sales_columnar(self, result):
+        """
+        add_sales for a ColumnarResult of rotation.sql with CODE_PRODUIT, PRODUIT
+        and MOIS dictionary-encoded: the codes index the product x month grid directly.
+        """
+        if not len(result):
+            return
+        codes = result.categories['CODE_PRODUIT']
+        month_labels = result.categories['MOIS']
+        p = result.codes('CODE_PRODUIT')
+        m = result.codes('MOIS')
+        qty = np.nan_to_num(result.column('QUANTITE_VENDU').astype(np.float64))
+
+        valid = (p >= 0) & (m >= 0)
+        grid = np.zeros((len(codes), len(month_labels)))
+        np.add.at(grid, (p[valid], m[valid]), qty[valid])
+        has_sales = np.zeros(grid.shape, dtype=bool)
+        has_sales[p[valid], m[valid]] = True
+
+        # First row of each product gives its designation
+        _, first_rows = np.unique(p, return_index=True)
+        designations = result.column('PRODUIT')
+        for row in first_rows:
+            i = p[row]
+            if i < 0:
+                continue
+            product = self._product(codes[i], designations[row])
+            for j in np.flatnonzero(has_sales[i]):
+                value = grid[i, j].item()
+                mois = month_labels[j]
+                product['sales'][mois] = product['sales'].get(mois, 0) + value
+                product['total'] += value
+
+        self.months = sorted(set(self.months) | set(month_labels), key=month_sort_key)
+
+    def add_stock(self, rows):
+        for code, designation, stock in rows:
+            self._product(code, designation)['stock'] = stock or 0
+
+    def sorted_products(self):
+        """(code, product) pairs, best sellers first."""
+        return sorted(self.products.items(), key=lambda kv: (-kv[1]['total'], kv[1]['designation']))
+
+    def month_totals(self):
+        return {m: sum(p['sales'].get(m, 0) for p in self.products.values()) for m in self.months}
+
+
+class RotationQueryRunner:
+    """
+    Runs the rotation analysis (rotation.sql + current stock) in a single
+    parameterized round trip and keeps the results per (product, year, months)
+    for ROTATION_CACHE_TTL seconds.
+    Once the sales warehouse is loaded, the local aggregates are used instead.
+    """
+    _instance = None
+
+    @staticmethod
+    def instance():
+        if RotationQueryRunner._instance is None:
+            RotationQueryRunner._instance = RotationQueryRunner()
+        return RotationQueryRunner._instance
+
+    def __init__(self, ttl=ROTATION_CACHE_TTL):
+        self.ttl = ttl
+        self._cache = {}  # key -> (expires_at, RotationResult)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(product_code, year, months):
+        return (product_code, str(year) if year else '', tuple(sorted(months or [])))
+
+    def _get_cached(self, key):
+        now = time.monotonic()
+        with self._lock:
+            # Evict expired entries
+            for k in [k for k, (expires_at, _) in self._cache.items() if expires_at <= now]:
+                del self._cache[k]
+            entry = self._cache.get(key)
+            return entry[1] if entry else None
+
+    def _put_cached(self, key, result):
+        with self._lock:
+            if len(self._cache) >= ROTATION_CACHE_MAX:
+                oldest = min(self._cache, key=lambda k: self._cache[k][0])
+                del self._cache[oldest]
+            self._cache[key] = (time.monotonic() + self.ttl, result)
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+    def analyze(self, product_code, year, months=None):
+        """
+        Monthly sales of a product plus its current stock.
+        Raises FileNotFoundError if rotation.sql is missing and ConnectionError
+        if XpertPharm cannot be reached.
+        """
+        key = self._key(product_code, year, months)
+        cached = self._get_cached(key)
+        if cached is not None:
+            return cached
+
+        if sales_warehouse.is_available():
+            # Local aggregates, SQL Server is not involved
+            rows = sales_warehouse.rotation_rows(key[1], key[2], codes=[product_code])
+            stock = next((q for _, _, q in sales_warehouse.stock_rows(codes=[product_code])), 0)
+            result = RotationResult(rows, stock)
+            self._put_cached(key, result)
+            return result
+
+        template = get_template("rotation.sql")
+        sql, args = template.bind(
+            EXERCICE=key[1],
+            CODE_PRODUIT=product_code,
+            MOIS=','.join(map(str, key[2]))
+        )
+        # NOCOUNT keeps row-count messages from being returned as extra result sets
+        sql = "SET NOCOUNT ON;\n" + sql + "\n" + STOCK_SQL
+
+        conn = get_xpertpharm_connection()
+        if not conn:
+            raise ConnectionError("Impossible de se connecter à XpertPharm.")
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, *args)
+            rows = [row for chunk in iter_chunks(cursor) for row in chunk]
+
+            stock = 0
+            if cursor.nextset():
+                stock_row = cursor.fetchone()
+                if stock_row:
+                    stock = stock_row[0]
+        finally:
+            conn.close()
+
+        result = RotationResult(rows, stock)
+        self._put_cached(key, result)
+        return result
+
+    def analyze_batch(self, year, months=None, codes=None, famille=None, labo=None):
+        """
+        Rotation of many products at once: a product code list, a family or a lab.
+        The monthly aggregation runs set-based for the whole selection (code
+        lists are partitioned over parallel connections) and returns a RotationMatrix.
+        """
+        codes = sorted({c for c in (codes or []) if c})
+        if not codes and not famille and not labo:
+            raise ValueError("Aucun produit à analyser.")
+
+        _, year_str, months_key = self._key(None, year, months)
+        key = ('*', tuple(codes), famille or '', labo or '', year_str, months_key)
+        cached = self._get_cached(key)
+        if cached is not None:
+            return cached
+
+        if sales_warehouse.is_available():
+            matrix = RotationMatrix()
+            matrix.add_stock(sales_warehouse.stock_rows(codes, famille, labo))
+            matrix.add_sales(sales_warehouse.rotation_rows(year_str, months_key, codes, famille, labo))
+            self._put_cached(key, matrix)
+            return matrix
+
+        template = get_template("rotation.sql")
+        mois = ','.join(map(str, months_key))
+
+        def run_partition(partition_codes):
+            sql, args = template.bind(
+                EXERCICE=year_str,
+                MOIS=mois,
+                CODES_PRODUIT=','.join(partition_codes),
+                FAMILLE_PRODUIT=famille or None,
+                LABO=labo or None
+            )
+            sql = "SET NOCOUNT ON;\n" + sql + "\n" + BATCH_STOCK_SQL
+
+            conn = get_xpertpharm_connection()
+            if not conn:
+                raise ConnectionError("Impossible de se connecter à XpertPharm.")
+            try:
+                cursor = conn.cursor()
+                cursor.execute(sql, *args)
+                # Large result: read columnar with the repeated strings dictionary-encoded
+                sales = fetch_columnar(cursor, categorical=('CODE_PRODUIT', 'PRODUIT', 'MOIS'))
+                stock = [row for chunk in iter_chunks(cursor) for row in chunk] if cursor.nextset() else []
+                return sales, stock
+            finally:
+                conn.close()
+
+        if codes:
+            partitions = [codes[i:i + BATCH_PARTITION_SIZE] for i in range(0, len(codes), BATCH_PARTITION_SIZE)]
+        else:
+            partitions = [[]]
+
+        if len(partitions) == 1:
+            results = [run_partition(partitions[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(BATCH_MAX_WORKERS, len(partitions))) as executor:
+                results = list(executor.map(run_partition, partitions))
+
+        matrix = RotationMatrix()
+        for sales, stock in results:
+            matrix.add_stock(stock)
+            matrix.add_sales_columnar(sales)
+
+        logger.info(f"Batch rotation: {len(matrix.products)} products, {len(partitions)} partition(s).")
+        self._put_cached(key, matrix)
+        return matrix
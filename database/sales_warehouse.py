@@ -0,0 +1,342 @@
+from sqlalchemy import func, extract, insert
+from database.connection import get_db, get_xpertpharm_connection
+from database.models import SalesDaily, ProductStock, SyncWatermark
+from database.sql_templates import get_template
+from config import config
+from datetime import datetime, timedelta, time as dt_time
+import json
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = 'sales_daily'
+FETCH_CHUNK = 5000
+# How long a "warehouse available" answer is trusted before asking PostgreSQL again
+AVAILABILITY_TTL = 60  # seconds
+
+# Probe on the document headers of every source of sales_daily.sql, per day.
+# A day whose signature changed (back-dated, deleted or cancelled documents) is reloaded.
+# {VTE_SINCE} / {FACTURE_SINCE} limit it to recent days (empty for the full history).
+PROBE_SQL = """
+SELECT 'VTE' AS SOURCE, CAST(DATE_VENTE AS DATE) AS JOUR, COUNT(*) AS NB,
+    SUM(CASE WHEN ETAT_VENTE = 'A' THEN 1 ELSE 0 END) AS NB_ANNULE,
+    CAST(MAX(CODE_VENTE) AS VARCHAR(50)) AS DERNIER_NUM, MAX(DATE_VENTE) AS DERNIERE_DATE
+FROM VTE_VENTE {VTE_SINCE}
+GROUP BY CAST(DATE_VENTE AS DATE)
+UNION ALL
+SELECT 'CHIFA', CAST(DATE_FACTURE AS DATE), COUNT(*), 0,
+    CAST(MAX(NUM_FACTURE) AS VARCHAR(50)), MAX(DATE_FACTURE)
+FROM dbo.FACTURE_CHIFA {FACTURE_SINCE}
+GROUP BY CAST(DATE_FACTURE AS DATE)
+UNION ALL
+SELECT 'CASNOS', CAST(DATE_FACTURE AS DATE), COUNT(*), 0,
+    CAST(MAX(NUM_FACTURE) AS VARCHAR(50)), MAX(DATE_FACTURE)
+FROM dbo.FACTURE_CASNOS {FACTURE_SINCE}
+GROUP BY CAST(DATE_FACTURE AS DATE)
+"""
+
+# Product reference and current (non expired) stock, replaced when sales changed or off-peak
+PRODUCTS_SQL = """
+SELECT
+    p.CODE_PRODUIT,
+    p.DESIGNATION_PRODUIT,
+    F.DESIGNATION AS FAMILLE,
+    p.CODE_LABO AS LABO,
+    p.REFERENCE,
+    stk.QTE_STOCK
+FROM dbo.STK_PRODUITS AS p
+LEFT JOIN BSE_PRODUIT_FAMILLE F ON F.CODE = p.CODE_FAMILLE
+LEFT JOIN (
+    SELECT CODE_PRODUIT, SUM(QUANTITE) AS QTE_STOCK
+    FROM dbo.STK_STOCK
+    WHERE (DATE_PEREMPTION > GETDATE() OR DATE_PEREMPTION IS NULL)
+    GROUP BY CODE_PRODUIT
+) AS stk ON stk.CODE_PRODUIT = p.CODE_PRODUIT
+"""
+
+MONTH_LABELS = ["Janvier", "Février", "Mars", "Avril", "Mai", "Juin",
+                "Juillet", "Août", "Septembre", "Octobre", "Novembre", "Décembre"]
+
+_available = (0, False)  # (checked_at, value)
+
+
+# ----------------------------------------------------------------------------
+# ETL (server mode)
+# ----------------------------------------------------------------------------
+
+def _insert_chunked(db, model, cursor, to_row, on_chunk=None):
+    count = 0
+    while True:
+        rows = cursor.fetchmany(FETCH_CHUNK)
+        if not rows:
+            break
+        db.execute(insert(model), [to_row(r) for r in rows])
+        count += len(rows)
+        if on_chunk is not None:
+            on_chunk(count, rows[-1])
+    return count
+
+def probe_sources(cursor, since=None):
+    """
+    (signature, last VTE_VENTE code, last document date) of the sales sources.
+    The signature maps 'SOURCE:YYYY-MM-DD' to [count, cancelled, last number];
+    with since (a date), only the days from since are probed.
+    """
+    if since is None:
+        cursor.execute(PROBE_SQL.format(VTE_SINCE="", FACTURE_SINCE=""))
+    else:
+        since = datetime.combine(since, dt_time.min)
+        # Plain comparisons on the date columns so their indexes can be used
+        cursor.execute(PROBE_SQL.format(VTE_SINCE="WHERE DATE_VENTE >= ?", FACTURE_SINCE="WHERE DATE_FACTURE >= ?"),
+                       since, since, since)
+    signature = {}
+    last_code, last_date = None, None
+    for source, day, count, cancelled, last_num, day_last_date in cursor.fetchall():
+        if day is None:
+            continue
+        signature[f"{source}:{day:%Y-%m-%d}"] = [int(count or 0), int(cancelled or 0), last_num]
+        if day_last_date is not None and (last_date is None or day_last_date > last_date):
+            last_date = day_last_date
+        if source == 'VTE' and last_num is not None and (last_code is None or last_num > last_code):
+            last_code = last_num
+    return signature, last_code, last_date
+
+def _signature_day(key):
+    return datetime.strptime(key.split(':', 1)[1], "%Y-%m-%d").date()
+
+def changed_since(old_signature, signature):
+    """Earliest day whose signature changed, None if none did."""
+    days = [key for key in set(old_signature) | set(signature) if old_signature.get(key) != signature.get(key)]
+    if not days:
+        return None
+    return min(_signature_day(key) for key in days)
+
+def run_sales_etl(force=False, allow_full=True, progress=None):
+    """
+    Copies daily per-product sales aggregates from XpertPharm into PostgreSQL.
+    Only the days from the last watermark (minus SALES_RELOAD_DAYS) are
+    extracted again, and they replace the existing aggregates; a day whose
+    probe signature changed (e.g. CHIFA/CASNOS invoices entered late) moves
+    the start back to that day. The product reference and stock table is
+    refreshed when sales were loaded, or on every allowed run.
+
+    Without allow_full (peak hours), only the reload window is probed and
+    merged into the stored signature: days changed earlier are found by the
+    next allowed run, which probes the whole history. The first load is
+    deferred to an allowed run. progress(percent, message) reports the
+    steps and batches. Returns a short summary dict.
+    """
+    progress = progress or (lambda percent, message="": None)
+    conn = get_xpertpharm_connection()
+    if not conn:
+        raise ConnectionError("Impossible de se connecter à XpertPharm.")
+
+    started = time.monotonic()
+    summary = {'sales_rows': 0, 'products': 0, 'skipped': False, 'deferred': False, 'start_date': None}
+    try:
+        cursor = conn.cursor()
+        with get_db() as db:
+            if not db:
+                raise ConnectionError("Base de données locale indisponible.")
+
+            watermark = db.get(SyncWatermark, WATERMARK_NAME)
+            old_signature = json.loads(watermark.signature) if watermark is not None and watermark.signature else None
+
+            reload_from = None
+            if old_signature is not None and watermark.last_date is not None:
+                reload_from = watermark.last_date.date() - timedelta(days=config.SALES_RELOAD_DAYS)
+
+            progress(0, "Recherche des ventes modifiées...")
+            if reload_from is None and not allow_full:
+                # Deferred below: not even probed
+                signature, last_code, last_date = None, None, None
+            elif allow_full or reload_from is None:
+                signature, last_code, last_date = probe_sources(cursor)
+            else:
+                # Peak hours: only the reload window, the older days keep their stored signature
+                recent, last_code, last_date = probe_sources(cursor, since=reload_from)
+                signature = {k: v for k, v in old_signature.items() if _signature_day(k) < reload_from}
+                signature.update(recent)
+                if last_date is None or last_date < watermark.last_date:
+                    # Nothing probed after the watermark (documents deleted): keep it
+                    last_code, last_date = last_code or watermark.last_code, watermark.last_date
+            unchanged = signature is not None and old_signature == signature and watermark.last_date == last_date
+
+            if unchanged and not force:
+                summary['skipped'] = True
+            elif reload_from is None and not allow_full:
+                # First run (or watermark without signature): the whole history waits for an allowed run
+                summary['skipped'] = summary['deferred'] = True
+            else:
+                if reload_from is None:
+                    start_date = datetime.strptime(config.SALES_HISTORY_START, "%Y-%m-%d").date()
+                else:
+                    start_date = reload_from
+                    # Only the full probe (allow_full) can find days changed before the window
+                    changed = changed_since(old_signature, signature)
+                    if changed is not None and changed < start_date:
+                        start_date = changed
+                summary['start_date'] = start_date
+                progress(5, f"Extraction des ventes depuis le {start_date:%d/%m/%Y}...")
+
+                sql, args = get_template("sales_daily.sql").bind(DATE_DEBUT=datetime.combine(start_date, dt_time.min))
+                cursor.execute("SET NOCOUNT ON;\n" + sql, *args)
+
+                # Reloaded days replace the previous aggregates (same transaction)
+                db.query(SalesDaily).filter(SalesDaily.sale_date >= start_date).delete(synchronize_session=False)
+                # Rows come ordered by day: the day reached gives the progress
+                total_days = max((datetime.now().date() - start_date).days + 1, 1)
+                def on_chunk(count, last_row):
+                    done = min(max((last_row[0] - start_date).days, 0) / total_days, 1)
+                    progress(10 + int(done * 75), f"{count} agrégats ({last_row[0]:%d/%m/%Y})")
+                summary['sales_rows'] = _insert_chunked(db, SalesDaily, cursor, lambda r: {
+                    'sale_date': r[0],
+                    'product_code': r[1],
+                    'sale_type': r[2],
+                    'quantity': float(r[3] or 0),
+                    'last_sale_at': r[4]
+                }, on_chunk)
+
+                if watermark is None:
+                    watermark = SyncWatermark(name=WATERMARK_NAME)
+                    db.add(watermark)
+                watermark.last_code = last_code
+                watermark.last_date = last_date
+                watermark.signature = json.dumps(signature, sort_keys=True)
+                watermark.updated_at = datetime.now()
+
+            now = datetime.now()
+            # Peak hours: the whole STK_STOCK is only re-aggregated when something was sold
+            if allow_full or not summary['skipped']:
+                progress(88, "Stock des produits...")
+                cursor.execute(PRODUCTS_SQL)
+                db.query(ProductStock).delete(synchronize_session=False)
+                summary['products'] = _insert_chunked(db, ProductStock, cursor, lambda r: {
+                    'product_code': r[0],
+                    'designation': r[1],
+                    'family': r[2],
+                    'lab': r[3],
+                    'reference': r[4],
+                    'quantity': float(r[5]) if r[5] is not None else None,
+                    'refreshed_at': now
+                })
+            if watermark is not None:
+                watermark.updated_at = now
+
+            db.commit()
+            progress(100, "Terminé")
+    finally:
+        conn.close()
+
+    summary['duration'] = time.monotonic() - started
+    global _available
+    _available = (0, False)
+    logger.info(f"Sales warehouse sync: {summary}")
+    return summary
+
+def rebuild_sales_history():
+    """Forgets the watermark so the next run reloads the whole history."""
+    with get_db() as db:
+        if db:
+            db.query(SyncWatermark).filter(SyncWatermark.name == WATERMARK_NAME).delete()
+            db.commit()
+    return run_sales_etl(force=True)
+
+
+# ----------------------------------------------------------------------------
+# Local analytics (all modes)
+# ----------------------------------------------------------------------------
+
+def is_available():
+    """True once the ETL has loaded the sales history into PostgreSQL."""
+    global _available
+    checked_at, value = _available
+    if time.monotonic() - checked_at < AVAILABILITY_TTL:
+        return value
+    value = False
+    try:
+        with get_db() as db:
+            if db:
+                value = db.get(SyncWatermark, WATERMARK_NAME) is not None
+    except Exception as e:
+        # Table missing on a client connected to an older server
+        logger.debug(f"Sales warehouse unavailable: {e}")
+    _available = (time.monotonic(), value)
+    return value
+
+def last_sync_time():
+    with get_db() as db:
+        if db:
+            watermark = db.get(SyncWatermark, WATERMARK_NAME)
+            return watermark.updated_at if watermark else None
+    return None
+
+def _product_filter(query, codes=None, family=None, lab=None, column=ProductStock.product_code):
+    if codes:
+        query = query.filter(column.in_(list(codes)))
+    if family:
+        query = query.filter(ProductStock.family == family)
+    if lab:
+        query = query.filter(ProductStock.lab == lab)
+    return query
+
+def rotation_rows(year, months=None, codes=None, family=None, lab=None):
+    """Same shape as rotation.sql: (CODE_PRODUIT, PRODUIT, QUANTITE_VENDU, MOIS)."""
+    month = extract('month', SalesDaily.sale_date)
+    with get_db() as db:
+        if not db:
+            return []
+        query = db.query(
+            SalesDaily.product_code,
+            ProductStock.designation,
+            func.sum(SalesDaily.quantity),
+            month
+        ).outerjoin(ProductStock, ProductStock.product_code == SalesDaily.product_code)
+        if year:
+            query = query.filter(extract('year', SalesDaily.sale_date) == int(year))
+        if months:
+            query = query.filter(month.in_([int(m) for m in months]))
+        query = _product_filter(query, codes, family, lab, SalesDaily.product_code)
+        rows = query.group_by(SalesDaily.product_code, ProductStock.designation, month)\
+                    .order_by(SalesDaily.product_code, month).all()
+
+    return [(code, designation or code, qty, MONTH_LABELS[int(m) - 1]) for code, designation, qty, m in rows]
+
+def stock_rows(codes=None, family=None, lab=None):
+    """(CODE_PRODUIT, DESIGNATION, stock) for the selected products."""
+    with get_db() as db:
+        if not db:
+            return []
+        query = db.query(ProductStock.product_code, ProductStock.designation, ProductStock.quantity)
+        return [(c, d, q or 0) for c, d, q in _product_filter(query, codes, family, lab).all()]
+
+def recent_low_stock(nb_days, stock_min, stock_max):
+    """
+    Local equivalent of manquants.sql: products sold in the last nb_days whose
+    stock is between stock_min and stock_max.
+    Returns (designation, stock, last sale, quantity sold) ordered by stock then last sale.
+    """
+    since = datetime.now().date() - timedelta(days=nb_days)
+    with get_db() as db:
+        if not db:
+            return []
+        sold = db.query(
+            SalesDaily.product_code.label('code'),
+            func.max(SalesDaily.last_sale_at).label('last_sale'),
+            func.sum(SalesDaily.quantity).label('sold')
+        ).filter(SalesDaily.sale_date >= since)\
+         .group_by(SalesDaily.product_code).subquery()
+
+        return db.query(
+            ProductStock.designation, ProductStock.quantity, sold.c.last_sale, sold.c.sold
+        ).join(sold, sold.c.code == ProductStock.product_code)\
+         .filter(ProductStock.quantity.between(stock_min, stock_max))\
+         .order_by(ProductStock.quantity.asc(), sold.c.last_sale.desc()).all()
+
+def last_sale_subquery(db):
+    """Subquery (code, last_sale) usable in joins, e.g. by the dormant products search."""
+    return db.query(
+        SalesDaily.product_code.label('code'),
+        func.max(SalesDaily.last_sale_at).label('last_sale')
+    ).group_by(SalesDaily.product_code).subquery()
@@ -0,0 +1,62 @@
+import os
+import re
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# DECLARE @NAME type = default;   -- comment
+DECLARE_PATTERN = re.compile(r"^[ \t]*DECLARE\s+@(\w+)\s+([\w()]+)\s*=\s*(.+?);", re.IGNORECASE | re.MULTILINE)
+
+
+class SqlTemplate:
+    """
+    A .sql file whose DECLARE lines act as parameters.
+    The file is read and parsed once; binding replaces the default value of the
+    requested DECLAREs with a '?' placeholder so the values travel as real ODBC
+    parameters and SQL Server sees the same batch text on every call.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'r', encoding='utf-8') as f:
+            self.text = f.read()
+        self.declares = [m.group(1) for m in DECLARE_PATTERN.finditer(self.text)]
+        self._compiled = {} # tuple of bound names -> batch text
+
+    def compile(self, names):
+        """Batch text with the given DECLAREs turned into placeholders (in file order)."""
+        key = tuple(n for n in self.declares if n in names)
+        unknown = set(names) - set(key)
+        if unknown:
+            raise KeyError(f"Paramètres inconnus dans {os.path.basename(self.path)}: {', '.join(sorted(unknown))}")
+
+        if key not in self._compiled:
+            def replace(match):
+                if match.group(1) in key:
+                    return f"DECLARE @{match.group(1)} {match.group(2)} = ?;"
+                return match.group(0)
+            self._compiled[key] = DECLARE_PATTERN.sub(replace, self.text)
+        return self._compiled[key], key
+
+    def bind(self, **params):
+        """Returns (sql, args) ready for cursor.execute(sql, *args)."""
+        sql, order = self.compile(params)
+        return sql, [params[name] for name in order]
+
+
+_templates = {}
+_lock = threading.Lock()
+
+def get_template(filename):
+    """Loads a template from the working directory (same location as before), once."""
+    with _lock:
+        template = _templates.get(filename)
+        if template is None:
+            path = os.path.join(os.getcwd(), filename)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Fichier SQL introuvable: {path}")
+            template = SqlTemplate(path)
+            _templates[filename] = template
+            logger.info(f"SQL template loaded: {filename} ({len(template.declares)} paramètres)")
+        return template
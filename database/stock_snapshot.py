@@ -0,0 +1,97 @@
+from database.batch_cache import BatchCache
+from database.connection import get_xpertpharm_connection
+from collections import namedtuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+STOCK_CACHE_TTL = 90  # seconds
+STOCK_CACHE_MAX = 5000  # products
+# Products shown in a widget during the last 5 minutes are refreshed in the background
+STOCK_REFRESH_INTERVAL_MS = 60000
+STOCK_WATCH_WINDOW = 300  # seconds
+# SQL Server accepts at most 2100 parameters per statement
+STOCK_BATCH_SIZE = 500
+
+# Current (non expired) stock of several products, one row per product having stock
+SNAPSHOT_SQL = """
+SELECT
+    ST.[CODE_PRODUIT],
+    SUM(ST.[QUANTITE]) AS QUANTITE,
+    MIN(ST.[DATE_PEREMPTION]) AS PREMIERE_PEREMPTION,
+    COUNT(*) AS NB_LOTS
+FROM [XPERTPHARM5_7091_BOURENANE].[dbo].[STK_STOCK] ST
+WHERE ST.[CODE_PRODUIT] IN ({placeholders})
+    AND ST.[QUANTITE] > 0
+    AND (ST.[DATE_PEREMPTION] > GETDATE() OR ST.[DATE_PEREMPTION] IS NULL)
+GROUP BY ST.[CODE_PRODUIT]
+"""
+
+# Stock of one product: quantity, earliest expiry date (None if no lot has one) and number of lots
+StockSnapshot = namedtuple('StockSnapshot', ['quantity', 'earliest_expiry', 'lot_count'])
+NO_STOCK = StockSnapshot(0, None, 0)
+
+
+def get_stock_snapshots(product_codes, batch_size=STOCK_BATCH_SIZE):
+    """
+    StockSnapshot of several products, one grouped IN query per batch_size
+    codes on a single connection. Products without stock are absent from the
+    result. Returns None if XpertPharm cannot be reached.
+    """
+    product_codes = list(dict.fromkeys(c for c in product_codes if c))
+    if not product_codes:
+        return {}
+
+    conn = get_xpertpharm_connection()
+    if not conn:
+        return None
+
+    try:
+        cursor = conn.cursor()
+        results = {}
+        for i in range(0, len(product_codes), batch_size):
+            batch = product_codes[i:i + batch_size]
+            cursor.execute(SNAPSHOT_SQL.format(placeholders=", ".join("?" for _ in batch)), *batch)
+            for code, quantity, earliest_expiry, lot_count in cursor.fetchall():
+                results[code] = StockSnapshot(float(quantity or 0), earliest_expiry, int(lot_count or 0))
+        return results
+    except Exception as e:
+        logger.error(f"Error querying XpertPharm stock snapshot: {e}")
+        return None
+    finally:
+        conn.close()
+
+def format_quantity(snapshot):
+    return f"{snapshot.quantity:g}" if snapshot else ""
+
+def format_tooltip(snapshot):
+    if not snapshot or not snapshot.lot_count:
+        return "Aucun stock"
+    expiry = snapshot.earliest_expiry.strftime('%m/%y') if snapshot.earliest_expiry else "-"
+    return f"{snapshot.lot_count} lot(s), première péremption {expiry}"
+
+
+class StockSnapshotService(BatchCache):
+    """
+    Current XpertPharm stock per product code, shared by the widgets.
+    A widget calls prefetch() with the codes it shows, reads get() and updates
+    its stock column on loaded; the codes it keeps showing are refreshed in
+    the background before they expire.
+    """
+    _instance = None
+
+    @staticmethod
+    def instance():
+        if StockSnapshotService._instance is None:
+            StockSnapshotService._instance = StockSnapshotService()
+        return StockSnapshotService._instance
+
+    def __init__(self):
+        super().__init__(ttl=STOCK_CACHE_TTL, max_entries=STOCK_CACHE_MAX,
+                         refresh_interval_ms=STOCK_REFRESH_INTERVAL_MS, watch_window=STOCK_WATCH_WINDOW)
+
+    def fetch(self, product_codes):
+        return get_stock_snapshots(product_codes)
+
+    def default(self, product_code):
+        return NO_STOCK
@@ -0,0 +1,84 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+from database.connection import get_xpertpharm_connection
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rows per fetchmany call: large enough to amortize round trips,
+# small enough for the first rows to show up immediately
+FETCH_CHUNK = 1000
+
+
+def iter_chunks(cursor, size=FETCH_CHUNK):
+    """Yields lists of plain tuples from an executed cursor, size rows at a time."""
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            break
+        yield [tuple(row) for row in rows]
+
+def fetch_tuples(cursor, size=FETCH_CHUNK):
+    """(columns, rows as tuples) for an executed cursor, without building a dict per row."""
+    columns = [column[0] for column in cursor.description]
+    rows = []
+    for chunk in iter_chunks(cursor, size):
+        rows.extend(chunk)
+    return columns, rows
+
+def stream_query(sql, params=(), size=FETCH_CHUNK):
+    """
+    Runs a query on its own XpertPharm connection and yields (columns, chunk)
+    pairs. The connection is closed when the generator is exhausted or closed.
+    """
+    conn = get_xpertpharm_connection()
+    if not conn:
+        raise ConnectionError("Impossible de se connecter à XpertPharm.")
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, *params)
+        columns = [column[0] for column in cursor.description]
+        for chunk in iter_chunks(cursor, size):
+            yield columns, chunk
+    finally:
+        conn.close()
+
+
+class StreamQueryThread(QThread):
+    """
+    Streams an XpertPharm query to the UI: 'columns' is emitted once, then
+    'chunk' for every batch of rows so tables can fill while the server is
+    still sending, and 'done' with the total row count.
+    """
+    columns = pyqtSignal(object) # list of column names
+    chunk = pyqtSignal(object)   # list of tuples
+    done = pyqtSignal(int)
+    error = pyqtSignal(str)
+
+    def __init__(self, sql, params=(), size=FETCH_CHUNK):
+        super().__init__()
+        self.sql = sql
+        self.params = list(params)
+        self.size = size
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        total = 0
+        columns_sent = False
+        try:
+            stream = stream_query(self.sql, self.params, self.size)
+            for columns, rows in stream:
+                if self._cancelled:
+                    stream.close()
+                    break
+                if not columns_sent:
+                    self.columns.emit(columns)
+                    columns_sent = True
+                total += len(rows)
+                self.chunk.emit(rows)
+            self.done.emit(total)
+        except Exception as e:
+            logger.error(f"Streaming query error: {e}")
+            self.error.emit(str(e))
@@ -0,0 +1,276 @@
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
+from database.connection import get_db
+from database.models import SyncRun
+from config import config
+from datetime import datetime, timedelta
+import random
+import socket
+import logging
+
+logger = logging.getLogger(__name__)
+
+# How often due tasks are checked
+TICK_INTERVAL_MS = 60000
+# Delay before the first runs, so startup and the first scans are not slowed down
+STARTUP_DELAY_MIN = 2
+
+
+DEFAULT_OFF_PEAK_START = "20:00"
+DEFAULT_OFF_PEAK_END = "08:00"
+
+
+def parse_hour(value):
+    """'HH:MM' -> minutes since midnight, None if not a valid time of day."""
+    hours, sep, minutes = (value or "").strip().partition(':')
+    if not sep or not hours.isdigit() or not minutes.isdigit():
+        return None
+    hours, minutes = int(hours), int(minutes)
+    if hours > 23 or minutes > 59:
+        return None
+    return hours * 60 + minutes
+
+def _parse_hour(value, default):
+    minute = parse_hour(value)
+    if minute is None:
+        logger.warning(f"Invalid off-peak hour '{value}', using {default}.")
+        minute = parse_hour(default)
+    return minute
+
+def in_off_peak(now=None):
+    """True when now is inside the SYNC_OFF_PEAK_START..SYNC_OFF_PEAK_END window (may span midnight)."""
+    now = now or datetime.now()
+    minute = now.hour * 60 + now.minute
+    start = _parse_hour(config.SYNC_OFF_PEAK_START, DEFAULT_OFF_PEAK_START)
+    end = _parse_hour(config.SYNC_OFF_PEAK_END, DEFAULT_OFF_PEAK_END)
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+class SyncTask:
+    """
+    A periodic job.
+    run(progress) executes in the worker thread and returns (summary, payload);
+    progress(percent, message) reports how far it got. apply(payload), if
+    given, runs afterwards in the GUI thread.
+    """
+
+    def __init__(self, name, label, interval_min, run, apply=None, off_peak=False):
+        self.name = name
+        self.label = label
+        self.interval_min = interval_min
+        self.run = run
+        self.apply = apply
+        self.off_peak = off_peak
+        self.next_run = None
+        self.last_run = None
+        self.last_status = None
+        self.last_details = ""
+        self.manual = False  # current run was requested with run_now()
+
+    def schedule_next(self, now=None):
+        now = now or datetime.now()
+        spread = self.interval_min * config.SYNC_JITTER_PCT / 100
+        self.next_run = now + timedelta(minutes=self.interval_min + random.uniform(-spread, spread))
+
+
+class SyncWorkerThread(QThread):
+    progress = pyqtSignal(str, int, str)           # task name, percent, message
+    completed = pyqtSignal(str, bool, str, object) # task name, success, summary, payload
+
+    def __init__(self, task):
+        super().__init__()
+        self.task = task
+
+    def run(self):
+        try:
+            summary, payload = self.task.run(lambda percent, message="": self.progress.emit(self.task.name, percent, message))
+            self.completed.emit(self.task.name, True, summary or "", payload)
+        except Exception as e:
+            logger.error(f"Sync task {self.task.name} failed: {e}")
+            self.completed.emit(self.task.name, False, str(e), None)
+
+
+class SyncScheduler(QObject):
+    """
+    Keeps nomenclature, product cache, sales warehouse and invoice data fresh
+    and raises the near-expiry alerts on the server-mode instance. Tasks run one at a time in a worker thread,
+    with jittered intervals. Heavy tasks wait for the off-peak window.
+    Every run is recorded in sync_runs.
+    """
+    _instance = None
+    task_started = pyqtSignal(str)
+    task_progress = pyqtSignal(str, int, str)
+    task_finished = pyqtSignal(str, bool, str)
+
+    @staticmethod
+    def instance():
+        if SyncScheduler._instance is None:
+            SyncScheduler._instance = SyncScheduler()
+        return SyncScheduler._instance
+
+    def __init__(self):
+        super().__init__()
+        self.tasks = {}
+        self.running = None
+        self._queue = []   # task names requested manually
+        self._worker = None
+        self._run_id = None
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.tick)
+        self._register_default_tasks()
+
+    def _register_default_tasks(self):
+        from database.sales_warehouse import run_sales_etl
+        from database.nomenclature_sync import reconcile, load_xp_catalog
+        from database.cache import ProductCache, fetch_products_dataframe
+        from database.invoice_cache import InvoiceReconciler
+        from database.expiry_index import run_expiry_alerts
+
+        def sales(progress):
+            # The full history (first load, old days changed) is only reloaded off-peak or on request
+            allow_full = in_off_peak() or self.tasks['sales'].manual
+            summary = run_sales_etl(allow_full=allow_full, progress=progress)
+            deferred = " Rechargement complet reporté aux heures creuses." if summary['deferred'] else ""
+            if summary['skipped']:
+                return ("Aucune nouvelle vente." if not deferred else deferred.strip()), None
+            return f"{summary['sales_rows']} agrégats, {summary['products']} produits.{deferred}", None
+
+        def product_cache(progress):
+            progress(0, "Chargement des produits...")
+            df = fetch_products_dataframe(
+                progress=lambda count, total: progress(int(count * 95 / total) if total else 0, f"{count} / {total} produits"))
+            if df.empty:
+                raise RuntimeError("Aucun produit reçu de XpertPharm.")
+            progress(100, "Terminé")
+            return f"{len(df)} produits", df
+
+        def nomenclature(progress):
+            progress(0, "Chargement du catalogue XpertPharm...")
+            catalog = load_xp_catalog()
+            progress(50, "Comparaison avec la nomenclature...")
+            result = reconcile(apply_renames=True, catalog=catalog)
+            progress(100, "Terminé")
+            return f"{len(result.renamed)} renommés, {len(result.obsolete)} obsolètes", None
+
+        def invoices(progress):
+            return "Rafraîchissement lancé", None
+
+        def expiry_alerts(progress):
+            progress(0, "Recherche des lots proches de la péremption...")
+            count = run_expiry_alerts(config.EXPIRY_ALERT_DAYS, config.EXPIRY_URGENT_DAYS)
+            return f"{count} produit(s) signalé(s)", None
+
+        self.add_task(SyncTask('sales', "Historique des ventes", config.SALES_SYNC_INTERVAL_MIN, sales))
+        self.add_task(SyncTask('product_cache', "Cache produits", config.SYNC_CACHE_INTERVAL_MIN, product_cache,
+                               apply=ProductCache.instance().set_products))
+        # Runs after the cache task in the same window, so it compares against fresh names
+        self.add_task(SyncTask('nomenclature', "Noms de la nomenclature", config.SYNC_NOMENCLATURE_INTERVAL_MIN,
+                               nomenclature, off_peak=True))
+        # The reconciler loads in its own thread, only the trigger goes through the scheduler
+        self.add_task(SyncTask('invoices', "Factures récentes", config.SYNC_INVOICES_INTERVAL_MIN, invoices,
+                               apply=lambda _: InvoiceReconciler.instance().refresh()))
+        # Raises notifications shown on the server station, from the expiry summary only
+        self.add_task(SyncTask('expiry_alerts', "Alertes de péremption", config.EXPIRY_ALERT_INTERVAL_MIN, expiry_alerts))
+
+    def add_task(self, task):
+        self.tasks[task.name] = task
+
+    def start(self):
+        first_run = datetime.now() + timedelta(minutes=STARTUP_DELAY_MIN)
+        for i, task in enumerate(self.tasks.values()):
+            # Staggered first runs
+            task.next_run = first_run + timedelta(minutes=i)
+        self._timer.start(TICK_INTERVAL_MS)
+        logger.info(f"Sync scheduler started ({len(self.tasks)} tasks).")
+
+    def run_now(self, name):
+        """Queues a task for immediate execution (ignores the off-peak window)."""
+        if name in self.tasks and name not in self._queue and name != self.running:
+            self._queue.append(name)
+            self.tick()
+
+    def tick(self):
+        if self.running:
+            return
+
+        now = datetime.now()
+        if self._queue:
+            task = self.tasks[self._queue.pop(0)]
+            task.manual = True
+            self._start(task)
+            return
+
+        off_peak = in_off_peak(now)
+        due = [t for t in self.tasks.values() if t.next_run and t.next_run <= now and (off_peak or not t.off_peak)]
+        if due:
+            task = min(due, key=lambda t: t.next_run)
+            task.manual = False
+            self._start(task)
+
+    def _start(self, task):
+        self.running = task.name
+        self._run_id = self._record_start(task.name)
+        self.task_started.emit(task.name)
+
+        self._worker = SyncWorkerThread(task)
+        self._worker.progress.connect(self.task_progress.emit)
+        self._worker.completed.connect(self._on_completed)
+        self._worker.start()
+
+    def _on_completed(self, name, success, summary, payload):
+        task = self.tasks[name]
+        if success and task.apply is not None:
+            try:
+                task.apply(payload)
+            except Exception as e:
+                success, summary = False, str(e)
+                logger.error(f"Sync task {name} apply failed: {e}")
+
+        task.last_run = datetime.now()
+        task.last_status = 'success' if success else 'error'
+        task.last_details = summary
+        task.schedule_next()
+        self._record_finish(self._run_id, success, summary)
+
+        self.running = None
+        self.task_finished.emit(name, success, summary)
+        # Chain the next due task without waiting for the next tick
+        QTimer.singleShot(0, self.tick)
+
+    def _record_start(self, name):
+        try:
+            with get_db() as db:
+                if db:
+                    run = SyncRun(task=name, status='running', machine_name=socket.gethostname())
+                    db.add(run)
+                    db.commit()
+                    return run.id
+        except Exception as e:
+            logger.error(f"Failed to record sync run {name}: {e}")
+        return None
+
+    def _record_finish(self, run_id, success, summary):
+        if run_id is None:
+            return
+        try:
+            with get_db() as db:
+                if db:
+                    run = db.get(SyncRun, run_id)
+                    if run:
+                        run.finished_at = datetime.now()
+                        run.status = 'success' if success else 'error'
+                        run.details = (summary or "")[:500]
+                        db.commit()
+        except Exception as e:
+            logger.error(f"Failed to record sync run result: {e}")
+
+
+def get_sync_history(limit=20):
+    """Latest runs, most recent first, as (task, started_at, finished_at, status, details)."""
+    with get_db() as db:
+        if not db:
+            return []
+        rows = db.query(SyncRun.task, SyncRun.started_at, SyncRun.finished_at, SyncRun.status, SyncRun.details)\
+                 .order_by(SyncRun.started_at.desc()).limit(limit).all()
+        return [tuple(r) for r in rows]
@@ -1,10 +1,16 @@
 import sys
-from PyQt6.QtWidgets import QApplication, QDialog, QSplashScreen
-from PyQt6.QtGui import QPixmap, QPainter, QColor
-from PyQt6.QtCore import Qt
-from ui.main_window import MainWindow
-from database.connection import init_db
+from utils import startup_profiler
+startup_profiler.start()
+
 import logging
+with startup_profiler.measure("PyQt6", category='import'):
+    from PyQt6.QtWidgets import QApplication, QDialog, QSplashScreen
+    from PyQt6.QtGui import QPixmap, QPainter, QColor
+    from PyQt6.QtCore import Qt
+with startup_profiler.measure("ui.main_window", category='import'):
+    from ui.main_window import MainWindow
+with startup_profiler.measure("database.connection", category='import'):
+    from database.connection import init_db
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO)
@@ -84,19 +90,34 @@ def main():
 
     # Initialize Database
     logger.info("Initializing database...")
-    init_db()
+    with startup_profiler.measure("init_db"):
+        init_db()
 
     # Start Product Cache Loader
-    from database.cache import ProductCache
-    ProductCache.instance().load_cache()
+    with startup_profiler.measure("Lancement du cache produits"):
+        from database.cache import ProductCache
+        ProductCache.instance().load_cache()
+    
+    # Background sync of sales, product cache, nomenclature and invoices (server only)
+    if is_server_mode():
+        from database.sync_scheduler import SyncScheduler
+        SyncScheduler.instance().start()
     
     splash.showMessage("Démarrage de l'interface...", Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignCenter, Qt.GlobalColor.black)
     app.processEvents()
     
     # Start Main Window directly (Default to Agent)
-    window = MainWindow(splash)
+    with startup_profiler.measure("MainWindow"):
+        window = MainWindow(splash)
     window.show()
     splash.finish(window)
+    startup_profiler.mark("Fenêtre affichée, scan possible")
+    startup_profiler.report()
+    window.start_idle_tab_loading()
+
+    # Heavy modules (pyodbc, numpy, pandas, reportlab) load in the background now that the window is usable
+    from utils.lazy_import import warm_up
+    warm_up()
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -0,0 +1,47 @@
+from database.connection import pg_engine, get_db
+from database.models import Base, ExpirySummary
+from database.expiry_index import rebuild_summary
+from sqlalchemy import text
+import logging
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Same indexes as Product.__table_args__, for databases created before they existed
+INDEX_SQL = [
+    "CREATE INDEX IF NOT EXISTS ix_products_expiry_date ON products (expiry_date);",
+    "CREATE INDEX IF NOT EXISTS ix_products_location_expiry ON products (location_id, expiry_date);",
+    "CREATE INDEX IF NOT EXISTS ix_products_code_expiry ON products (code, expiry_date);",
+]
+
+def migrate():
+    if not pg_engine:
+        logger.error("No PostgreSQL engine available.")
+        return
+
+    try:
+        logger.info("Creating expiry_summary table...")
+        Base.metadata.create_all(bind=pg_engine, tables=[ExpirySummary.__table__])
+
+        with pg_engine.connect() as conn:
+            for sql in INDEX_SQL:
+                conn.execute(text(sql))
+            conn.commit()
+        logger.info("Expiry indexes ready.")
+
+        # Also repairs the summary after products were changed outside the application
+        with get_db() as db:
+            rebuild_summary(db)
+            db.commit()
+            count = db.query(ExpirySummary).count()
+        with pg_engine.connect() as conn:
+            conn.execute(text("ANALYZE products;"))
+            conn.execute(text("ANALYZE expiry_summary;"))
+            conn.commit()
+        logger.info(f"expiry_summary rebuilt: {count} location/product rows.")
+    except Exception as e:
+        logger.error(f"Error migrating expiry index: {e}")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,65 @@
+from database.connection import pg_engine
+from sqlalchemy import text
+import logging
+
+# Setup Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Prepares missing_items for report_missing (database/missing_items.py):
+# report_count column, one active row per product, unique partial index.
+# Safe to run several times.
+STEPS = [
+    ("Adding report_count column",
+     "ALTER TABLE missing_items ADD COLUMN IF NOT EXISTS report_count INTEGER DEFAULT 1;"),
+    ("Normalizing NULL flags and counters",
+     "UPDATE missing_items SET is_deleted = COALESCE(is_deleted, false), report_count = COALESCE(report_count, 1) "
+     "WHERE is_deleted IS NULL OR report_count IS NULL;"),
+    # Duplicates: the latest active report of a product keeps the summed counters, the others are soft deleted
+    ("Merging duplicate active reports", """
+WITH ranked AS (
+    SELECT id,
+           row_number() OVER (PARTITION BY product_code ORDER BY reported_at DESC NULLS LAST, id DESC) AS rn,
+           SUM(report_count) OVER (PARTITION BY product_code) AS reports,
+           SUM(COALESCE(quantity, 1)) OVER (PARTITION BY product_code) AS total_quantity
+    FROM missing_items
+    WHERE is_deleted = false
+),
+kept AS (
+    UPDATE missing_items m
+    SET report_count = r.reports, quantity = r.total_quantity
+    FROM ranked r
+    WHERE m.id = r.id AND r.rn = 1 AND r.reports > m.report_count
+)
+UPDATE missing_items m
+SET is_deleted = true
+FROM ranked r
+WHERE m.id = r.id AND r.rn > 1;
+"""),
+    ("Creating unique index ux_missing_items_active_code",
+     "CREATE UNIQUE INDEX IF NOT EXISTS ux_missing_items_active_code ON missing_items (product_code) WHERE is_deleted = false;"),
+    ("Creating index ix_missing_items_active_code_date",
+     "CREATE INDEX IF NOT EXISTS ix_missing_items_active_code_date ON missing_items (product_code, reported_at) WHERE is_deleted = false;"),
+    ("Analyzing missing_items", "ANALYZE missing_items;"),
+]
+
+def migrate():
+    if not pg_engine:
+        logger.error("No PostgreSQL engine available.")
+        return
+
+    with pg_engine.connect() as conn:
+        try:
+            for title, sql in STEPS:
+                logger.info(f"{title}...")
+                result = conn.execute(text(sql))
+                if result.rowcount and result.rowcount > 0:
+                    logger.info(f"  {result.rowcount} row(s)")
+            conn.commit()
+            logger.info("missing_items migrated successfully.")
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error migrating missing_items: {e}")
+
+if __name__ == "__main__":
+    migrate()
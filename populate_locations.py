@@ -1,6 +1,6 @@
 from database.connection import get_db
 from database.models import Location
-from utils.barcode_utils import generate_location_barcode
+from utils import location_codec
 
 def populate_locations():
     with get_db() as db:
@@ -10,30 +10,16 @@ def populate_locations():
         # 1. A to Z with floors 1 to 8 (A1..A8, B1..B8, ..., Z1..Z8)
         # 2. DD, II, JJ, KK with floors 1 to 8
         
-        # Standard A-Z
-        letters = [chr(i) for i in range(65, 91)] # A-Z
-        
-        # Special letters
-        special_letters = ["DD", "II", "JJ", "KK"]
-        
-        all_letters = letters + special_letters
+        # Standard A-Z then the special rows
+        labels = location_codec.all_labels(floors=range(1, 9)) # 1 to 8
+        barcodes = location_codec.encode_many(labels)
+        existing = {label for (label,) in db.query(Location.label).all()}
         
         count = 0
-        for letter in all_letters:
-            for floor in range(1, 9): # 1 to 8
-                label = f"{letter}{floor}"
-                barcode = generate_location_barcode(label)
-                
-                if not barcode:
-                    print(f"Skipping invalid label: {label}")
-                    continue
-                    
-                # Check if exists
-                existing = db.query(Location).filter(Location.label == label).first()
-                if not existing:
-                    loc = Location(label=label, barcode=barcode)
-                    db.add(loc)
-                    count += 1
+        for label, barcode in zip(labels, barcodes):
+            if label not in existing:
+                db.add(Location(label=label, barcode=barcode))
+                count += 1
         
         try:
             db.commit()
@@ -13,6 +13,7 @@ DECLARE @TYPE_PRODUIT int = NULL;                -- Type de produit spécifique
 DECLARE @REFERENCE varchar(32) = '';             -- Référence produit
 DECLARE @DCI varchar(32) = '';                   -- Code DCI
 DECLARE @CODE_PRODUIT varchar(32) = NULL;        -- Code produit spécifique
+DECLARE @CODES_PRODUIT varchar(max) = '';        -- Liste de codes produit (ex: 'P1,P2,P3')
 DECLARE @MOIS varchar(100) = '';                 -- Mois spécifiques (ex: '1,2,3' pour Jan-Mar)
 DECLARE @SPECIALITE varchar(32) = NULL;          -- Spécialité
 DECLARE @TAG_PRODUIT varchar(max) = '';          -- Tags produit
@@ -54,6 +55,7 @@ FROM (
         AND (STKP.REFERENCE = @REFERENCE OR ISNULL(@REFERENCE, '') = '')
         AND (STKP.CODE_DCI = @DCI OR ISNULL(@DCI, '') = '')
         AND (STKP.CODE_PRODUIT = @CODE_PRODUIT OR ISNULL(@CODE_PRODUIT, '') = '')
+        AND (STKP.CODE_PRODUIT IN (SELECT * FROM SplitString(@CODES_PRODUIT)) OR ISNULL(@CODES_PRODUIT, '') = '')
         AND (MONTH(VTE.DATE_VENTE) IN (SELECT * FROM SplitString(@MOIS)) OR ISNULL(@MOIS, '') = '')
         AND (STKP.SPECIALITE = @SPECIALITE OR ISNULL(@SPECIALITE, '') = '')
 
@@ -86,6 +88,7 @@ FROM (
         AND (STKP.REFERENCE = @REFERENCE OR ISNULL(@REFERENCE, '') = '')
         AND (STKP.CODE_DCI = @DCI OR ISNULL(@DCI, '') = '')
         AND (STKP.CODE_PRODUIT = @CODE_PRODUIT OR ISNULL(@CODE_PRODUIT, '') = '')
+        AND (STKP.CODE_PRODUIT IN (SELECT * FROM SplitString(@CODES_PRODUIT)) OR ISNULL(@CODES_PRODUIT, '') = '')
         AND (MONTH(VTE.DATE_VENTE) IN (SELECT * FROM SplitString(@MOIS)) OR ISNULL(@MOIS, '') = '')
         AND (STKP.SPECIALITE = @SPECIALITE OR ISNULL(@SPECIALITE, '') = '')
 
@@ -116,6 +119,7 @@ FROM (
         AND (STKP.REFERENCE = @REFERENCE OR ISNULL(@REFERENCE, '') = '')
         AND (STKP.CODE_DCI = @DCI OR ISNULL(@DCI, '') = '')
         AND (STKP.CODE_PRODUIT = @CODE_PRODUIT OR ISNULL(@CODE_PRODUIT, '') = '')
+        AND (STKP.CODE_PRODUIT IN (SELECT * FROM SplitString(@CODES_PRODUIT)) OR ISNULL(@CODES_PRODUIT, '') = '')
         AND (MONTH(VTE.DATE_VENTE) IN (SELECT * FROM SplitString(@MOIS)) OR ISNULL(@MOIS, '') = '')
         AND (STKP.SPECIALITE = @SPECIALITE OR ISNULL(@SPECIALITE, '') = '')
 
@@ -142,6 +146,7 @@ FROM (
         AND (STKP.REFERENCE = @REFERENCE OR ISNULL(@REFERENCE, '') = '')
         AND (STKP.CODE_DCI = @DCI OR ISNULL(@DCI, '') = '')
         AND (STKP.CODE_PRODUIT = @CODE_PRODUIT OR ISNULL(@CODE_PRODUIT, '') = '')
+        AND (STKP.CODE_PRODUIT IN (SELECT * FROM SplitString(@CODES_PRODUIT)) OR ISNULL(@CODES_PRODUIT, '') = '')
         AND (MONTH(FCS.DATE_FACTURE) IN (SELECT * FROM SplitString(@MOIS)) OR ISNULL(@MOIS, '') = '')
         AND (STKP.SPECIALITE = @SPECIALITE OR ISNULL(@SPECIALITE, '') = '')
 
@@ -172,6 +177,7 @@ FROM (
         AND (STKP.REFERENCE = @REFERENCE OR ISNULL(@REFERENCE, '') = '')
         AND (STKP.CODE_DCI = @DCI OR ISNULL(@DCI, '') = '')
         AND (STKP.CODE_PRODUIT = @CODE_PRODUIT OR ISNULL(@CODE_PRODUIT, '') = '')
+        AND (STKP.CODE_PRODUIT IN (SELECT * FROM SplitString(@CODES_PRODUIT)) OR ISNULL(@CODES_PRODUIT, '') = '')
         AND (MONTH(FCH.DATE_FACTURE) IN (SELECT * FROM SplitString(@MOIS)) OR ISNULL(@MOIS, '') = '')
         AND (STKP.SPECIALITE = @SPECIALITE OR ISNULL(@SPECIALITE, '') = '')
 ) av
@@ -0,0 +1,112 @@
+-- ============================================================================
+-- Extraction des ventes journalières par produit (entrepôt local PostgreSQL)
+-- Mêmes sources que rotation.sql, agrégées par jour / produit / type de vente
+-- Sélectionne: DATE_JOUR, CODE_PRODUIT, TYPE_VENTE, SUM(QUANTITE_VENDU), DERNIERE_VENTE
+-- ============================================================================
+
+-- Paramètres configurables
+DECLARE @DATE_DEBUT datetime = NULL;             -- Ventes à partir de cette date (NULL = tout l'historique)
+
+-- ============================================================================
+-- Requête principale
+-- ============================================================================
+
+SELECT
+    CAST(av.DATE_VENTE AS DATE) AS DATE_JOUR,
+    av.CODE_PRODUIT,
+    ISNULL(RTRIM(av.TYPE_VENTE), '') AS TYPE_VENTE,
+    SUM(av.QUANTITE_VENDU) AS QUANTITE_VENDU,
+    MAX(av.DATE_VENTE) AS DERNIERE_VENTE
+FROM (
+    -- VENTE comptoir / retour comptoir (pas en saisie) && VENTE CVM / bon de livraison / bon de retour
+    SELECT
+        VTE_D.CODE_PRODUIT,
+        VTE.DATE_VENTE AS DATE_VENTE,
+        (VTE_D.QUANTITE * VTE.SENS_DOC) AS QUANTITE_VENDU,
+        VTE.TYPE_VENTE
+    FROM dbo.VTE_VENTE_DETAIL VTE_D
+    INNER JOIN VTE_VENTE VTE ON VTE.CODE_VENTE = VTE_D.CODE_VENTE
+    WHERE
+        (
+            (VTE.TYPE_VENTE IN ('VC', 'RC') AND TYPE_VALIDATION <> 0)
+            OR
+            (VTE.TYPE_VENTE IN ('VM', 'BL', 'BR'))
+        )
+        AND (VTE.DATE_VENTE >= @DATE_DEBUT OR @DATE_DEBUT IS NULL)
+
+    UNION ALL
+
+    -- VENTE instance CHIFA
+    SELECT
+        VTE_D.CODE_PRODUIT,
+        VTE.DATE_VENTE AS DATE_VENTE,
+        ((VTE_D.QUANTITE - ISNULL(di.QTE_ARCHIVE, 0)) * VTE.SENS_DOC) AS QUANTITE_VENDU,
+        VTE.TYPE_VENTE
+    FROM dbo.VTE_VENTE_DETAIL VTE_D
+    INNER JOIN VTE_VENTE VTE ON VTE.CODE_VENTE = VTE_D.CODE_VENTE
+    LEFT JOIN View_VTE_INSTANCE_DETAIL di ON VTE_D.CODE_DETAIL = di.CODE_DETAIL
+    WHERE
+        (
+            VTE.TYPE_VENTE IN ('VI')
+            AND VTE.ETAT_VENTE <> 'A'
+            AND (VTE_D.QUANTITE - ISNULL(di.QTE_ARCHIVE, 0)) > 0
+        )
+        AND (VTE.DATE_VENTE >= @DATE_DEBUT OR @DATE_DEBUT IS NULL)
+
+    UNION ALL
+
+    -- VENTE facture de vente non associée au bon de livraison
+    SELECT
+        VTE_D.CODE_PRODUIT,
+        VTE.DATE_VENTE AS DATE_VENTE,
+        (VTE_D.QUANTITE * VTE.SENS_DOC) AS QUANTITE_VENDU,
+        VTE.TYPE_VENTE
+    FROM dbo.VTE_VENTE_DETAIL VTE_D
+    INNER JOIN VTE_VENTE VTE ON VTE.CODE_VENTE = VTE_D.CODE_VENTE
+    WHERE
+        (
+            VTE.TYPE_VENTE = 'FV'
+            AND ISNULL(CODE_ORIGINE, '') NOT IN (SELECT CODE_VENTE FROM VTE_VENTE WHERE TYPE_VENTE = 'BL')
+        )
+        AND (VTE.DATE_VENTE >= @DATE_DEBUT OR @DATE_DEBUT IS NULL)
+
+    UNION ALL
+
+    -- PHARMNOS - CASNOS
+    SELECT
+        FCS_D.CODE_PRODUIT,
+        FCS.DATE_FACTURE AS DATE_VENTE,
+        FCS_D.QUANTITE AS QUANTITE_VENDU,
+        'FPN' AS TYPE_VENTE
+    FROM dbo.DETAIL_FACTURE_CASNOS FCS_D
+    INNER JOIN dbo.FACTURE_CASNOS FCS ON FCS.NUM_FACTURE = FCS_D.NUM_FACTURE
+    WHERE
+        (FCS.DATE_FACTURE >= @DATE_DEBUT OR @DATE_DEBUT IS NULL)
+
+    UNION ALL
+
+    -- CHIFA - CNAS / CASNOS / HORS CHIFA
+    SELECT
+        FCH_D.CODE_PRODUIT,
+        FCH.DATE_FACTURE AS DATE_VENTE,
+        FCH_D.QUANTITE AS QUANTITE_VENDU,
+        CASE SUBSTRING(FCH.CENTRE, 1, 1)
+            WHEN '1' THEN 'FCN'
+            WHEN '2' THEN 'FCS'
+            WHEN '9' THEN 'FHC'
+        END AS TYPE_VENTE
+    FROM dbo.DETAIL_FACTURE_CHIFA FCH_D
+    INNER JOIN dbo.FACTURE_CHIFA FCH ON FCH.NUM_FACTURE = FCH_D.NUM_FACTURE
+    WHERE
+        (FCH.DATE_FACTURE >= @DATE_DEBUT OR @DATE_DEBUT IS NULL)
+) av
+GROUP BY CAST(av.DATE_VENTE AS DATE), av.CODE_PRODUIT, ISNULL(RTRIM(av.TYPE_VENTE), '')
+ORDER BY DATE_JOUR;
+
+-- ============================================================================
+-- Notes :
+-- - Exécutée par l'ETL (database/sales_warehouse.py) en mode serveur,
+--   uniquement si la signature journalière des ventes / factures CHIFA / CASNOS a changé
+-- - @DATE_DEBUT = jour du dernier watermark moins une marge de recharge (ou début
+--   du plus ancien jour modifié), les jours rechargés remplacent les agrégats existants
+-- ============================================================================
@@ -1,6 +1,5 @@
 from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLabel, QComboBox, QDialogButtonBox
-from database.connection import get_db
-from database.models import Location
+from database.location_registry import LocationRegistry
 
 class ChangeLocationDialog(QDialog):
     def __init__(self, current_location_id, parent=None):
@@ -24,12 +23,9 @@ class ChangeLocationDialog(QDialog):
         self.setLayout(layout)
 
     def load_locations(self, current_id):
-        with get_db() as db:
-            if db:
-                locations = db.query(Location).order_by(Location.label).all()
-                for loc in locations:
-                    if loc.id != current_id:
-                        self.location_combo.addItem(loc.label, loc.id)
+        for loc in LocationRegistry.instance().all():
+            if loc.id != current_id:
+                self.location_combo.addItem(loc.label, loc.id)
 
     def accept(self):
         self.selected_location_id = self.location_combo.currentData()
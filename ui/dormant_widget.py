@@ -8,6 +8,7 @@ from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont
 from database.connection import get_db
 from database.models import Nomenclature, Product
+from database import sales_warehouse
 from sqlalchemy import func, text
 import logging
 from datetime import datetime, timedelta
@@ -37,6 +38,7 @@ class DormantWidget(QWidget):
         self.field_combo.addItem("Dernier Approvisionnement", "last_supply_date")
         self.field_combo.addItem("Dernière Recherche", "last_search_date")
         self.field_combo.addItem("Dernière Modification", "last_edit_date")
+        self.field_combo.addItem("Dernière Vente", "last_sale")
         self.field_combo.setFixedWidth(200)
         top_layout.addWidget(self.field_combo)
         
@@ -142,19 +144,32 @@ class DormantWidget(QWidget):
                 # Select Nomenclature where field <= cutoff OR field IS NULL
                 # Join Product to count locations
                 
-                # Dynamic field selection
-                target_field = getattr(Nomenclature, field_name)
-                
                 from sqlalchemy import or_
                 
+                # Dynamic field selection
+                if field_name == "last_sale":
+                    # Last sale from the local sales warehouse aggregates
+                    if not sales_warehouse.is_available():
+                        QMessageBox.warning(self, "Attention", "L'historique des ventes n'est pas encore synchronisé.")
+                        return
+                    last_sale = sales_warehouse.last_sale_subquery(db)
+                    target_field = last_sale.c.last_sale
+                else:
+                    last_sale = None
+                    target_field = getattr(Nomenclature, field_name)
+                
                 query = db.query(
                     Nomenclature.code,
                     Nomenclature.designation,
                     target_field,
                     func.count(Product.id).label("location_count")
-                ).outerjoin(Product, Nomenclature.code == Product.code)\
-                 .filter(or_(target_field <= cutoff_date, target_field == None))\
-                 .group_by(Nomenclature.id)\
+                ).outerjoin(Product, Nomenclature.code == Product.code)
+                
+                if last_sale is not None:
+                    query = query.outerjoin(last_sale, last_sale.c.code == Nomenclature.code)
+                
+                query = query.filter(or_(target_field <= cutoff_date, target_field == None))\
+                 .group_by(Nomenclature.id, target_field)\
                  .having(func.count(Product.id) > 0)\
                  .order_by(target_field.asc().nullsfirst()) # Nulls (Never) first
                 
@@ -5,13 +5,18 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QTimer, QEvent
 from PyQt6.QtGui import QColor
 from database.connection import get_db
-from database.models import Product, SupplyList, SupplyListItem, Nomenclature, MissingItem
+from database.models import Product, SupplyList, SupplyListItem, Nomenclature
+from database.missing_items import report_missing
 from database.cache import ProductCache
+from database.picking import get_picks
+from utils.pick_route import sort_items
 from sqlalchemy.orm import joinedload
 import logging
-import pandas as pd
+from utils.lazy_import import lazy_import
 from datetime import datetime
 
+pd = lazy_import('pandas')
+
 logger = logging.getLogger(__name__)
 
 class BackgroundDelegate(QStyledItemDelegate):
@@ -305,38 +310,23 @@ class EntryWidget(QWidget):
         # Check if it's a Catalog Item (Nomenclature) -> Add to Missing
         # Now it's a dict with type='catalog'
         if isinstance(item_data, dict) and item_data.get("type") == "catalog":
-            with get_db() as db:
-                if not db: return False
-                try:
-                    code = item_data.get("code")
-                    designation = item_data.get("designation")
-                    
-                    existing = db.query(MissingItem).filter(MissingItem.product_code == code).first()
-                    if existing:
-                        existing.reported_at = datetime.now()
-                        msg = f"Le produit '{designation}' était déjà dans la liste des manquants. Date mise à jour."
-                    else:
-                        # Ensure Nomenclature exists locally (sync if needed)
-                        nom = db.query(Nomenclature).filter(Nomenclature.code == code).first()
-                        if not nom:
-                            nom = Nomenclature(code=code, designation=designation, last_edit_date=datetime.now())
-                            db.add(nom)
-                            db.commit() # Commit to be safe
-                        
-                        new_missing = MissingItem(
-                            product_code=code,
-                            source="Saisie",
-                            reported_at=datetime.now()
-                        )
-                        db.add(new_missing)
-                        msg = f"Le produit '{designation}' a été ajouté aux manquants."
-                    
-                    db.commit()
-                    QMessageBox.information(self, "Succès", msg)
-                    return True
-                except Exception as e:
-                    QMessageBox.critical(self, "Erreur", f"Erreur lors de l'ajout aux manquants: {e}")
+            try:
+                code = item_data.get("code")
+                designation = item_data.get("designation")
+                
+                # Creates the nomenclature row if needed, merges into an existing report
+                report = report_missing(code, "Saisie", designation=designation)
+                if not report:
                     return False
+                if report.inserted:
+                    msg = f"Le produit '{designation}' a été ajouté aux manquants."
+                else:
+                    msg = f"Le produit '{designation}' était déjà dans la liste des manquants. Date mise à jour."
+                QMessageBox.information(self, "Succès", msg)
+                return True
+            except Exception as e:
+                QMessageBox.critical(self, "Erreur", f"Erreur lors de l'ajout aux manquants: {e}")
+                return False
 
         # If we are here, it's a Product (Stock Item) -> Add to Supply List
         if not self.current_supply_list:
@@ -370,38 +360,33 @@ class EntryWidget(QWidget):
             if not ok:
                 return False
 
-            # Logic for Item 2: "l'element suivant dans la liste des résultats... qui porte la meme designation"
-            item2 = None
-            if row + 1 < self.results_table.rowCount():
-                next_item = self.results_table.item(row + 1, 0).data(Qt.ItemDataRole.UserRole)
-                next_item_designation = next_item.nomenclature.designation if next_item.nomenclature else "Unknown"
-                if next_item_designation == item1_designation:
-                    item2 = next_item
+            # Item 1 / Item 2: the two lots of the product to take first (FEFO), whatever the search order
+            picks = get_picks(db, item1.code)
+            if not picks:
+                QMessageBox.warning(self, "Attention", f"Plus aucun lot de '{item1_designation}' en stock (supprimé depuis la recherche ?).")
+                return False
+            pick1 = picks[0]
+            pick2 = picks[1] if len(picks) > 1 else None
 
             # Add to DB
             
             # Fix DetachedInstanceError: Merge the object into the current session
             if self.current_supply_list:
                 self.current_supply_list = db.merge(self.current_supply_list)
-            
-            loc1 = item1.location.label if item1.location else ""
-            loc2 = item2.location.label if item2 and item2.location else ""
-            
-            item2_designation = item2.nomenclature.designation if item2 and item2.nomenclature else None
 
             list_item = SupplyListItem(
                 supply_list_id=self.current_supply_list.id,
-                product_code_1=item1.code,
+                product_code_1=pick1.code,
                 designation_1=item1_designation,
-                location_1=loc1,
-                barcode_1=item1.barcode,
-                expiry_date_1=item1.expiry_date,
+                location_1=pick1.location_label or "",
+                barcode_1=pick1.barcode,
+                expiry_date_1=pick1.expiry_date,
                 
-                product_code_2=item2.code if item2 else None,
-                designation_2=item2_designation,
-                location_2=loc2 if item2 else None,
-                barcode_2=item2.barcode if item2 else None,
-                expiry_date_2=item2.expiry_date if item2 else None,
+                product_code_2=pick2.code if pick2 else None,
+                designation_2=item1_designation if pick2 else None,
+                location_2=(pick2.location_label or "") if pick2 else None,
+                barcode_2=pick2.barcode if pick2 else None,
+                expiry_date_2=pick2.expiry_date if pick2 else None,
                 
                 quantity=qty
             )
@@ -563,7 +548,8 @@ class EntryWidget(QWidget):
         with get_db() as db:
             if not db: return
             self.current_supply_list = db.merge(self.current_supply_list)
-            items = self.current_supply_list.items
+            # Walking order through the shelves rather than insertion order
+            items = sort_items(self.current_supply_list.items)
         
         if not items:
             QMessageBox.warning(self, "Attention", "La liste est vide.")
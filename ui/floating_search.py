@@ -3,7 +3,8 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QLineEdit, QCompleter,
 from PyQt6.QtCore import Qt, QStringListModel
 from PyQt6.QtGui import QColor, QFont
 from database.connection import get_db, get_xpertpharm_connection
-from database.models import Nomenclature, MissingItem, Product
+from database.models import Nomenclature, Product
+from database.missing_items import report_missing
 from database.cache import ProductCache
 from ui.quantity_dialog import QuantityDialog
 from datetime import datetime
@@ -174,30 +175,9 @@ class FloatingSearchWidget(QWidget):
             
             # Add to MissingItem
             try:
-                with get_db() as db:
-                    if not db: return
-                    
-                    # 1. Sync Nomenclature
-                    nom = db.query(Nomenclature).filter(Nomenclature.code == product_data['code']).first()
-                    if not nom:
-                        nom = Nomenclature(
-                            code=product_data['code'],
-                            designation=product_data['designation'],
-                            last_edit_date=datetime.now()
-                        )
-                        db.add(nom)
-                        db.commit() # Commit to get it ready for relationship
-                    
-                    # 2. Add Missing Item
-                    new_item = MissingItem(
-                        product_code=product_data['code'],
-                        source="Comptoir",
-                        quantity=qty,
-                        reported_at=datetime.now()
-                    )
-                    db.add(new_item)
-                    db.commit()
-                    
+                # Nomenclature row and missing report in one statement, quantities add up
+                report = report_missing(product_data['code'], "Comptoir", designation=product_data['designation'], quantity=qty)
+                if report:
                     QMessageBox.information(self, "Succès", f"Produit ajouté aux manquants (Qté: {qty}).")
                     self.search_input.clear()
             except Exception as e:
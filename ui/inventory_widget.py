@@ -2,44 +2,54 @@ from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
     QTableWidget, QTableWidgetItem, QPushButton, QMessageBox, QHeaderView, QComboBox, QCheckBox, QAbstractItemView, QDialog, QStyle, QGroupBox
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QThread
-from PyQt6.QtGui import QIcon
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtGui import QIcon, QColor
 from database.connection import get_db, get_product_from_xpertpharm
-from database.models import Location, Product, Nomenclature, MissingItem
+from database.models import Location, Product, Nomenclature
+from database.missing_items import upsert_missing
+from database.invoice_cache import InvoiceReconciler
+from database.location_registry import LocationRegistry
+from database.expiry_index import rebuild_summary
 from utils.barcode_utils import is_location_barcode, parse_location_barcode
 from ui.dialogs import ChangeLocationDialog
+from ui.location_view_model import LocationViewModel
+from utils.speech import SpeechService, PRIORITY_HIGH, PRIORITY_NORMAL
 from sqlalchemy.orm import Session
 import logging
-import pyttsx3
 from datetime import datetime
-import pandas as pd
+from utils.lazy_import import lazy_import
 import os
 
-logger = logging.getLogger(__name__)
+pd = lazy_import('pandas')
 
-class TTSThread(QThread):
-    def __init__(self, text):
-        super().__init__()
-        self.text = text
+logger = logging.getLogger(__name__)
 
-    def run(self):
-        try:
-            engine = pyttsx3.init()
-            engine.say(self.text)
-            engine.runAndWait()
-            engine.stop()
-            del engine
-        except Exception as e:
-            # Suppress TTS errors as they're not critical
-            pass
+# Phrases spoken on nearly every scan, pre-synthesized with the location labels
+COMMON_PHRASES = [
+    "Suivant",
+    "Emplacement non trouvé.",
+    "Ce produit existe déjà dans cet emplacement.",
+    "Code à barre non reconu.",
+    "Veuillez d'abord sélectionner un emplacement.",
+]
 
 class InventoryWidget(QWidget):
     def __init__(self):
         super().__init__()
         self.current_location = None
         self.cleaning_mode = False
+        self._row_items = {} # product id -> designation item of its table row
+        
+        # Location content is kept in memory and updated by deltas
+        self.view_model = LocationViewModel()
+        self.view_model.reset.connect(self.on_model_reset)
+        self.view_model.row_inserted.connect(self.on_row_inserted)
+        self.view_model.row_removed.connect(self.on_row_removed)
+        self.view_model.row_updated.connect(self.on_row_updated)
+        
         self.init_ui()
         self.load_locations()
+        LocationRegistry.instance().changed.connect(self.load_locations)
         self.check_active_cleaning_session()
 
     def check_active_cleaning_session(self):
@@ -124,37 +134,47 @@ class InventoryWidget(QWidget):
 
         self.setLayout(layout)
 
-    def speak(self, text):
-        self.tts_thread = TTSThread(text)
-        self.tts_thread.start()
+    def speak(self, text, priority=PRIORITY_NORMAL):
+        SpeechService.instance().speak(text, priority)
 
     def show_error(self, title, message):
-        self.speak(message)
+        self.speak(message, PRIORITY_HIGH)
         QMessageBox.warning(self, title, message)
 
     def load_locations(self):
+        """Fills the combo from the location registry, keeping the current location selected if it still exists."""
+        previous_id = self.current_location.id if self.current_location else None
+        locations = LocationRegistry.instance().all()
+
         self.location_combo.blockSignals(True)
         self.location_combo.clear()
-        with get_db() as db:
-            if db:
-                locations = db.query(Location).order_by(Location.label).all()
-                for loc in locations:
-                    self.location_combo.addItem(loc.label, loc.id)
+        for loc in locations:
+            self.location_combo.addItem(loc.label, loc.id)
         self.location_combo.blockSignals(False)
         
-        # Select first item by default
-        if self.location_combo.count() > 0:
+        # Pre-synthesize what is spoken during scanning
+        SpeechService.instance().preload(COMMON_PHRASES + [loc.label for loc in locations])
+        
+        index = self.location_combo.findData(previous_id) if previous_id is not None else -1
+        if index >= 0:
+            # Same location, only its label may have changed
+            self.location_combo.blockSignals(True)
+            self.location_combo.setCurrentIndex(index)
+            self.location_combo.blockSignals(False)
+            self.current_location = LocationRegistry.instance().by_id(previous_id)
+        elif self.location_combo.count() > 0:
+            # Select first item by default
             self.location_combo.setCurrentIndex(0)
             self.on_location_changed()
 
     def on_location_changed(self):
         location_id = self.location_combo.currentData()
         if location_id:
-            with get_db() as db:
-                if db:
-                    self.current_location = db.query(Location).filter(Location.id == location_id).first()
-                    self.load_products()
-                    self.scan_input.setFocus()
+            location = LocationRegistry.instance().by_id(location_id)
+            if location:
+                self.current_location = location
+                self.load_products()
+                self.scan_input.setFocus()
 
     def handle_scan(self):
         barcode = self.scan_input.text().strip()
@@ -171,21 +191,20 @@ class InventoryWidget(QWidget):
     def process_location_scan(self, barcode):
         # Requirement: "si le code barre saisie / scanné commence par 000 et a une longueur de texte de 7, on lance une requete de recherche dans la table locations si on le trouve pas on lance un message d'erreur"
         
-        with get_db() as db:
-            if not db: return
-            location = db.query(Location).filter(Location.barcode == barcode).first()
-            
-            if not location:
-                self.show_error("Erreur", "Emplacement non trouvé.")
-                return
+        location = LocationRegistry.instance().by_barcode(barcode)
+        if not location:
+            self.show_error("Erreur", "Emplacement non trouvé.")
+            return
 
-            # Select in Combo
-            index = self.location_combo.findData(location.id)
-            if index >= 0:
-                self.location_combo.setCurrentIndex(index)
-            
-            self.current_location = location
-            self.speak(location.label)
+        # Select in Combo
+        index = self.location_combo.findData(location.id)
+        changed = index >= 0 and index != self.location_combo.currentIndex()
+        if changed:
+            self.location_combo.setCurrentIndex(index) # Reloads through on_location_changed
+        
+        self.current_location = location
+        self.speak(location.label)
+        if not changed:
             self.load_products()
 
     def process_product_scan(self, barcode):
@@ -196,15 +215,22 @@ class InventoryWidget(QWidget):
         with get_db() as db:
             if not db: return
             
-            # Check if product already exists in this location
-            existing = db.query(Product).filter(Product.barcode == barcode, Product.location_id == self.current_location.id).first()
-            
+            # Check if product already exists in this location (database: other stations may have scanned/deleted it)
+            existing = db.query(Product.id).filter(
+                Product.location_id == self.current_location.id,
+                Product.barcode == barcode
+            ).first()
+            shown = self.view_model.find_by_barcode(barcode)
+            if (shown['id'] if shown else None) != (existing.id if existing else None):
+                # The view is stale: changed from another station
+                self.load_products()
+
             if self.cleaning_mode:
                 if existing:
                     # Mark as present (cleaning=0)
-                    existing.cleaning = False
+                    db.query(Product).filter(Product.id == existing.id).update({Product.cleaning: False})
                     db.commit()
-                    self.load_products() # Refresh to show status change if any visual indicator
+                    self.view_model.set_cleaning(existing.id, False)
                     # Suppress warnings
                     return
                 # If not existing in cleaning mode, we proceed to add it (assuming it was missed before)
@@ -232,7 +258,7 @@ class InventoryWidget(QWidget):
                     newer_count = check_newer_barcodes(barcode, product_code, created_on)
                     if newer_count > 0:
                         warning_msg = f"Attention ! {newer_count} code à barre plus récent détecté pour ce produit."
-                        self.speak(warning_msg)
+                        self.speak(warning_msg, PRIORITY_HIGH)
                         QMessageBox.warning(self, "Avertissement", warning_msg)
 
             # Create/Update Nomenclature
@@ -260,6 +286,15 @@ class InventoryWidget(QWidget):
             
             try:
                 db.add(new_product)
+                db.flush()
+                new_row = LocationViewModel.make_row(
+                    new_product.id,
+                    product_data['CODE_PRODUIT'],
+                    product_data['designation'],
+                    barcode,
+                    product_data['expiry_date'],
+                    self.current_location.id
+                )
                 db.commit()
                 
                 # Calculate delay (time since product creation in XpertPharm)
@@ -288,66 +323,86 @@ class InventoryWidget(QWidget):
                 from database.connection import log_event
                 log_event('INVENTORY_ADD', details=product_data['CODE_PRODUIT'], source='InventoryWidget', delay=delay)
                 
-                self.load_products()
+                InvoiceReconciler.instance().mark_shelved(barcode)
+                
+                self.view_model.insert(new_row)
                 self.speak("Suivant")
             except Exception as e:
                 db.rollback()
                 self.show_error("Erreur", f"Erreur lors de l'ajout du produit: {e}")
 
     def load_products(self):
+        """Full reload of the current location. Scans, moves and deletions update the view by deltas instead."""
+        self.view_model.load(self.current_location.id if self.current_location else None)
+
+    def on_model_reset(self):
         self.table.setRowCount(0)
-        if not self.current_location:
-            return
+        self._row_items = {}
+        for row in self.view_model.rows():
+            self.on_row_inserted(row)
 
-        with get_db() as db:
-            if not db: return
-            products = db.query(Product).join(Nomenclature).filter(Product.location_id == self.current_location.id).all()
-            
-            self.table.setRowCount(len(products))
-            for row, prod in enumerate(products):
-                designation = prod.nomenclature.designation if prod.nomenclature else "Unknown"
-                
-                # Create designation item and store product data for printing
-                designation_item = QTableWidgetItem(designation)
-                
-                # Store product data for barcode printing
-                product_data = {
-                    'designation': designation,
-                    'barcode': prod.barcode,
-                    'expiry_date': prod.expiry_date
-                }
-                designation_item.setData(Qt.ItemDataRole.UserRole, product_data)
-                
-                # Set items in table
-                self.table.setItem(row, 0, designation_item)
-                self.table.setItem(row, 1, QTableWidgetItem(str(prod.expiry_date)))
-                self.table.setItem(row, 2, QTableWidgetItem(prod.barcode))
-                
-                # Actions Widget with Icons
-                actions_widget = QWidget()
-                actions_layout = QHBoxLayout()
-                actions_layout.setContentsMargins(0, 0, 0, 0)
-                actions_layout.setSpacing(4)
-                actions_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                
-                # Move Button
-                move_btn = QPushButton()
-                move_btn.setObjectName("TableActionBtn")
-                move_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_FileDialogListView))
-                move_btn.setToolTip("Déplacer")
-                move_btn.clicked.connect(lambda checked, p=prod: self.move_product(p))
-                actions_layout.addWidget(move_btn)
-                
-                # Delete Button
-                del_btn = QPushButton()
-                del_btn.setObjectName("TableActionBtn")
-                del_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_TrashIcon))
-                del_btn.setToolTip("Supprimer")
-                del_btn.clicked.connect(lambda checked, p_id=prod.id: self.delete_product(p_id))
-                actions_layout.addWidget(del_btn)
-                
-                actions_widget.setLayout(actions_layout)
-                self.table.setCellWidget(row, 3, actions_widget)
+    def on_row_inserted(self, row):
+        r = self.table.rowCount()
+        self.table.insertRow(r)
+        
+        # Designation item also carries the row data (used for barcode printing)
+        designation_item = QTableWidgetItem(row['designation'])
+        designation_item.setData(Qt.ItemDataRole.UserRole, row)
+        self._row_items[row['id']] = designation_item
+        
+        # Set items in table
+        self.table.setItem(r, 0, designation_item)
+        self.table.setItem(r, 1, QTableWidgetItem(str(row['expiry_date'])))
+        self.table.setItem(r, 2, QTableWidgetItem(row['barcode']))
+        self.apply_cleaning_style(r, row)
+        
+        # Actions Widget with Icons
+        actions_widget = QWidget()
+        actions_layout = QHBoxLayout()
+        actions_layout.setContentsMargins(0, 0, 0, 0)
+        actions_layout.setSpacing(4)
+        actions_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        
+        # Move Button
+        move_btn = QPushButton()
+        move_btn.setObjectName("TableActionBtn")
+        move_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_FileDialogListView))
+        move_btn.setToolTip("Déplacer")
+        move_btn.clicked.connect(lambda checked, p=row: self.move_product(p))
+        actions_layout.addWidget(move_btn)
+        
+        # Delete Button
+        del_btn = QPushButton()
+        del_btn.setObjectName("TableActionBtn")
+        del_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_TrashIcon))
+        del_btn.setToolTip("Supprimer")
+        del_btn.clicked.connect(lambda checked, p_id=row['id']: self.delete_product(p_id))
+        actions_layout.addWidget(del_btn)
+        
+        actions_widget.setLayout(actions_layout)
+        self.table.setCellWidget(r, 3, actions_widget)
+
+    def on_row_removed(self, product_id):
+        item = self._row_items.pop(product_id, None)
+        if item is not None:
+            self.table.removeRow(item.row())
+
+    def on_row_updated(self, row):
+        item = self._row_items.get(row['id'])
+        if item is not None:
+            self.apply_cleaning_style(item.row(), row)
+
+    def apply_cleaning_style(self, r, row):
+        # Products not yet re-scanned during a cleaning session are shown in red
+        pending = self.cleaning_mode and row['cleaning']
+        for col in range(3):
+            cell = self.table.item(r, col)
+            if cell:
+                if pending:
+                    cell.setForeground(QColor("#c62828"))
+                else:
+                    cell.setData(Qt.ItemDataRole.ForegroundRole, None)
+                cell.setToolTip("À vérifier (nettoyage)" if pending else "")
 
     def delete_product(self, product_id):
         reply = QMessageBox.question(self, "Confirmer", "Voulez-vous vraiment supprimer ce produit de l'emplacement ?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
@@ -370,16 +425,9 @@ class InventoryWidget(QWidget):
                         # It was the last one
                         designation = prod.nomenclature.designation if prod.nomenclature else "Inconnu"
                         
-                        # Check if already in missing (just in case)
-                        existing_missing = db.query(MissingItem).filter(MissingItem.product_code == code).first()
-                        if not existing_missing:
-                            new_missing = MissingItem(
-                                product_code=code,
-                                source="Inventaire",
-                                reported_at=datetime.now()
-                            )
-                            db.add(new_missing)
-                            self.show_error("Info", f"Le produit '{designation}' était le dernier en stock. Il a été ajouté aux manquants.")
+                        # Same transaction as the deletion
+                        upsert_missing(db, code, "Inventaire")
+                        self.show_error("Info", f"Le produit '{designation}' était le dernier en stock. Il a été ajouté aux manquants.")
                     
                     db.commit()
                     
@@ -387,16 +435,17 @@ class InventoryWidget(QWidget):
                     from database.connection import log_event
                     log_event('PRODUCT_DELETED', details=f"ID: {product_id}, Code: {code}", source='InventoryWidget')
                     
-                    self.load_products()
+                    self.view_model.remove(product_id)
 
     def move_product(self, product):
-        dialog = ChangeLocationDialog(product.location_id, self)
+        # product is a row dict of the location view model
+        dialog = ChangeLocationDialog(product['location_id'], self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             new_loc_id = dialog.selected_location_id
             if new_loc_id:
                 with get_db() as db:
                     if db:
-                        prod_db = db.query(Product).filter(Product.id == product.id).first()
+                        prod_db = db.query(Product).filter(Product.id == product['id']).first()
                         if prod_db:
                             prod_db.location_id = new_loc_id
                             
@@ -409,9 +458,9 @@ class InventoryWidget(QWidget):
                             
                             # Log Event
                             from database.connection import log_event
-                            log_event('PRODUCT_MOVED', details=f"ID: {product.id} -> LocID: {new_loc_id}", source='InventoryWidget')
+                            log_event('PRODUCT_MOVED', details=f"ID: {product['id']} -> LocID: {new_loc_id}", source='InventoryWidget')
                             
-                            self.load_products() # Refresh
+                            self.view_model.remove(product['id'])
 
     def start_cleaning(self):
         reply = QMessageBox.question(self, "Confirmation", "Êtes-vous sûr de vouloir lancer un nettoyage de stock ?\nTous les produits seront marqués comme 'à vérifier'.", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
@@ -424,6 +473,7 @@ class InventoryWidget(QWidget):
                     db.commit()
                     self.cleaning_mode = True
                     self.update_cleaning_ui()
+                    self.load_products() # Every row is now pending verification
                     QMessageBox.information(self, "Info", "Nettoyage lancé. Scannez les produits présents.")
                 except Exception as e:
                     db.rollback()
@@ -495,6 +545,8 @@ class InventoryWidget(QWidget):
                 try:
                     # Delete products with cleaning=True
                     deleted_count = db.query(Product).filter(Product.cleaning == True).delete()
+                    # Bulk delete bypasses the flush hook maintaining the expiry summary
+                    rebuild_summary(db)
                     db.commit()
                     
                     # Log Event
@@ -520,6 +572,10 @@ class InventoryWidget(QWidget):
             self.scan_input.setStyleSheet("") # Reset
             self.btn_start_cleaning.setEnabled(True)
             self.btn_verify_cleaning.setEnabled(False)
+        
+        # Refresh row highlighting
+        for item in self._row_items.values():
+            self.apply_cleaning_style(item.row(), item.data(Qt.ItemDataRole.UserRole))
 
     def show_context_menu(self, position):
         """Show context menu for barcode printing"""
@@ -568,113 +624,13 @@ class InventoryWidget(QWidget):
                 self.print_product_barcodes(products)
     
     def print_product_barcodes(self, products):
-        """Print barcode labels for products"""
-        try:
-            from PyQt6.QtPrintSupport import QPrinter, QPrintDialog
-            from PyQt6.QtGui import QPainter, QPageSize, QPageLayout, QPixmap, QFont
-            from PyQt6.QtCore import QSizeF, QRectF, QMarginsF
-            from io import BytesIO
-            
-            try:
-                import barcode
-                from barcode.writer import ImageWriter
-            except ImportError:
-                QMessageBox.critical(
-                    self,
-                    "Module manquant",
-                    "Le module 'python-barcode' n'est pas installé.\n\n"
-                    "Installez-le avec: pip install python-barcode pillow"
-                )
-                return
-            
-            # Create printer with custom page size (40mm x 20mm in landscape)
-            printer = QPrinter(QPrinter.PrinterMode.HighResolution)
-            
-            # Set custom page size for barcode labels (40mm width x 20mm height)
-            page_size = QPageSize(QSizeF(40, 20), QPageSize.Unit.Millimeter)
-            printer.setPageSize(page_size)
-            printer.setPageOrientation(QPageLayout.Orientation.Landscape)
-            printer.setPageMargins(QMarginsF(0, 0, 0, 0), QPageLayout.Unit.Millimeter)
-            
-            # Show native Windows print dialog
-            print_dialog = QPrintDialog(printer, self)
-            if print_dialog.exec() != QDialog.DialogCode.Accepted:
-                return
-            
-            # Force custom page size again after dialog
-            printer.setPageSize(page_size)
-            printer.setPageOrientation(QPageLayout.Orientation.Landscape)
-            printer.setPageMargins(QMarginsF(0, 0, 0, 0), QPageLayout.Unit.Millimeter)
-            
-            # Start printing
-            painter = QPainter()
-            if not painter.begin(printer):
-                QMessageBox.critical(self, "Erreur", "Impossible de démarrer l'impression.")
-                return
-            
-            for idx, product in enumerate(products):
-                if idx > 0:
-                    printer.newPage()
-                
-                # Get page dimensions
-                page_rect = printer.pageRect(QPrinter.Unit.DevicePixel)
-                width = page_rect.width()
-                height = page_rect.height()
-                
-                # Draw product name at top (10pt)
-                painter.setFont(QFont("Arial", 10, QFont.Weight.Bold))
-                painter.drawText(QRectF(0, 0, width, height * 0.2), Qt.AlignmentFlag.AlignCenter, product['designation'])
-                
-                # Generate barcode using python-barcode (without text)
-                CODE128 = barcode.get_barcode_class('code128')
-                barcode_obj = CODE128(product['barcode'], writer=ImageWriter())
-                
-                # Render barcode to PNG in memory (without text)
-                buffer = BytesIO()
-                barcode_obj.write(buffer, options={
-                    'module_width': 0.25,
-                    'module_height': 8,
-                    'font_size': 0,
-                    'text_distance': 0,
-                    'quiet_zone': 1,
-                    'write_text': False
-                })
-                buffer.seek(0)
-                
-                # Convert to QPixmap
-                pixmap = QPixmap()
-                pixmap.loadFromData(buffer.read())
-                
-                # Draw barcode bars (30% of height)
-                barcode_height = height * 0.3
-                barcode_width = width * 0.95
-                x_offset = (width - barcode_width) / 2
-                y_offset = height * 0.25
-                
-                painter.drawPixmap(QRectF(x_offset, y_offset, barcode_width, barcode_height), pixmap, QRectF(pixmap.rect()))
-                
-                # Bottom section: Expiry date (left) and Barcode number (right)
-                painter.setFont(QFont("Arial", 8))
-                
-                # Expiry date on the left (MM/YY format)
-                expiry_text = ""
-                if product.get('expiry_date'):
-                    try:
-                        if isinstance(product['expiry_date'], str):
-                            expiry_text = product['expiry_date']
-                        else:
-                            expiry_text = product['expiry_date'].strftime('%m/%y')
-                    except:
-                        expiry_text = str(product.get('expiry_date', ''))
-                
-                painter.drawText(QRectF(0, height * 0.7, width * 0.4, height * 0.3), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, expiry_text)
-                
-                # Barcode number on the right
-                painter.drawText(QRectF(width * 0.6, height * 0.7, width * 0.4, height * 0.3), Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, product['barcode'])
-            
-            painter.end()
-            QMessageBox.information(self, "Succès", f"{len(products)} étiquette(s) imprimée(s).")
-            
-        except Exception as e:
-            logger.error(f"Error printing barcodes: {e}")
-            QMessageBox.critical(self, "Erreur", f"Erreur lors de l'impression: {e}")
+        """Queue barcode labels for products (printed in the background)"""
+        from utils.label_renderer import ask_label_printer, format_expiry
+        from utils.print_spooler import PrintSpooler, KIND_PRODUCT
+
+        printer_name = ask_label_printer(self)
+        if printer_name is None:
+            return
+
+        labels = [{'designation': p['designation'], 'barcode': p['barcode'], 'expiry_date': format_expiry(p.get('expiry_date'))} for p in products]
+        PrintSpooler.instance().submit(KIND_PRODUCT, labels, printer_name, title=f"{len(labels)} étiquette(s) produit")
@@ -5,8 +5,7 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QColor
-from database.connection import get_latest_invoices, get_invoice_details, get_db
-from database.models import Product, Location
+from database.invoice_cache import InvoiceReconciler
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,8 +22,15 @@ class BackgroundDelegate(QStyledItemDelegate):
 class InvoiceWidget(QWidget):
     def __init__(self):
         super().__init__()
+        self.current_code_doc = None
+        self.reconciler = InvoiceReconciler.instance()
+        self.reconciler.invoices_loaded.connect(self.populate_invoices)
+        self.reconciler.invoice_updated.connect(self.on_invoice_updated)
         self.init_ui()
-        self.load_invoices()
+        if self.reconciler.invoices:
+            self.populate_invoices()
+        else:
+            self.load_invoices()
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -43,8 +49,8 @@ class InvoiceWidget(QWidget):
 
         # Invoices Table
         self.invoices_table = QTableWidget()
-        self.invoices_table.setColumnCount(3)
-        self.invoices_table.setHorizontalHeaderLabels(["Date Saisie", "Fournisseur", "Total TTC"])
+        self.invoices_table.setColumnCount(4)
+        self.invoices_table.setHorizontalHeaderLabels(["Date Saisie", "Fournisseur", "Total TTC", "Rangé"])
         self.invoices_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
         self.invoices_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.invoices_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
@@ -72,10 +78,16 @@ class InvoiceWidget(QWidget):
         self.setLayout(layout)
 
     def load_invoices(self):
+        # Prefetches invoices and details in the background, see populate_invoices
+        self.reconciler.refresh()
+
+    def populate_invoices(self):
+        self.invoices_table.blockSignals(True)
         self.invoices_table.setRowCount(0)
         self.details_table.setRowCount(0)
+        self.current_code_doc = None
         
-        invoices = get_latest_invoices()
+        invoices = self.reconciler.invoices
         self.invoices_table.setRowCount(len(invoices))
         
         for row, inv in enumerate(invoices):
@@ -92,6 +104,29 @@ class InvoiceWidget(QWidget):
             
             # Store CODE_DOC for details
             self.invoices_table.item(row, 0).setData(Qt.ItemDataRole.UserRole, inv.get('CODE_DOC'))
+            
+            # Completion (shelved lines)
+            self.invoices_table.setItem(row, 3, QTableWidgetItem(self.completion_text(inv.get('CODE_DOC'))))
+        
+        self.invoices_table.blockSignals(False)
+
+    def completion_text(self, code_doc):
+        completion = self.reconciler.completion(code_doc)
+        if not completion:
+            return ""
+        shelved, total = completion
+        if total == 0:
+            return "-"
+        return f"{shelved * 100 // total}% ({shelved}/{total})"
+
+    def on_invoice_updated(self, code_doc):
+        for row in range(self.invoices_table.rowCount()):
+            if self.invoices_table.item(row, 0).data(Qt.ItemDataRole.UserRole) == code_doc:
+                self.invoices_table.item(row, 3).setText(self.completion_text(code_doc))
+                break
+        
+        if code_doc == self.current_code_doc:
+            self.load_details(code_doc)
 
     def on_invoice_selected(self):
         selected_items = self.invoices_table.selectedItems()
@@ -105,26 +140,13 @@ class InvoiceWidget(QWidget):
             self.load_details(code_doc)
 
     def load_details(self, code_doc):
+        self.current_code_doc = code_doc
         self.details_table.setRowCount(0)
-        details = get_invoice_details(code_doc)
+        # Served from the reconciler cache, the shelved status is kept up to date there
+        details = self.reconciler.get_details(code_doc)
         
         self.details_table.setRowCount(len(details))
         
-        # Pre-fetch local products to check existence
-        # We need to check by barcode (CODE_BARRE_LOT)
-        barcodes = [d.get('CODE_BARRE_LOT') for d in details if d.get('CODE_BARRE_LOT')]
-        existing_barcodes = set()
-        
-        if barcodes:
-            # Clean barcodes (strip whitespace)
-            barcodes = [str(b).strip() for b in barcodes]
-            
-            with get_db() as db:
-                if db:
-                    # Query Product table where barcode is in the list
-                    products = db.query(Product.barcode).filter(Product.barcode.in_(barcodes)).all()
-                    existing_barcodes = {p.barcode for p in products}
-        
         for row, item in enumerate(details):
             # Produit (DESIGNATION_PRODUIT)
             designation = str(item.get('DESIGNATION_PRODUIT', ''))
@@ -149,7 +171,7 @@ class InvoiceWidget(QWidget):
             
             # Check if product exists locally
             barcode = str(item.get('CODE_BARRE_LOT', '')).strip()
-            if barcode and barcode not in existing_barcodes:
+            if barcode and not self.reconciler.is_shelved(barcode):
                 # Highlight row in dark red
                 for col in range(3):
                     cell = self.details_table.item(row, col)
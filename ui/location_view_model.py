@@ -0,0 +1,98 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+from database.connection import get_db
+from database.models import Product, Nomenclature
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LocationViewModel(QObject):
+    """
+    In-memory view of the products stored at one location.
+    The location is queried once when it is selected; afterwards scans,
+    deletions, moves and cleaning checks are applied as deltas and
+    announced through signals so the table only touches the affected row.
+    """
+    reset = pyqtSignal()              # Whole content replaced
+    row_inserted = pyqtSignal(object) # row dict
+    row_removed = pyqtSignal(int)     # product id
+    row_updated = pyqtSignal(object)  # row dict
+
+    def __init__(self):
+        super().__init__()
+        self.location_id = None
+        self._rows = {}        # product id -> row dict (insertion ordered)
+        self._by_barcode = {}  # barcode -> product id
+
+    @staticmethod
+    def make_row(product_id, code, designation, barcode, expiry_date, location_id, cleaning=False):
+        if isinstance(expiry_date, datetime):
+            expiry_date = expiry_date.date()
+        return {
+            'id': product_id,
+            'code': code,
+            'designation': designation or "Unknown",
+            'barcode': barcode,
+            'expiry_date': expiry_date,
+            'location_id': location_id,
+            'cleaning': bool(cleaning)
+        }
+
+    def load(self, location_id):
+        """Full (re)load of a location. Only needed when the location changes."""
+        self.location_id = location_id
+        self._rows = {}
+        self._by_barcode = {}
+
+        if location_id:
+            try:
+                with get_db() as db:
+                    if db:
+                        rows = db.query(
+                            Product.id, Product.code, Nomenclature.designation,
+                            Product.barcode, Product.expiry_date, Product.cleaning
+                        ).join(Nomenclature, Product.code == Nomenclature.code)\
+                         .filter(Product.location_id == location_id)\
+                         .order_by(Product.id).all()
+
+                        for r in rows:
+                            self._store(self.make_row(r.id, r.code, r.designation, r.barcode, r.expiry_date, location_id, r.cleaning))
+            except Exception as e:
+                logger.error(f"Error loading location {location_id}: {e}")
+
+        self.reset.emit()
+
+    def _store(self, row):
+        self._rows[row['id']] = row
+        self._by_barcode[row['barcode']] = row['id']
+
+    def rows(self):
+        return list(self._rows.values())
+
+    def get(self, product_id):
+        return self._rows.get(product_id)
+
+    def find_by_barcode(self, barcode):
+        product_id = self._by_barcode.get(barcode)
+        return self._rows.get(product_id) if product_id is not None else None
+
+    def insert(self, row):
+        if row['location_id'] != self.location_id:
+            return
+        self._store(row)
+        self.row_inserted.emit(row)
+
+    def remove(self, product_id):
+        row = self._rows.pop(product_id, None)
+        if row is None:
+            return
+        if self._by_barcode.get(row['barcode']) == product_id:
+            del self._by_barcode[row['barcode']]
+        self.row_removed.emit(product_id)
+
+    def set_cleaning(self, product_id, cleaning):
+        row = self._rows.get(product_id)
+        if row is None or row['cleaning'] == bool(cleaning):
+            return
+        row['cleaning'] = bool(cleaning)
+        self.row_updated.emit(row)
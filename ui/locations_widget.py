@@ -7,6 +7,7 @@ from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont
 from database.connection import get_db
 from database.models import Location, Product
+from database.location_registry import LocationRegistry
 import logging
 
 logger = logging.getLogger(__name__)
@@ -75,6 +76,7 @@ class LocationsWidget(QWidget):
         super().__init__()
         self.init_ui()
         self.load_locations()
+        LocationRegistry.instance().changed.connect(self.load_locations)
     
     def init_ui(self):
         layout = QVBoxLayout()
@@ -120,55 +122,51 @@ class LocationsWidget(QWidget):
     def load_locations(self):
         self.table.setRowCount(0)
         
-        with get_db() as db:
-            if not db:
-                return
+        locations = LocationRegistry.instance().all()
+        self.table.setRowCount(len(locations))
+        
+        for row, loc in enumerate(locations):
+            # Checkbox
+            checkbox = QCheckBox()
+            checkbox_widget = QWidget()
+            checkbox_layout = QHBoxLayout()
+            checkbox_layout.setContentsMargins(0, 0, 0, 0)
+            checkbox_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            checkbox_layout.addWidget(checkbox)
+            checkbox_widget.setLayout(checkbox_layout)
+            self.table.setCellWidget(row, 0, checkbox_widget)
             
-            locations = db.query(Location).order_by(Location.label).all()
-            self.table.setRowCount(len(locations))
+            # Store location data
+            label_item = QTableWidgetItem(loc.label)
+            label_item.setData(Qt.ItemDataRole.UserRole, loc)
+            self.table.setItem(row, 1, label_item)
+            self.table.setItem(row, 2, QTableWidgetItem(loc.barcode))
             
-            for row, loc in enumerate(locations):
-                # Checkbox
-                checkbox = QCheckBox()
-                checkbox_widget = QWidget()
-                checkbox_layout = QHBoxLayout()
-                checkbox_layout.setContentsMargins(0, 0, 0, 0)
-                checkbox_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                checkbox_layout.addWidget(checkbox)
-                checkbox_widget.setLayout(checkbox_layout)
-                self.table.setCellWidget(row, 0, checkbox_widget)
-                
-                # Store location data
-                label_item = QTableWidgetItem(loc.label)
-                label_item.setData(Qt.ItemDataRole.UserRole, loc)
-                self.table.setItem(row, 1, label_item)
-                self.table.setItem(row, 2, QTableWidgetItem(loc.barcode))
-                
-                # Actions
-                actions_widget = QWidget()
-                actions_layout = QHBoxLayout()
-                actions_layout.setContentsMargins(0, 0, 0, 0)
-                actions_layout.setSpacing(4)
-                actions_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                
-                # Edit button
-                edit_btn = QPushButton()
-                edit_btn.setObjectName("TableActionBtn")
-                edit_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_FileDialogDetailedView))
-                edit_btn.setToolTip("Modifier")
-                edit_btn.clicked.connect(lambda checked, l=loc: self.edit_location(l))
-                actions_layout.addWidget(edit_btn)
-                
-                # Delete button
-                del_btn = QPushButton()
-                del_btn.setObjectName("TableActionBtn")
-                del_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_TrashIcon))
-                del_btn.setToolTip("Supprimer")
-                del_btn.clicked.connect(lambda checked, l_id=loc.id: self.delete_location(l_id))
-                actions_layout.addWidget(del_btn)
-                
-                actions_widget.setLayout(actions_layout)
-                self.table.setCellWidget(row, 3, actions_widget)
+            # Actions
+            actions_widget = QWidget()
+            actions_layout = QHBoxLayout()
+            actions_layout.setContentsMargins(0, 0, 0, 0)
+            actions_layout.setSpacing(4)
+            actions_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            
+            # Edit button
+            edit_btn = QPushButton()
+            edit_btn.setObjectName("TableActionBtn")
+            edit_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_FileDialogDetailedView))
+            edit_btn.setToolTip("Modifier")
+            edit_btn.clicked.connect(lambda checked, l=loc: self.edit_location(l))
+            actions_layout.addWidget(edit_btn)
+            
+            # Delete button
+            del_btn = QPushButton()
+            del_btn.setObjectName("TableActionBtn")
+            del_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_TrashIcon))
+            del_btn.setToolTip("Supprimer")
+            del_btn.clicked.connect(lambda checked, l_id=loc.id: self.delete_location(l_id))
+            actions_layout.addWidget(del_btn)
+            
+            actions_widget.setLayout(actions_layout)
+            self.table.setCellWidget(row, 3, actions_widget)
     
     def toggle_select_all(self):
         self.all_selected = not self.all_selected
@@ -201,126 +199,16 @@ class LocationsWidget(QWidget):
             QMessageBox.warning(self, "Aucune sélection", "Veuillez sélectionner au moins un emplacement.")
             return
         
-        try:
-            from PyQt6.QtPrintSupport import QPrinter, QPrintDialog
-            from PyQt6.QtGui import QPainter, QPageSize, QPageLayout, QPixmap
-            from PyQt6.QtCore import QSizeF, QRectF, QMarginsF
-            from io import BytesIO
-            
-            try:
-                import barcode
-                from barcode.writer import ImageWriter
-            except ImportError:
-                QMessageBox.critical(
-                    self,
-                    "Module manquant",
-                    "Le module 'python-barcode' n'est pas installé.\n\n"
-                    "Installez-le avec: pip install python-barcode pillow"
-                )
-                return
-            
-            # Create printer with custom page size (40mm x 20mm in landscape)
-            printer = QPrinter(QPrinter.PrinterMode.HighResolution)
-            
-            # Set custom page size for barcode labels (40mm width x 20mm height for landscape)
-            page_size = QPageSize(QSizeF(40, 20), QPageSize.Unit.Millimeter)
-            printer.setPageSize(page_size)
-            printer.setPageOrientation(QPageLayout.Orientation.Landscape)
-            
-            # Set zero margins using QMarginsF
-            printer.setPageMargins(QMarginsF(0, 0, 0, 0), QPageLayout.Unit.Millimeter)
-            
-            # Show native Windows print dialog
-            print_dialog = QPrintDialog(printer, self)
-            if print_dialog.exec() != QDialog.DialogCode.Accepted:
-                return
-            
-            # FORCE custom page size again after dialog (dialog may have changed it to A4)
-            printer.setPageSize(page_size)
-            printer.setPageOrientation(QPageLayout.Orientation.Landscape)
-            printer.setPageMargins(QMarginsF(0, 0, 0, 0), QPageLayout.Unit.Millimeter)
-            
-            # Start printing
-            painter = QPainter()
-            if not painter.begin(printer):
-                QMessageBox.critical(self, "Erreur", "Impossible de démarrer l'impression.")
-                return
-            
-            for idx, location in enumerate(selected):
-                if idx > 0:
-                    # New page for each label
-                    printer.newPage()
-                
-                # Get page dimensions in pixels
-                page_rect = printer.pageRect(QPrinter.Unit.DevicePixel)
-                width = page_rect.width()
-                height = page_rect.height()
-                
-                # Convert 2mm to pixels (at printer DPI)
-                dpi = printer.resolution()
-                margin_2mm = (2 / 25.4) * dpi  # 2mm in pixels
-                
-                # DEBUG: Print dimensions in mm
-                width_mm = (width / dpi) * 25.4
-                height_mm = (height / dpi) * 25.4
-                text_zone_height_mm = height_mm * 0.3
-                barcode_zone_height_mm = height_mm * 0.65
-                
-                print(f"\n=== DEBUG ÉTIQUETTE {location.label} ===")
-                print(f"Résolution imprimante: {dpi} DPI")
-                print(f"Dimensions page: {width_mm:.2f}mm x {height_mm:.2f}mm")
-                print(f"Zone texte (haut): {text_zone_height_mm:.2f}mm (30% de {height_mm:.2f}mm)")
-                print(f"Zone code-barres: {barcode_zone_height_mm:.2f}mm (65% de {height_mm:.2f}mm)")
-                print(f"Marge gauche/droite: 2.00mm")
-                print(f"Police emplacement: 24pt = {24 * 0.353:.2f}mm")
-                print(f"Police numéro: 16pt = {16 * 0.353:.2f}mm")
-                print(f"Hauteur barres code-barres: 8mm")
-                print(f"Largeur barre individuelle: 0.25mm")
-                print("="*40)
-                
-                # Draw location label and barcode number on same line at top
-                # Location on the left, larger font with 2mm left margin
-                painter.setFont(QFont("Arial", 24, QFont.Weight.Bold))
-                painter.drawText(QRectF(margin_2mm, 0, width * 0.5, height * 0.3), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, location.label)
-                
-                # Barcode number on the right with 2mm right margin
-                painter.setFont(QFont("Arial", 16))
-                painter.drawText(QRectF(width * 0.4, 0, width * 0.6 - margin_2mm, height * 0.3), Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, location.barcode)
-                
-                # Generate barcode using python-barcode (without text below)
-                CODE128 = barcode.get_barcode_class('code128')
-                barcode_obj = CODE128(location.barcode, writer=ImageWriter())
-                
-                # Render barcode to PNG in memory (without text)
-                buffer = BytesIO()
-                barcode_obj.write(buffer, options={
-                    'module_width': 0.25,
-                    'module_height': 8,
-                    'font_size': 0,  # Hide the text below barcode
-                    'text_distance': 0,
-                    'quiet_zone': 1,
-                    'write_text': False  # Don't write text
-                })
-                buffer.seek(0)
-                
-                # Convert to QPixmap
-                pixmap = QPixmap()
-                pixmap.loadFromData(buffer.read())
-                
-                # Draw barcode bars below the text
-                barcode_height = height * 0.65
-                barcode_width = width * 0.95
-                x_offset = (width - barcode_width) / 2
-                y_offset = height * 0.3
-                
-                painter.drawPixmap(QRectF(x_offset, y_offset, barcode_width, barcode_height), pixmap, QRectF(pixmap.rect()))
-            
-            painter.end()
-            QMessageBox.information(self, "Succès", f"{len(selected)} code(s)-barre(s) imprimé(s).")
-            
-        except Exception as e:
-            logger.error(f"Error printing barcodes: {e}")
-            QMessageBox.critical(self, "Erreur", f"Erreur lors de l'impression: {e}")
+        from utils.label_renderer import ask_label_printer
+        from utils.label_templates import TEMPLATE_LOCATION
+        from utils.print_spooler import PrintSpooler, KIND_LOCATION
+
+        printer_name = ask_label_printer(self, TEMPLATE_LOCATION)
+        if printer_name is None:
+            return
+
+        labels = [{'label': location.label, 'barcode': location.barcode} for location in selected]
+        PrintSpooler.instance().submit(KIND_LOCATION, labels, printer_name, title=f"{len(labels)} étiquette(s) emplacement")
     
     def add_location(self):
         dialog = LocationDialog(parent=self)
@@ -351,8 +239,8 @@ class LocationsWidget(QWidget):
                     db.add(new_loc)
                     db.commit()
                     
-                    QMessageBox.information(self, "Succès", "Emplacement ajouté avec succès.")
-                    self.load_locations()
+                LocationRegistry.instance().notify_changed(f"Ajout {data['label']}")
+                QMessageBox.information(self, "Succès", "Emplacement ajouté avec succès.")
             except Exception as e:
                 logger.error(f"Error adding location: {e}")
                 QMessageBox.critical(self, "Erreur", f"Erreur lors de l'ajout: {e}")
@@ -395,8 +283,8 @@ class LocationsWidget(QWidget):
                     loc.barcode = data['barcode']
                     db.commit()
                     
-                    QMessageBox.information(self, "Succès", "Emplacement modifié avec succès.")
-                    self.load_locations()
+                LocationRegistry.instance().notify_changed(f"Modification {location.label} -> {data['label']}")
+                QMessageBox.information(self, "Succès", "Emplacement modifié avec succès.")
             except Exception as e:
                 logger.error(f"Error editing location: {e}")
                 QMessageBox.critical(self, "Erreur", f"Erreur lors de la modification: {e}")
@@ -430,11 +318,14 @@ class LocationsWidget(QWidget):
                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
                 )
                 
-                if reply == QMessageBox.StandardButton.Yes:
-                    db.delete(loc)
-                    db.commit()
-                    QMessageBox.information(self, "Succès", "Emplacement supprimé avec succès.")
-                    self.load_locations()
+                if reply != QMessageBox.StandardButton.Yes:
+                    return
+                label = loc.label
+                db.delete(loc)
+                db.commit()
+            
+            LocationRegistry.instance().notify_changed(f"Suppression {label}")
+            QMessageBox.information(self, "Succès", "Emplacement supprimé avec succès.")
         except Exception as e:
             logger.error(f"Error deleting location: {e}")
             QMessageBox.critical(self, "Erreur", f"Erreur lors de la suppression: {e}")
@@ -4,9 +4,35 @@ from ui.notification_overlay import NotificationOverlay
 from ui.floating_search import FloatingSearchWidget
 from database.connection import get_db
 from database.models import Notification
+from database.expiry_index import EXPIRY_ALERT_SENDER
 from config import config
+from utils import startup_profiler
 import logging
 
+# (tab title, module, widget class, MainWindow attribute), in display order
+TAB_SPECS = [
+    ("Inventaire", "ui.inventory_widget", "InventoryWidget", "inventory_tab"),
+    ("Recherche", "ui.search_widget", "SearchWidget", "search_tab"),
+    ("Colis", "ui.parcel_widget", "ParcelWidget", "parcel_tab"),
+    ("Manquant", "ui.missing_widget", "MissingWidget", "missing_tab"),
+    ("Saisie", "ui.entry_widget", "EntryWidget", "entry_tab"),
+    ("Validation", "ui.validation_widget", "ValidationWidget", "validation_tab"),
+    ("Facture", "ui.invoice_widget", "InvoiceWidget", "invoice_tab"),
+    ("Manquants Xp", "ui.xp_missing_widget", "XpMissingWidget", "xp_missing_tab"),
+    ("Rotation", "ui.rotation_widget", "RotationWidget", "rotation_tab"),
+    ("Statistiques", "ui.stats_widget", "StatsWidget", "stats_tab"),
+    ("Produits Dormants", "ui.dormant_widget", "DormantWidget", "dormant_tab"),
+    ("Nomenclature", "ui.nomenclature_widget", "NomenclatureWidget", "nomenclature_tab"),
+    ("Emplacements", "ui.locations_widget", "LocationsWidget", "locations_tab"),
+    ("Paramètres", "ui.settings_widget", "SettingsWidget", "settings_tab"),
+    ("Messages", "ui.messages_widget", "MessagesWidget", "messages_tab"),
+]
+PROTECTED_TABS = ["Statistiques", "Rotation", "Paramètres"]
+
+# Idle construction of the other tabs: delay after the window is shown, then between tabs
+IDLE_TAB_START_MS = 3000
+IDLE_TAB_INTERVAL_MS = 200
+
 class MainWindow(QMainWindow):
     def __init__(self, splash=None):
         super().__init__()
@@ -34,119 +60,79 @@ class MainWindow(QMainWindow):
         self.toggle_search_action.triggered.connect(self.toggle_floating_search)
         self.addAction(self.toggle_search_action)
         
+        # Print queue status (jobs are printed in the background)
+        from utils.print_spooler import PrintSpooler
+        self.print_spooler = PrintSpooler.instance()
+        self.print_spooler.queue_changed.connect(self.update_print_status)
+        self.print_spooler.job_finished.connect(self.on_print_job_finished)
+        self.update_print_status()
+        
         # Track protected tabs and authentication
         self.protected_tabs = []  # Will store indices of protected tabs
         self.last_tab_index = 0
         self.authenticating = False  # Flag to prevent recursion
         self.tabs.currentChanged.connect(self.on_tab_changed)
         
-        # Initialize Tabs synchronously
+        # Only the first tab is built now, the others lazily
         self.create_tabs(splash)
 
     def create_tabs(self, splash=None):
-        # Helper to update splash
-        def update_splash(message):
-            if splash:
-                splash.showMessage(message, Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignCenter, Qt.GlobalColor.black)
-                # Force event processing to ensure splash updates
-                from PyQt6.QtWidgets import QApplication
-                QApplication.processEvents()
-
-        # 1. Inventaire
-        update_splash("Chargement du module Inventaire...")
-        from ui.inventory_widget import InventoryWidget
-        self.inventory_tab = InventoryWidget()
-        self.tabs.addTab(self.inventory_tab, "Inventaire")
-
-        # 2. Recherche
-        update_splash("Chargement du module Recherche...")
-        from ui.search_widget import SearchWidget
-        self.search_tab = SearchWidget()
-        self.tabs.addTab(self.search_tab, "Recherche")
-
-        # 3. Colis
-        update_splash("Chargement du module Colis...")
-        from ui.parcel_widget import ParcelWidget
-        self.parcel_tab = ParcelWidget()
-        self.tabs.addTab(self.parcel_tab, "Colis")
-
-        # 4. Manquant
-        update_splash("Chargement du module Manquant...")
-        from ui.missing_widget import MissingWidget
-        self.missing_tab = MissingWidget()
-        self.tabs.addTab(self.missing_tab, "Manquant")
-
-        # 6. Saisie (Entry)
-        update_splash("Chargement du module Saisie...")
-        from ui.entry_widget import EntryWidget
-        self.entry_tab = EntryWidget()
-        self.tabs.addTab(self.entry_tab, "Saisie")
-
-        # 7. Validation
-        update_splash("Chargement du module Validation...")
-        from ui.validation_widget import ValidationWidget
-        self.validation_tab = ValidationWidget()
-        self.tabs.addTab(self.validation_tab, "Validation")
-
-        # 8. Facture
-        update_splash("Chargement du module Facture...")
-        from ui.invoice_widget import InvoiceWidget
-        self.invoice_tab = InvoiceWidget()
-        self.tabs.addTab(self.invoice_tab, "Facture")
-
-        # 9. Manquants Xp
-        update_splash("Chargement du module Manquants Xp...")
-        from ui.xp_missing_widget import XpMissingWidget
-        self.xp_missing_tab = XpMissingWidget()
-        self.tabs.addTab(self.xp_missing_tab, "Manquants Xp")
+        """
+        Adds every tab with an empty container. Only the first tab (Inventaire,
+        where scanning happens) is built now; the others are built on first
+        activation, or in idle time once the window is shown. Protected tabs
+        are only built after the password is accepted.
+        """
+        self._tab_containers = []
+        for title, module_name, class_name, attr in TAB_SPECS:
+            container = QWidget()
+            container_layout = QVBoxLayout(container)
+            container_layout.setContentsMargins(0, 0, 0, 0)
+            self._tab_containers.append(container)
+            index = self.tabs.addTab(container, title)
+            if title in PROTECTED_TABS:
+                self.protected_tabs.append(index)
 
-        # 10. Rotation
-        update_splash("Chargement du module Rotation...")
-        from ui.rotation_widget import RotationWidget
-        self.rotation_tab = RotationWidget()
-        self.tabs.addTab(self.rotation_tab, "Rotation")
+        if splash:
+            splash.showMessage("Chargement du module Inventaire...", Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignCenter, Qt.GlobalColor.black)
+            from PyQt6.QtWidgets import QApplication
+            QApplication.processEvents()
+        self.ensure_tab(0)
 
-        # 11. Statistiques
-        update_splash("Chargement du module Statistiques...")
-        from ui.stats_widget import StatsWidget
-        self.stats_tab = StatsWidget()
-        self.tabs.addTab(self.stats_tab, "Statistiques")
-
-        # 11. Produits Dormants
-        update_splash("Chargement du module Produits Dormants...")
-        from ui.dormant_widget import DormantWidget
-        self.dormant_tab = DormantWidget()
-        self.tabs.addTab(self.dormant_tab, "Produits Dormants")
-
-        # 12. Nomenclature
-        update_splash("Chargement du module Nomenclature...")
-        from ui.nomenclature_widget import NomenclatureWidget
-        self.nomenclature_tab = NomenclatureWidget()
-        self.tabs.addTab(self.nomenclature_tab, "Nomenclature")
+    def ensure_tab(self, index):
+        """Builds the widget of a tab if it does not exist yet."""
+        container = self._tab_containers[index]
+        if container.layout().count():
+            return
 
-        # 13. Emplacements
-        update_splash("Chargement du module Emplacements...")
-        from ui.locations_widget import LocationsWidget
-        self.locations_tab = LocationsWidget()
-        self.tabs.addTab(self.locations_tab, "Emplacements")
+        title, module_name, class_name, attr = TAB_SPECS[index]
+        from PyQt6.QtWidgets import QApplication
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            module = startup_profiler.timed_import(module_name)
+            with startup_profiler.measure(title, category='tab'):
+                widget = getattr(module, class_name)()
+            container.layout().addWidget(widget)
+            setattr(self, attr, widget)
+        except Exception as e:
+            logging.error(f"Error building tab {title}: {e}")
+            container.layout().addWidget(QLabel(f"Erreur lors du chargement du module {title}: {e}"))
+        finally:
+            QApplication.restoreOverrideCursor()
 
-        # 14. Paramètres
-        update_splash("Chargement du module Paramètres...")
-        from ui.settings_widget import SettingsWidget
-        self.settings_tab = SettingsWidget()
-        self.tabs.addTab(self.settings_tab, "Paramètres")
+    def start_idle_tab_loading(self):
+        """Builds the remaining (non protected) tabs one by one once the window is idle."""
+        self._idle_tabs = [i for i in range(len(TAB_SPECS)) if i not in self.protected_tabs]
+        QTimer.singleShot(IDLE_TAB_START_MS, self._load_next_idle_tab)
 
-        # 15. Messages
-        update_splash("Chargement du module Messages...")
-        from ui.messages_widget import MessagesWidget
-        self.messages_tab = MessagesWidget()
-        self.tabs.addTab(self.messages_tab, "Messages")
-        
-        # Mark protected tabs (Statistiques, Rotation, Paramètres)
-        for i in range(self.tabs.count()):
-            tab_name = self.tabs.tabText(i)
-            if tab_name in ["Statistiques", "Rotation", "Paramètres"]:
-                self.protected_tabs.append(i)
+    def _load_next_idle_tab(self):
+        while self._idle_tabs:
+            index = self._idle_tabs.pop(0)
+            if not self._tab_containers[index].layout().count():
+                self.ensure_tab(index)
+                QTimer.singleShot(IDLE_TAB_INTERVAL_MS, self._load_next_idle_tab)
+                return
+        startup_profiler.report("Onglets chargés en arrière-plan")
 
     def check_notifications(self):
         try:
@@ -187,7 +173,8 @@ class MainWindow(QMainWindow):
             'product_name': notif.product_name,
             'quantity': notif.quantity,
             'message': notif.message,
-            'is_urgent': notif.is_urgent
+            'is_urgent': notif.is_urgent,
+            'kind': 'expiry' if notif.sender_station == EXPIRY_ALERT_SENDER else 'request'
         }
         overlay = NotificationOverlay(data, self)
         overlay.responded.connect(self.handle_notification_response)
@@ -213,6 +200,19 @@ class MainWindow(QMainWindow):
         except Exception as e:
             logging.error(f"Error updating notification: {e}")
     
+    def update_print_status(self):
+        pending = self.print_spooler.pending_count()
+        if pending:
+            self.statusBar().showMessage(f"Impression en cours : {pending} travail(x) en file")
+        else:
+            self.statusBar().clearMessage()
+
+    def on_print_job_finished(self, job_id, success, message):
+        if success:
+            self.statusBar().showMessage(f"Impression terminée : {message}", 5000)
+        else:
+            QMessageBox.warning(self, "Impression", f"L'impression a échoué après plusieurs tentatives:\n{message}")
+    
     def on_tab_changed(self, index):
         """Handle tab changes and verify password for protected tabs"""
         # Prevent recursion during authentication
@@ -240,6 +240,7 @@ class MainWindow(QMainWindow):
             if ok and password == correct_password:
                 # Password correct, allow access
                 self.last_tab_index = index
+                self.ensure_tab(index)
                 self.authenticating = False
             else:
                 # Password incorrect or cancelled, go back to last tab
@@ -250,6 +251,7 @@ class MainWindow(QMainWindow):
                     QMessageBox.warning(self, "Accès Refusé", "Mot de passe incorrect.")
         else:
             # Not a protected tab, just update last tab
+            self.ensure_tab(index)
             self.last_tab_index = index
 
     def toggle_floating_search(self):
@@ -3,12 +3,18 @@ from PyQt6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QPushButton, QMessageBox, QHeaderView, QStyle, QStyledItemDelegate,
     QDateEdit
 )
-from PyQt6.QtCore import Qt, QDate
-from PyQt6.QtGui import QColor
-from database.connection import get_db, get_product_from_xpertpharm, get_lots_by_product_code
+from PyQt6.QtCore import Qt, QDate, QTimer
+from PyQt6.QtGui import QColor, QKeySequence, QShortcut
+from database.connection import get_db, get_product_from_xpertpharm
+from database.lot_cache import LotCache
+from database.stock_snapshot import StockSnapshotService, format_quantity, format_tooltip
 from database.models import MissingItem
+from database.missing_items import get_missing_list, delete_products, report_missing
 from datetime import datetime
 
+# Lots are looked up once the selection rests this long (arrowing through the list)
+LOTS_DEBOUNCE_MS = 150
+
 class BackgroundDelegate(QStyledItemDelegate):
     def paint(self, painter, option, index):
         # Check if item has a background color set
@@ -21,6 +27,15 @@ class BackgroundDelegate(QStyledItemDelegate):
 class MissingWidget(QWidget):
     def __init__(self):
         super().__init__()
+        self.lot_cache = LotCache.instance()
+        self.lot_cache.loaded.connect(self.on_lots_loaded)
+        self.lot_cache.failed.connect(self.on_lots_failed)
+        self.stock_service = StockSnapshotService.instance()
+        self.stock_service.loaded.connect(self.on_stock_loaded)
+        self.lots_timer = QTimer(self)
+        self.lots_timer.setSingleShot(True)
+        self.lots_timer.setInterval(LOTS_DEBOUNCE_MS)
+        self.lots_timer.timeout.connect(self.load_lots_for_selected)
         self.init_ui()
         self.load_items()
 
@@ -39,6 +54,11 @@ class MissingWidget(QWidget):
         add_btn.clicked.connect(self.add_item)
         top_layout.addWidget(add_btn)
         
+        delete_btn = QPushButton("Supprimer la sélection")
+        delete_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_TrashIcon))
+        delete_btn.clicked.connect(self.delete_selected_items)
+        top_layout.addWidget(delete_btn)
+        
         delete_all_btn = QPushButton("Tout Supprimer")
         delete_all_btn.clicked.connect(self.delete_all_items)
         delete_all_btn.setStyleSheet("background-color: #ffcdd2; color: #c62828;") # Light red background, dark red text
@@ -63,7 +83,7 @@ class MissingWidget(QWidget):
         filter_layout.addWidget(self.date_to)
         
         refresh_btn = QPushButton("Actualiser")
-        refresh_btn.clicked.connect(self.load_items)
+        refresh_btn.clicked.connect(self.refresh)
         filter_layout.addWidget(refresh_btn)
         
         filter_layout.addStretch()
@@ -71,11 +91,13 @@ class MissingWidget(QWidget):
 
         # Table
         self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["Code", "Désignation", "Date Signalement", "Actions"])
+        self.table.setColumnCount(5)
+        self.table.setHorizontalHeaderLabels(["Code", "Désignation", "Date Signalement", "Signalements", "Stock XP"])
         self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
-        self.table.verticalHeader().setDefaultSectionSize(60)
-        self.table.itemSelectionChanged.connect(self.load_lots_for_selected)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.itemSelectionChanged.connect(self.lots_timer.start)
+        QShortcut(QKeySequence.StandardKey.Delete, self.table, activated=self.delete_selected_items)
         
         # Set Custom Delegate for Background Coloring
         self.table.setItemDelegate(BackgroundDelegate(self.table))
@@ -107,99 +129,102 @@ class MissingWidget(QWidget):
         # For now, just add the MissingItem.
         
         # If input is barcode, resolve to code
+        designation = None
         prod_data = get_product_from_xpertpharm(code)
         if prod_data:
             code = prod_data['CODE_PRODUIT']
+            designation = prod_data.get('designation')
         
-        with get_db() as db:
-            if not db: return
-            
-            new_item = MissingItem(
-                product_code=code,
-                source="Manquant",
-                reported_at=datetime.now()
-            )
-            
-            try:
-                db.add(new_item)
-                db.commit()
+        try:
+            if report_missing(code, "Manquant", designation=designation):
                 self.load_items()
                 self.code_input.clear()
-            except Exception as e:
-                QMessageBox.critical(self, "Erreur", f"Erreur: {e}")
+        except Exception as e:
+            QMessageBox.critical(self, "Erreur", f"Erreur: {e}")
 
     def load_items(self):
+        # Date Filter
+        d_from = self.date_from.date().toPyDate()
+        d_to = self.date_to.date().addDays(1).toPyDate() # Include end date
+        
+        # Latest report per product with designation and report count, in one query
+        entries = get_missing_list(d_from, d_to)
+        
+        self.table.setUpdatesEnabled(False)
         self.table.setRowCount(0)
-        with get_db() as db:
-            if not db: return
-            
-            # Date Filter
-            d_from = self.date_from.date().toPyDate()
-            d_to = self.date_to.date().addDays(1).toPyDate() # Include end date
-            
-            # Join with Nomenclature to get designation
-            # We use outerjoin in case it's missing from Nomenclature
-            from database.models import Nomenclature
-            
-            # Filter by date range and not deleted
-            items = db.query(MissingItem).outerjoin(Nomenclature, MissingItem.product_code == Nomenclature.code)\
-                .filter(MissingItem.reported_at >= d_from, MissingItem.reported_at < d_to)\
-                .filter(MissingItem.is_deleted == False)\
-                .order_by(MissingItem.reported_at.asc()).all()
-            
-            # Deduplicate: Keep only the latest item for each product_code
-            latest_items_map = {}
-            for item in items:
-                latest_items_map[item.product_code] = item
+        self.table.setRowCount(len(entries))
+        for row, entry in enumerate(entries):
+            items = [
+                QTableWidgetItem(entry.product_code),
+                QTableWidgetItem(entry.designation or "Inconnu"),
+                QTableWidgetItem(str(entry.reported_at)),
+                QTableWidgetItem(str(entry.report_count)),
+                QTableWidgetItem("")
+            ]
+            items[3].setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            items[4].setTextAlignment(Qt.AlignmentFlag.AlignCenter)
             
-            # Convert back to list and sort by date desc for display
-            unique_items = sorted(latest_items_map.values(), key=lambda x: x.reported_at, reverse=True)
+            # Highlight "Comptoir" items
+            if entry.source == "Comptoir":
+                color = QColor("#115e59") # Dark Teal for Comptoir items
+                for item in items:
+                    item.setBackground(color)
             
-            self.table.setRowCount(len(unique_items))
-            for row, item in enumerate(unique_items):
-                designation = item.nomenclature.designation if item.nomenclature else "Inconnu"
-                
-                self.table.setItem(row, 0, QTableWidgetItem(item.product_code))
-                self.table.setItem(row, 1, QTableWidgetItem(designation))
-                self.table.setItem(row, 2, QTableWidgetItem(str(item.reported_at)))
-                
-                # Highlight "Comptoir" items
-                if item.source == "Comptoir":
-                    color = QColor("#115e59") # Dark Teal for Comptoir items
-                    for col in range(3):
-                        self.table.item(row, col).setBackground(color)
-                
-                btn = QPushButton()
-                btn.setObjectName("TableActionBtn")
-                btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_TrashIcon))
-                btn.setToolTip("Supprimer")
-                # Pass product_code instead of item_id to delete all instances
-                btn.clicked.connect(lambda checked, p_code=item.product_code: self.delete_item(p_code))
-                
-                # Center the button
-                widget = QWidget()
-                layout = QHBoxLayout()
-                layout.setContentsMargins(0,0,0,0)
-                layout.addWidget(btn)
-                layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                widget.setLayout(layout)
-                
-                self.table.setCellWidget(row, 3, widget)
+            for col, item in enumerate(items):
+                self.table.setItem(row, col, item)
+        self.table.setUpdatesEnabled(True)
+        
+        # Stock and lots of every listed product in batched queries, selections then read the caches
+        codes = [entry.product_code for entry in entries]
+        self.update_stock_column(set(codes))
+        self.stock_service.prefetch(codes)
+        self.lot_cache.prefetch(codes)
+
+    def refresh(self):
+        self.lot_cache.invalidate()
+        self.stock_service.invalidate()
+        self.load_items()
+
+    def on_stock_loaded(self, codes):
+        self.update_stock_column(codes)
+
+    def displayed_codes(self):
+        return [self.table.item(row, 0).text() for row in range(self.table.rowCount()) if self.table.item(row, 0)]
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Visible again: the listed products are refreshed in the background again
+        self.stock_service.prefetch(self.displayed_codes())
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.stock_service.unwatch(self.displayed_codes())
+
+    def update_stock_column(self, codes):
+        for row in range(self.table.rowCount()):
+            code_item = self.table.item(row, 0)
+            stock_item = self.table.item(row, 4)
+            if not code_item or not stock_item or code_item.text() not in codes:
+                continue
+            snapshot = self.stock_service.get(code_item.text())
+            if snapshot is not None:
+                stock_item.setText(format_quantity(snapshot))
+                stock_item.setToolTip(format_tooltip(snapshot))
 
     def delete_item(self, product_code):
         # Soft delete all active items with this product code
-        with get_db() as db:
-            if not db: return
-            
-            # Find all non-deleted items with this product code
-            items = db.query(MissingItem).filter(MissingItem.product_code == product_code, MissingItem.is_deleted == False).all()
-            
-            if items:
-                for item in items:
-                    item.is_deleted = True
-                
-                db.commit()
-                self.load_items()
+        if delete_products([product_code]):
+            self.load_items()
+
+    def delete_selected_items(self):
+        rows = sorted({index.row() for index in self.table.selectedIndexes()})
+        codes = [self.table.item(row, 0).text() for row in rows if self.table.item(row, 0)]
+        if not codes:
+            QMessageBox.warning(self, "Aucune sélection", "Veuillez sélectionner au moins un produit.")
+            return
+        # Soft delete all active items of the selected product codes
+        if delete_products(codes):
+            self.load_items()
 
     def delete_all_items(self):
         reply = QMessageBox.question(self, "Confirmer", "Voulez-vous vraiment supprimer TOUS les produits de la liste des manquants ?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
@@ -216,21 +241,45 @@ class MissingWidget(QWidget):
                     db.rollback()
                     QMessageBox.critical(self, "Erreur", f"Erreur lors de la suppression : {e}")
 
-    def load_lots_for_selected(self):
-        self.lots_table.setRowCount(0)
+    def selected_product_code(self):
         selected_items = self.table.selectedItems()
         if not selected_items:
-            return
+            return None
             
         # Assuming single row selection, get the first item (row)
         row = selected_items[0].row()
         code_item = self.table.item(row, 0)
-        if not code_item:
+        return code_item.text() if code_item else None
+
+    def load_lots_for_selected(self):
+        product_code = self.selected_product_code()
+        if not product_code:
+            self.lots_table.setRowCount(0)
             return
-            
-        product_code = code_item.text()
-        lots = get_lots_by_product_code(product_code)
         
+        lots = self.lot_cache.get(product_code)
+        if lots is None:
+            self.show_lots_message("Chargement des lots...")
+            self.lot_cache.prefetch([product_code], priority=True)
+            return
+        self.show_lots(lots)
+
+    def on_lots_loaded(self, codes):
+        if self.selected_product_code() in codes:
+            self.load_lots_for_selected()
+
+    def on_lots_failed(self, codes):
+        if self.selected_product_code() in codes:
+            self.show_lots_message("XpertPharm injoignable.")
+
+    def show_lots_message(self, message):
+        self.lots_table.setRowCount(1)
+        self.lots_table.setItem(0, 0, QTableWidgetItem(message))
+        for col in range(1, self.lots_table.columnCount()):
+            self.lots_table.setItem(0, col, QTableWidgetItem(""))
+
+    def show_lots(self, lots):
+        self.lots_table.setRowCount(0)
         self.lots_table.setRowCount(len(lots))
         for r, lot in enumerate(lots):
             self.lots_table.setItem(r, 0, QTableWidgetItem(str(lot.get('CODE_BARRE_LOT', ''))))
@@ -6,9 +6,9 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QColor, QFont
-from database.connection import get_db, get_xpertpharm_connection
+from database.connection import get_db
 from database.models import Nomenclature
-from database.cache import ProductCache
+from database.nomenclature_sync import reconcile
 from sqlalchemy import func
 import logging
 from datetime import datetime
@@ -168,47 +168,16 @@ class NomenclatureWidget(QWidget):
         QApplication.processEvents()
         
         try:
-            # 1. Get Local Codes
-            with get_db() as db:
-                if not db:
-                    progress.close()
-                    return
-                    
-                local_codes = [r[0] for r in db.query(Nomenclature.code).all()]
-                local_set = set(local_codes)
-                
-                # 2. Get XP Codes from Cache
-                cache = ProductCache.instance()
-                xp_products = cache.get_all_products()
-                
-                if xp_products:
-                    xp_codes = [p[0] for p in xp_products]
-                    xp_set = set(xp_codes)
-                else:
-                    # Fallback to SQL if cache empty
-                    conn = get_xpertpharm_connection()
-                    if not conn:
-                        progress.close()
-                        QMessageBox.critical(self, "Erreur", "Impossible de se connecter à XpertPharm.")
-                        return
-                        
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT CODE_PRODUIT FROM dbo.View_STK_PRODUITS")
-                    xp_codes = [r[0] for r in cursor.fetchall()]
-                    xp_set = set(xp_codes)
-                    conn.close()
-                
-                # 3. Diff
-                obsolete_codes = local_set - xp_set
-                
-                progress.close()
+            # Set-based diff against a temp copy of the XP catalog
+            result = reconcile(apply_renames=False)
+            progress.close()
+            
+            if not result.obsolete:
+                QMessageBox.information(self, "Résultat", "Aucun code obsolète trouvé.")
+                return
                 
-                if not obsolete_codes:
-                    QMessageBox.information(self, "Résultat", "Aucun code obsolète trouvé.")
-                    return
-                    
-                # Show Dialog
-                self.show_results_dialog("Codes Obsolètes", ["Code", "Désignation (Local)"], obsolete_codes, db)
+            # Show Dialog
+            self.show_results_dialog("Codes Obsolètes", ["Code", "Désignation (Local)"], result.obsolete)
             
         except Exception as e:
             progress.close()
@@ -224,64 +193,22 @@ class NomenclatureWidget(QWidget):
         QApplication.processEvents()
         
         try:
-            # 1. Get Local Data
-            with get_db() as db:
-                if not db:
-                    progress.close()
-                    return
-                    
-                local_noms = db.query(Nomenclature).all()
-                local_map = {n.code: n for n in local_noms}
-                
-                # 2. Get XP Data from Cache
-                cache = ProductCache.instance()
-                xp_products = cache.get_all_products()
-                
-                if xp_products:
-                    xp_data = xp_products # List of (code, designation)
-                else:
-                    # Fallback
-                    conn = get_xpertpharm_connection()
-                    if not conn:
-                        progress.close()
-                        QMessageBox.critical(self, "Erreur", "Impossible de se connecter à XpertPharm.")
-                        return
-                        
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT CODE_PRODUIT, DESIGNATION FROM dbo.View_STK_PRODUITS")
-                    xp_data = cursor.fetchall()
-                    conn.close()
-                
-                updates = []
-                
-                for row in xp_data:
-                    code = row[0]
-                    xp_name = row[1]
-                    
-                    if code in local_map:
-                        local_nom = local_map[code]
-                        if local_nom.designation != xp_name:
-                            # Update
-                            old_name = local_nom.designation
-                            local_nom.designation = xp_name
-                            local_nom.last_edit_date = datetime.now()
-                            updates.append((code, old_name, xp_name))
-                
-                if updates:
-                    db.commit()
-                    progress.close()
-                    self.show_sync_results(updates)
-                    self.load_data()
-                else:
-                    progress.close()
-                    QMessageBox.information(self, "Résultat", "Tous les noms sont à jour.")
+            # Renamed designations are applied with one UPDATE ... FROM
+            updates = reconcile(apply_renames=True).renamed
+            progress.close()
+            
+            if updates:
+                self.show_sync_results(updates)
+                self.load_data()
+            else:
+                QMessageBox.information(self, "Résultat", "Tous les noms sont à jour.")
                 
         except Exception as e:
             progress.close()
             logger.error(f"Error syncing names: {e}")
             QMessageBox.critical(self, "Erreur", f"Erreur: {e}")
 
-    def show_results_dialog(self, title, columns, codes, db):
+    def show_results_dialog(self, title, columns, rows):
         dialog = QDialog(self)
         dialog.setWindowTitle(title)
         dialog.resize(600, 400)
@@ -293,32 +220,13 @@ class NomenclatureWidget(QWidget):
         table.setHorizontalHeaderLabels(columns)
         table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         
-        # Fetch designations for codes
-        # We can't do WHERE IN with a huge list easily in one go if list is massive, but for now assume it fits
-        # Or just loop (slow) or fetch all local again.
-        # Since we have `db` session open, let's query.
-        
-        # Optimization: Query only needed codes
-        # If list is huge, chunk it.
-        
-        code_list = list(codes)
-        rows_data = []
-        
-        # Simple approach: fetch all local map again or filter
-        # Let's just fetch relevant ones
-        
-        # If > 1000 items, might be issue with IN clause limits in some DBs, but Postgres handles large INs okay usually.
         # Let's cap display at 1000
+        display_rows = rows[:1000]
         
-        display_codes = code_list[:1000]
-        
-        noms = db.query(Nomenclature).filter(Nomenclature.code.in_(display_codes)).all()
-        nom_map = {n.code: n.designation for n in noms}
-        
-        table.setRowCount(len(display_codes))
-        for r, code in enumerate(display_codes):
+        table.setRowCount(len(display_rows))
+        for r, (code, designation) in enumerate(display_rows):
             table.setItem(r, 0, QTableWidgetItem(str(code)))
-            table.setItem(r, 1, QTableWidgetItem(str(nom_map.get(code, "Unknown"))))
+            table.setItem(r, 1, QTableWidgetItem(str(designation or "Unknown")))
             
         layout.addWidget(table)
         
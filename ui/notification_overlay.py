@@ -2,7 +2,7 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QPushButton,
                              QHBoxLayout, QGraphicsDropShadowEffect)
 from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 from PyQt6.QtGui import QColor, QPalette
-import pyttsx3
+from utils.speech import SpeechService, PRIORITY_HIGH, PRIORITY_NORMAL
 
 class NotificationOverlay(QWidget):
     responded = pyqtSignal(int, str) # notification_id, action (confirmed/rejected)
@@ -15,6 +15,8 @@ class NotificationOverlay(QWidget):
         
         # Style based on urgency
         self.is_urgent = notification_data.get('is_urgent', False)
+        # Raised by the expiry alert job rather than requested by a station
+        self.is_expiry_alert = notification_data.get('kind') == 'expiry'
         self.bg_color = "#ffebee" if self.is_urgent else "#e3f2fd" # Red or Blue
         self.border_color = "#d32f2f" if self.is_urgent else "#1976d2"
         
@@ -38,18 +40,19 @@ class NotificationOverlay(QWidget):
         c_layout = QVBoxLayout(container)
         
         # Header
-        header = QLabel("URGENT - DEMANDE PRODUIT" if self.is_urgent else "DEMANDE PRODUIT")
+        title = "ALERTE PÉREMPTION" if self.is_expiry_alert else "DEMANDE PRODUIT"
+        header = QLabel(f"URGENT - {title}" if self.is_urgent else title)
         header.setStyleSheet(f"font-weight: bold; font-size: 16px; color: {self.border_color};")
         header.setAlignment(Qt.AlignmentFlag.AlignCenter)
         c_layout.addWidget(header)
         
         # Content
-        prod_label = QLabel(f"Produit: {self.notification_data.get('product_name')}")
+        prod_label = QLabel(self.notification_data.get('product_name') if self.is_expiry_alert else f"Produit: {self.notification_data.get('product_name')}")
         prod_label.setStyleSheet("font-size: 14px; font-weight: bold;")
         prod_label.setWordWrap(True)
         c_layout.addWidget(prod_label)
         
-        qty_label = QLabel(f"Quantité: {self.notification_data.get('quantity')}")
+        qty_label = QLabel(f"{'Lots' if self.is_expiry_alert else 'Quantité'}: {self.notification_data.get('quantity')}")
         c_layout.addWidget(qty_label)
         
         msg_label = QLabel(f"Message: {self.notification_data.get('message')}")
@@ -84,13 +87,11 @@ class NotificationOverlay(QWidget):
         container.setGraphicsEffect(shadow)
 
     def speak(self):
-        try:
-            engine = pyttsx3.init()
-            text = f"Demande {'urgente' if self.is_urgent else ''} de {self.notification_data.get('sender_station')}. Produit: {self.notification_data.get('product_name')}. Quantité: {self.notification_data.get('quantity')}."
-            engine.say(text)
-            engine.runAndWait()
-        except Exception as e:
-            print(f"TTS Error: {e}")
+        if self.is_expiry_alert:
+            SpeechService.instance().speak(f"Alerte péremption. {self.notification_data.get('product_name')}.", PRIORITY_NORMAL)
+            return
+        text = f"Demande {'urgente' if self.is_urgent else ''} de {self.notification_data.get('sender_station')}. Produit: {self.notification_data.get('product_name')}. Quantité: {self.notification_data.get('quantity')}."
+        SpeechService.instance().speak(text, PRIORITY_HIGH if self.is_urgent else PRIORITY_NORMAL)
 
     def confirm(self):
         self.responded.emit(self.notification_data['id'], 'confirmed')
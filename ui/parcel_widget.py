@@ -190,16 +190,14 @@ class ParcelWidget(QWidget):
         if not self.items_to_print:
             return
 
-        try:
-            # Create temp file
-            fd, path = tempfile.mkstemp(suffix=".pdf")
-            os.close(fd)
-            
-            generate_parcel_pdf(self.items_to_print, path)
-            
-            # Print with Dialog
-            from utils.printer_utils import print_pdf_with_dialog
-            print_pdf_with_dialog(path)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Erreur", f"Erreur lors de l'impression: {e}")
+        from utils.printer_utils import ask_printer_name
+        from utils.print_spooler import PrintSpooler, KIND_PARCEL
+
+        printer_name = ask_printer_name(self)
+        if printer_name is None:
+            return
+
+        # Printed in the background: the list is freed for the next parcel
+        PrintSpooler.instance().submit(KIND_PARCEL, self.items_to_print, printer_name, title=f"{len(self.items_to_print)} étiquette(s) colis")
+        self.clear_list()
+        self.scan_input.setFocus()
@@ -0,0 +1,233 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView,
+    QMessageBox, QApplication, QCompleter, QFileDialog, QStyle
+)
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtGui import QFont
+from database.connection import get_product_families, get_product_labs
+from database.missing_items import get_missing_list
+from database.rotation_query import RotationQueryRunner
+from utils.lazy_import import lazy_import
+import logging
+
+pd = lazy_import('pandas')
+
+logger = logging.getLogger(__name__)
+
+SOURCE_FAMILY = 'family'
+SOURCE_LAB = 'lab'
+SOURCE_MISSING = 'missing'
+
+class RotationBatchThread(QThread):
+    loaded = pyqtSignal(object) # Emits RotationMatrix
+    error = pyqtSignal(str)
+
+    def __init__(self, year, months, codes=None, famille=None, labo=None):
+        super().__init__()
+        self.params = dict(year=year, months=months, codes=codes, famille=famille, labo=labo)
+
+    def run(self):
+        try:
+            self.loaded.emit(RotationQueryRunner.instance().analyze_batch(**self.params))
+        except Exception as e:
+            logger.error(f"Batch rotation error: {e}")
+            self.error.emit(str(e))
+
+class RotationBatchDialog(QDialog):
+    """Rotation of a whole family, lab or of the missing list as a product x month matrix."""
+
+    def __init__(self, year, months, parent=None):
+        super().__init__(parent)
+        self.year = year
+        self.months = months
+        self.matrix = None
+        self._thread = None
+        self._families = None
+        self._labs = None
+
+        period = f"{year}" + (f" - mois {', '.join(map(str, months))}" if months else "")
+        self.setWindowTitle(f"Rotation par lot ({period})")
+        self.resize(1100, 650)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(QLabel("Source:"))
+        self.source_combo = QComboBox()
+        self.source_combo.addItem("Famille", SOURCE_FAMILY)
+        self.source_combo.addItem("Laboratoire", SOURCE_LAB)
+        self.source_combo.addItem("Liste des manquants", SOURCE_MISSING)
+        self.source_combo.currentIndexChanged.connect(self.on_source_changed)
+        top_layout.addWidget(self.source_combo)
+
+        self.value_combo = QComboBox()
+        self.value_combo.setEditable(True)
+        self.value_combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+        self.value_combo.setFixedWidth(350)
+        top_layout.addWidget(self.value_combo)
+
+        self.analyze_btn = QPushButton("Analyser")
+        self.analyze_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_ComputerIcon))
+        self.analyze_btn.clicked.connect(self.run_analysis)
+        top_layout.addWidget(self.analyze_btn)
+
+        self.export_btn = QPushButton("Exporter Excel")
+        self.export_btn.setEnabled(False)
+        self.export_btn.clicked.connect(self.export_to_excel)
+        top_layout.addWidget(self.export_btn)
+
+        top_layout.addStretch()
+        layout.addLayout(top_layout)
+
+        self.table = QTableWidget()
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setAlternatingRowColors(True)
+        layout.addWidget(self.table)
+
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: #666;")
+        layout.addWidget(self.status_label)
+
+        self.setLayout(layout)
+        self.on_source_changed()
+
+    def on_source_changed(self):
+        source = self.source_combo.currentData()
+        self.value_combo.clear()
+        self.value_combo.setVisible(source != SOURCE_MISSING)
+        if source == SOURCE_MISSING:
+            return
+
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            if source == SOURCE_FAMILY:
+                if self._families is None:
+                    self._families = get_product_families()
+                for family in self._families:
+                    self.value_combo.addItem(str(family), family)
+            else:
+                if self._labs is None:
+                    self._labs = get_product_labs()
+                for lab in self._labs:
+                    self.value_combo.addItem(str(lab.get('DESIGNATION') or lab.get('CODE')), lab.get('CODE'))
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        completer = QCompleter(self.value_combo.model())
+        completer.setFilterMode(Qt.MatchFlag.MatchContains)
+        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.value_combo.setCompleter(completer)
+
+    def get_missing_codes(self):
+        # Same products as the missing tab (deleted reports excluded)
+        return [entry.product_code for entry in get_missing_list()]
+
+    def run_analysis(self):
+        if self._thread and self._thread.isRunning():
+            return
+
+        source = self.source_combo.currentData()
+        params = dict(year=self.year, months=self.months)
+        if source == SOURCE_MISSING:
+            params['codes'] = self.get_missing_codes()
+            if not params['codes']:
+                QMessageBox.information(self, "Info", "La liste des manquants est vide.")
+                return
+        else:
+            value = self.value_combo.currentData()
+            if not value:
+                QMessageBox.warning(self, "Attention", "Veuillez sélectionner une valeur.")
+                return
+            params['famille' if source == SOURCE_FAMILY else 'labo'] = value
+
+        self.analyze_btn.setEnabled(False)
+        self.export_btn.setEnabled(False)
+        self.status_label.setText("Analyse en cours...")
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+
+        self._thread = RotationBatchThread(**params)
+        self._thread.loaded.connect(self.on_loaded)
+        self._thread.error.connect(self.on_error)
+        self._thread.finished.connect(self.on_thread_finished)
+        self._thread.start()
+
+    def on_thread_finished(self):
+        QApplication.restoreOverrideCursor()
+        self.analyze_btn.setEnabled(True)
+
+    def on_error(self, message):
+        self.status_label.setText("Erreur lors de l'analyse.")
+        QMessageBox.critical(self, "Erreur", f"Erreur lors de l'exécution: {message}")
+
+    def on_loaded(self, matrix):
+        self.matrix = matrix
+        self.export_btn.setEnabled(bool(matrix.products))
+
+        headers = ["Produit"] + matrix.months + ["Total", "Stock Actuel"]
+        products = matrix.sorted_products()
+
+        self.table.setRowCount(0)
+        self.table.setColumnCount(len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.setRowCount(len(products) + 1)
+
+        for r, (code, product) in enumerate(products):
+            name_item = QTableWidgetItem(str(product['designation']))
+            name_item.setData(Qt.ItemDataRole.UserRole, code)
+            self.table.setItem(r, 0, name_item)
+            values = [product['sales'].get(m, 0) for m in matrix.months] + [product['total'], product['stock']]
+            for c, value in enumerate(values, start=1):
+                self.table.setItem(r, c, self._number_item(value))
+
+        # Total Row
+        bold = QFont("Arial", 10, QFont.Weight.Bold)
+        total_row = len(products)
+        total_label = QTableWidgetItem("TOTAL")
+        total_label.setFont(bold)
+        self.table.setItem(total_row, 0, total_label)
+        month_totals = matrix.month_totals()
+        totals = [month_totals[m] for m in matrix.months]
+        totals += [sum(totals), sum(p['stock'] for p in matrix.products.values())]
+        for c, value in enumerate(totals, start=1):
+            item = self._number_item(value)
+            item.setFont(bold)
+            self.table.setItem(total_row, c, item)
+
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        for c in range(1, len(headers)):
+            header.setSectionResizeMode(c, QHeaderView.ResizeMode.ResizeToContents)
+
+        self.status_label.setText(f"Analyse terminée. {len(products)} produits.")
+
+    def _number_item(self, value):
+        value = float(value or 0)
+        item = QTableWidgetItem(f"{value:.0f}" if value.is_integer() else f"{value:.2f}")
+        item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        return item
+
+    def export_to_excel(self):
+        if not self.matrix or not self.matrix.products:
+            return
+
+        data = []
+        for code, product in self.matrix.sorted_products():
+            row = {"Code": code, "Produit": product['designation']}
+            for m in self.matrix.months:
+                row[m] = product['sales'].get(m, 0)
+            row["Total"] = product['total']
+            row["Stock Actuel"] = product['stock']
+            data.append(row)
+        df = pd.DataFrame(data, columns=["Code", "Produit"] + self.matrix.months + ["Total", "Stock Actuel"])
+
+        filename, _ = QFileDialog.getSaveFileName(self, "Exporter Excel", f"Rotation_{self.year}.xlsx", "Excel Files (*.xlsx)")
+        if filename:
+            try:
+                df.to_excel(filename, index=False)
+                QMessageBox.information(self, "Succès", f"Rotation exportée vers {filename}")
+            except Exception as e:
+                QMessageBox.critical(self, "Erreur", f"Erreur lors de l'export: {e}")
@@ -6,11 +6,10 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QStringListModel, QEvent, QTimer
 from PyQt6.QtGui import QStandardItemModel, QStandardItem, QPalette, QFont
-from database.connection import get_xpertpharm_connection
+from database.rotation_query import RotationQueryRunner
 from database.cache import ProductCache
 import logging
 from datetime import datetime
-import os
 
 logger = logging.getLogger(__name__)
 
@@ -156,6 +155,13 @@ class RotationWidget(QWidget):
         analyze_btn.clicked.connect(self.run_analysis)
         top_layout.addWidget(analyze_btn)
         
+        # Batch Button (family / lab / missing list)
+        batch_btn = QPushButton("Analyse par lot")
+        batch_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_FileDialogDetailedView))
+        batch_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        batch_btn.clicked.connect(self.open_batch_analysis)
+        top_layout.addWidget(batch_btn)
+        
         top_layout.addStretch()
         layout.addLayout(top_layout)
 
@@ -269,11 +275,6 @@ class RotationWidget(QWidget):
         year = self.year_combo.currentData()
         selected_months = self.month_combo.get_checked_data()
         
-        if not selected_months:
-            mois_str = '' 
-        else:
-            mois_str = ','.join(map(str, selected_months))
-
         self.table.setRowCount(0)
         self.table.setColumnCount(0)
         self.status_label.setText("Analyse en cours...")
@@ -290,31 +291,14 @@ class RotationWidget(QWidget):
         QApplication.processEvents()
 
         try:
-            sql_file_path = os.path.join(os.getcwd(), "rotation.sql")
-            if not os.path.exists(sql_file_path):
-                 progress.close()
-                 QMessageBox.critical(self, "Erreur", f"Fichier SQL introuvable: {sql_file_path}")
-                 return
-
-            with open(sql_file_path, 'r', encoding='utf-8') as f:
-                sql_query = f.read()
-
-            # Replace parameters
-            import re
-            sql_query = re.sub(r"DECLARE @EXERCICE varchar\(4\) = '[^']*';", f"DECLARE @EXERCICE varchar(4) = '{year}';", sql_query)
-            sql_query = re.sub(r"DECLARE @CODE_PRODUIT varchar\(32\) = NULL;", f"DECLARE @CODE_PRODUIT varchar(32) = '{self.selected_product_code}';", sql_query)
-            sql_query = re.sub(r"DECLARE @MOIS varchar\(100\) = '';", f"DECLARE @MOIS varchar(100) = '{mois_str}';", sql_query)
-
-            conn = get_xpertpharm_connection()
-            if not conn:
+            try:
+                result = RotationQueryRunner.instance().analyze(self.selected_product_code, year, selected_months)
+            except (FileNotFoundError, ConnectionError) as e:
                 progress.close()
-                QMessageBox.critical(self, "Erreur", "Impossible de se connecter à XpertPharm.")
+                QMessageBox.critical(self, "Erreur", str(e))
                 return
             
-            cursor = conn.cursor()
-            cursor.execute(sql_query)
-            
-            rows = cursor.fetchall()
+            rows = result.rows
             
             # Columns: PRODUIT, MOIS, QUANTITE_VENDU
             columns = ["Produit", "Mois", "Quantité"]
@@ -355,30 +339,9 @@ class RotationWidget(QWidget):
             header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
             header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
             
-            # Fetch Stock Quantity
-            stock_sql = f"""
-              DECLARE @CODE_PRODUIT varchar(32) = '{self.selected_product_code}';
-
-              SELECT
-                  ISNULL(stk.QTE_STOCK_TOTAL, 0) AS QTE_STOCK_TOTAL
-              FROM dbo.STK_PRODUITS AS p
-              LEFT JOIN (
-                  SELECT CODE_PRODUIT, SUM(QUANTITE) AS QTE_STOCK_TOTAL
-                  FROM dbo.STK_STOCK
-                  WHERE (DATE_PEREMPTION > GETDATE() OR DATE_PEREMPTION IS NULL)
-                      AND CODE_PRODUIT = @CODE_PRODUIT
-                  GROUP BY CODE_PRODUIT
-              ) AS stk ON stk.CODE_PRODUIT = p.CODE_PRODUIT
-              WHERE p.CODE_PRODUIT = @CODE_PRODUIT;
-            """
-            cursor.execute(stock_sql)
-            stock_row = cursor.fetchone()
-            if stock_row:
-                self.stock_label.setText(f"Stock Actuel: {stock_row[0]}")
-            else:
-                self.stock_label.setText("Stock Actuel: 0")
+            # Stock Quantity (fetched in the same batch)
+            self.stock_label.setText(f"Stock Actuel: {result.stock}")
             
-            conn.close()
             self.status_label.setText(f"Analyse terminée. {len(rows)} lignes.")
 
         except Exception as e:
@@ -388,3 +351,8 @@ class RotationWidget(QWidget):
         finally:
             progress.close()
             QApplication.restoreOverrideCursor()
+
+    def open_batch_analysis(self):
+        from ui.rotation_batch_dialog import RotationBatchDialog
+        dialog = RotationBatchDialog(self.year_combo.currentData(), self.month_combo.get_checked_data(), self)
+        dialog.exec()
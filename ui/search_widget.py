@@ -17,8 +17,10 @@ class BackgroundDelegate(QStyledItemDelegate):
         super().paint(painter, option, index)
 
 from database.connection import get_db
-from database.models import Product, Location, MissingItem, Nomenclature, Notification
+from database.models import Product, Location, Nomenclature, Notification
+from database.missing_items import report_missing, upsert_missing
 from database.cache import ProductCache
+from database.stock_snapshot import StockSnapshotService, format_quantity, format_tooltip
 from ui.request_dialog import RequestDialog
 from config import config
 from sqlalchemy.orm import joinedload
@@ -32,6 +34,10 @@ class SearchWidget(QWidget):
         super().__init__()
         self.init_ui()
         
+        # XpertPharm stock column, filled when the batched snapshot arrives
+        self.stock_service = StockSnapshotService.instance()
+        self.stock_service.loaded.connect(self.update_stock_column)
+        
         # Debounce timer
         self.search_timer = QTimer()
         self.search_timer.setSingleShot(True)
@@ -52,11 +58,11 @@ class SearchWidget(QWidget):
 
         # Results Table
         self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(["Emplacement", "Code", "Désignation", "Code Barre", "Date Exp", "Actions"])
+        self.table.setColumnCount(7)
+        self.table.setHorizontalHeaderLabels(["Emplacement", "Code", "Désignation", "Code Barre", "Date Exp", "Stock XP", "Actions"])
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch) # Designation
-        for i in [0, 1, 3, 4, 5]:
+        for i in [0, 1, 3, 4, 5, 6]:
             header.setSectionResizeMode(i, QHeaderView.ResizeMode.ResizeToContents)
         self.table.verticalHeader().setDefaultSectionSize(48)
         
@@ -126,6 +132,7 @@ class SearchWidget(QWidget):
             self.table.setItem(row, 2, create_stock_item(designation))
             self.table.setItem(row, 3, create_stock_item(prod.barcode))
             self.table.setItem(row, 4, create_stock_item(str(prod.expiry_date)))
+            self.table.setItem(row, 5, create_stock_item(""))
             
             # Actions Widget
             actions_widget = QWidget()
@@ -157,7 +164,7 @@ class SearchWidget(QWidget):
             actions_layout.addWidget(msg_btn)
             
             actions_widget.setLayout(actions_layout)
-            self.table.setCellWidget(row, 5, actions_widget)
+            self.table.setCellWidget(row, 6, actions_widget)
 
         # Display Distinct Products (Catalog View)
         start_distinct = len(stock_lines)
@@ -182,6 +189,7 @@ class SearchWidget(QWidget):
             self.table.setItem(row, 2, create_colored_item(designation))
             self.table.setItem(row, 3, create_colored_item(""))
             self.table.setItem(row, 4, create_colored_item("")) # No expiry for generic view
+            self.table.setItem(row, 5, create_colored_item(""))
             
             # Actions Widget for Catalog items
             actions_widget = QWidget()
@@ -202,7 +210,35 @@ class SearchWidget(QWidget):
             actions_layout.addWidget(add_missing_btn)
 
             actions_widget.setLayout(actions_layout)
-            self.table.setCellWidget(row, 5, actions_widget)
+            self.table.setCellWidget(row, 6, actions_widget)
+
+        # Stock of every listed product in one batched query
+        codes = {str(prod.code) for prod in stock_lines} | {str(code) for code, _ in cache_results}
+        self.update_stock_column(codes)
+        self.stock_service.prefetch(codes)
+
+    def displayed_codes(self):
+        return [self.table.item(row, 1).text() for row in range(self.table.rowCount()) if self.table.item(row, 1)]
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Visible again: the listed products are refreshed in the background again
+        self.stock_service.prefetch(self.displayed_codes())
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.stock_service.unwatch(self.displayed_codes())
+
+    def update_stock_column(self, codes):
+        for row in range(self.table.rowCount()):
+            code_item = self.table.item(row, 1)
+            stock_item = self.table.item(row, 5)
+            if not code_item or not stock_item or code_item.text() not in codes:
+                continue
+            snapshot = self.stock_service.get(code_item.text())
+            if snapshot is not None:
+                stock_item.setText(format_quantity(snapshot))
+                stock_item.setToolTip(format_tooltip(snapshot))
 
 
     def on_table_double_click(self, row, column):
@@ -271,31 +307,15 @@ class SearchWidget(QWidget):
             return
 
         try:
-            with get_db() as db:
-                if not db: return
-                
-                existing = db.query(MissingItem).filter(MissingItem.product_code == code).first()
-                if existing:
-                    existing.reported_at = datetime.now()
-                    msg = f"Le produit '{designation}' était déjà dans la liste des manquants. Date mise à jour."
-                else:
-                    # Ensure Nomenclature exists locally (sync if needed)
-                    nom = db.query(Nomenclature).filter(Nomenclature.code == code).first()
-                    if not nom:
-                        nom = Nomenclature(code=code, designation=designation, last_edit_date=datetime.now())
-                        db.add(nom)
-                        db.commit() # Commit to be safe
-                    
-                    new_missing = MissingItem(
-                        product_code=code,
-                        source="Recherche",
-                        reported_at=datetime.now()
-                    )
-                    db.add(new_missing)
-                    msg = f"Le produit '{designation}' a été ajouté aux manquants."
-                
-                db.commit()
-                QMessageBox.information(self, "Succès", msg)
+            # Creates the nomenclature row if needed, merges into an existing report
+            report = report_missing(code, "Recherche", designation=designation)
+            if not report:
+                return
+            if report.inserted:
+                msg = f"Le produit '{designation}' a été ajouté aux manquants."
+            else:
+                msg = f"Le produit '{designation}' était déjà dans la liste des manquants. Date mise à jour."
+            QMessageBox.information(self, "Succès", msg)
         except Exception as e:
             QMessageBox.critical(self, "Erreur", f"Erreur lors de l'ajout aux manquants: {e}")
 
@@ -348,26 +368,9 @@ class SearchWidget(QWidget):
                         # It was the last one
                         designation = prod.nomenclature.designation if prod.nomenclature else "Inconnu"
                         
-                        # Check if already in missing
-                        existing_missing = db.query(MissingItem).filter(MissingItem.product_code == code).first()
-                        if not existing_missing:
-                            new_missing = MissingItem(
-                                product_code=code,
-                                source="Manquant", # Assuming auto-add is Manquant source here too? Or "Recherche"?
-                                # Wait, previous code had designation=designation which is wrong for new model.
-                                # And it didn't have source.
-                                # Let's fix this while we are here.
-                                # The original code was:
-                                # new_missing = MissingItem(product_code=code, designation=designation, reported_at=datetime.now())
-                                # But MissingItem no longer has designation.
-                                # And it needs source.
-                                # I should fix this.
-                                reported_at=datetime.now()
-                            )
-                            # Let's set source="Recherche" or "Suppression"
-                            new_missing.source = "Recherche" 
-                            db.add(new_missing)
-                            QMessageBox.information(self, "Info", f"Le produit '{designation}' était le dernier en stock. Il a été ajouté aux manquants.")
+                        # Same transaction as the deletion
+                        upsert_missing(db, code, "Recherche")
+                        QMessageBox.information(self, "Info", f"Le produit '{designation}' était le dernier en stock. Il a été ajouté aux manquants.")
 
                     db.commit()
                     
@@ -1,10 +1,21 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
-    QPushButton, QMessageBox, QGroupBox, QFormLayout, QCheckBox
+    QPushButton, QMessageBox, QGroupBox, QFormLayout, QCheckBox,
+    QSpinBox, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
 )
 from config import config
+from server_config import is_server_mode
 import os
 
+SYNC_INTERVAL_FIELDS = [
+    # (config key, label)
+    ('SALES_SYNC_INTERVAL_MIN', "Historique des ventes (min):"),
+    ('SYNC_CACHE_INTERVAL_MIN', "Cache produits (min):"),
+    ('SYNC_NOMENCLATURE_INTERVAL_MIN', "Noms de la nomenclature (min):"),
+    ('SYNC_INVOICES_INTERVAL_MIN', "Factures récentes (min):"),
+    ('EXPIRY_ALERT_INTERVAL_MIN', "Alertes de péremption (min):"),
+]
+
 class SettingsWidget(QWidget):
     def __init__(self):
         super().__init__()
@@ -67,6 +78,12 @@ class SettingsWidget(QWidget):
         
         self.station_name = QLineEdit()
         app_layout.addRow("Nom du Poste:", self.station_name)
+
+        self.pick_route_aisles = QLineEdit()
+        self.pick_route_aisles.setPlaceholderText("A,B;C,D;E,F")
+        self.pick_route_aisles.setToolTip("Rangées partageant une allée, dans l'ordre de passage (allées séparées par ';').\n"
+                                          "Utilisé pour trier les listes d'approvisionnement à l'export et à la validation.")
+        app_layout.addRow("Allées (ordre de passage):", self.pick_route_aisles)
         
         # Reload Cache Button
         reload_cache_btn = QPushButton("Recharger le cache produits")
@@ -77,6 +94,8 @@ class SettingsWidget(QWidget):
         app_group.setLayout(app_layout)
         layout.addWidget(app_group)
 
+        layout.addWidget(self.create_sync_group())
+
         # Save Button
         save_btn = QPushButton("Enregistrer")
         save_btn.clicked.connect(self.save_settings)
@@ -107,8 +126,21 @@ class SettingsWidget(QWidget):
         
         self.is_server_cb.setChecked(config.IS_SERVER)
         self.station_name.setText(config.STATION_NAME)
+        self.pick_route_aisles.setText(config.PICK_ROUTE_AISLES)
+
+        for key, spin in self.sync_intervals.items():
+            spin.setValue(getattr(config, key))
+        self.off_peak_start.setText(config.SYNC_OFF_PEAK_START)
+        self.off_peak_end.setText(config.SYNC_OFF_PEAK_END)
 
     def save_settings(self):
+        from database.sync_scheduler import parse_hour
+        for field, name in ((self.off_peak_start, "début"), (self.off_peak_end, "fin")):
+            if parse_hour(field.text()) is None:
+                QMessageBox.warning(self, "Attention", f"Heure de {name} des heures creuses invalide (HH:MM, 00:00 à 23:59).")
+                field.setFocus()
+                return
+
         # Write to .env file
         env_content = f"""
 PG_HOST={self.pg_host.text()}
@@ -124,10 +156,27 @@ SQL_PASSWORD={self.sql_pass.text()}
 
 IS_SERVER={str(self.is_server_cb.isChecked()).lower()}
 STATION_NAME={self.station_name.text()}
+PICK_ROUTE_AISLES={self.pick_route_aisles.text().strip()}
+PICK_ROUTE_AISLE_SPACING={config.PICK_ROUTE_AISLE_SPACING}
+PICK_ROUTE_FLOOR_SPACING={config.PICK_ROUTE_FLOOR_SPACING}
+
+SALES_HISTORY_START={config.SALES_HISTORY_START}
+SALES_RELOAD_DAYS={config.SALES_RELOAD_DAYS}
+SYNC_OFF_PEAK_START={self.off_peak_start.text()}
+SYNC_OFF_PEAK_END={self.off_peak_end.text()}
+SYNC_JITTER_PCT={config.SYNC_JITTER_PCT}
+EXPIRY_ALERT_DAYS={config.EXPIRY_ALERT_DAYS}
+EXPIRY_URGENT_DAYS={config.EXPIRY_URGENT_DAYS}
 """
+        env_content += "\n".join(f"{key}={spin.value()}" for key, spin in self.sync_intervals.items())
         try:
             with open(".env", "w") as f:
                 f.write(env_content.strip())
+
+            # The walking order applies without restarting
+            from utils.pick_route import reset_default_topology
+            config.PICK_ROUTE_AISLES = self.pick_route_aisles.text().strip()
+            reset_default_topology()
             
             QMessageBox.information(self, "Succès", "Paramètres enregistrés. Veuillez redémarrer l'application.")
         except Exception as e:
@@ -137,3 +186,126 @@ STATION_NAME={self.station_name.text()}
         from database.cache import ProductCache
         ProductCache.instance().reload_cache()
         QMessageBox.information(self, "Info", "Le rechargement du cache a été lancé en arrière-plan.")
+
+    def create_sync_group(self):
+        sync_group = QGroupBox("Synchronisation automatique")
+        sync_layout = QVBoxLayout()
+
+        form = QFormLayout()
+        self.sync_intervals = {}
+        self.sync_progress = {}  # task name -> (percent, message) of the running task
+        for key, label in SYNC_INTERVAL_FIELDS:
+            spin = QSpinBox()
+            spin.setRange(1, 10080)
+            form.addRow(label, spin)
+            self.sync_intervals[key] = spin
+
+        off_peak_layout = QHBoxLayout()
+        self.off_peak_start = QLineEdit()
+        self.off_peak_start.setInputMask("99:99")
+        self.off_peak_end = QLineEdit()
+        self.off_peak_end.setInputMask("99:99")
+        off_peak_layout.addWidget(self.off_peak_start)
+        off_peak_layout.addWidget(QLabel("à"))
+        off_peak_layout.addWidget(self.off_peak_end)
+        form.addRow("Heures creuses:", off_peak_layout)
+        sync_layout.addLayout(form)
+
+        self.sync_table = QTableWidget()
+        self.sync_table.setColumnCount(5)
+        self.sync_table.setHorizontalHeaderLabels(["Tâche", "Dernière exécution", "Résultat", "Prochaine exécution", "Action"])
+        self.sync_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.sync_table.verticalHeader().setVisible(False)
+        self.sync_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        sync_layout.addWidget(self.sync_table)
+
+        history_btn = QPushButton("Historique")
+        history_btn.clicked.connect(self.show_sync_history)
+        sync_layout.addWidget(history_btn)
+
+        sync_group.setLayout(sync_layout)
+
+        # The scheduler only runs on the server
+        if is_server_mode():
+            from database.sync_scheduler import SyncScheduler
+            scheduler = SyncScheduler.instance()
+            scheduler.task_started.connect(lambda _: self.refresh_sync_status())
+            scheduler.task_progress.connect(self.on_sync_progress)
+            scheduler.task_finished.connect(self.on_sync_finished)
+            self.refresh_sync_status()
+        else:
+            self.sync_table.setVisible(False)
+            sync_layout.insertWidget(1, QLabel("Les synchronisations sont exécutées par le poste serveur."))
+        return sync_group
+
+    def refresh_sync_status(self):
+        from database.sync_scheduler import SyncScheduler
+        scheduler = SyncScheduler.instance()
+        tasks = list(scheduler.tasks.values())
+
+        self.sync_table.setRowCount(len(tasks))
+        for row, task in enumerate(tasks):
+            last_run = task.last_run.strftime('%d/%m %H:%M') if task.last_run else "-"
+            next_run = task.next_run.strftime('%d/%m %H:%M') if task.next_run else "-"
+            if scheduler.running == task.name:
+                result = self.format_sync_progress(task.name)
+            elif task.last_status:
+                result = ("OK" if task.last_status == 'success' else "Erreur") + (f" : {task.last_details}" if task.last_details else "")
+            else:
+                result = ""
+            if task.off_peak:
+                next_run += " (heures creuses)"
+
+            for col, value in enumerate([task.label, last_run, result, next_run]):
+                self.sync_table.setItem(row, col, QTableWidgetItem(value))
+
+            run_btn = QPushButton("Lancer maintenant")
+            run_btn.setEnabled(scheduler.running != task.name)
+            run_btn.clicked.connect(lambda checked, name=task.name: SyncScheduler.instance().run_now(name))
+            self.sync_table.setCellWidget(row, 4, run_btn)
+        self.sync_table.resizeColumnsToContents()
+
+    def format_sync_progress(self, name):
+        percent, message = self.sync_progress.get(name, (0, ""))
+        return f"En cours... {percent}%" + (f" - {message}" if message else "")
+
+    def on_sync_progress(self, name, percent, message):
+        from database.sync_scheduler import SyncScheduler
+        self.sync_progress[name] = (percent, message)
+        names = list(SyncScheduler.instance().tasks)
+        if name in names and names.index(name) < self.sync_table.rowCount():
+            self.sync_table.setItem(names.index(name), 2, QTableWidgetItem(self.format_sync_progress(name)))
+
+    def on_sync_finished(self, name, success, summary):
+        self.sync_progress.pop(name, None)
+        self.refresh_sync_status()
+
+    def show_sync_history(self):
+        from PyQt6.QtWidgets import QDialog
+        from database.sync_scheduler import get_sync_history
+        try:
+            runs = get_sync_history(50)
+        except Exception as e:
+            QMessageBox.critical(self, "Erreur", f"Impossible de charger l'historique: {e}")
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Historique des synchronisations")
+        dialog.resize(800, 400)
+        layout = QVBoxLayout(dialog)
+        table = QTableWidget(len(runs), 5)
+        table.setHorizontalHeaderLabels(["Tâche", "Début", "Fin", "Statut", "Détails"])
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        for row, (task, started_at, finished_at, status, details) in enumerate(runs):
+            values = [
+                task,
+                started_at.strftime('%d/%m/%Y %H:%M:%S') if started_at else "",
+                finished_at.strftime('%d/%m/%Y %H:%M:%S') if finished_at else "",
+                status or "",
+                details or "",
+            ]
+            for col, value in enumerate(values):
+                table.setItem(row, col, QTableWidgetItem(value))
+        table.horizontalHeader().setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(table)
+        dialog.exec()
@@ -4,8 +4,11 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt
 from database.connection import get_db
-from database.models import SupplyList, SupplyListItem, Location, Product, MissingItem
+from database.models import SupplyList, SupplyListItem, Location, Product
+from database.missing_items import upsert_missing
 from ui.dialogs import ChangeLocationDialog
+from database.location_registry import LocationRegistry
+from utils.pick_route import sort_items
 import logging
 from datetime import datetime
 
@@ -94,13 +97,16 @@ class ValidationWidget(QWidget):
         if not self.current_list:
             return
 
-        items = self.current_list.items
+        # Walking order through the shelves (rows are mapped back to items by id)
+        items = sort_items(self.current_list.items)
         self.table.setRowCount(len(items))
         
         is_read_only = self.current_list.status == 'validated'
 
         for row, item in enumerate(items):
-            self.table.setItem(row, 0, QTableWidgetItem(item.designation_1))
+            desig_item = QTableWidgetItem(item.designation_1)
+            desig_item.setData(Qt.ItemDataRole.UserRole, item.id)
+            self.table.setItem(row, 0, desig_item)
             self.table.setItem(row, 1, QTableWidgetItem(item.location_1))
             self.table.setItem(row, 2, QTableWidgetItem(item.location_2 or ""))
             self.table.setItem(row, 3, QTableWidgetItem(str(item.quantity)))
@@ -159,15 +165,14 @@ class ValidationWidget(QWidget):
         dialog = ChangeLocationDialog(-1, self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             new_loc_id = dialog.selected_location_id
-            if new_loc_id:
+            new_loc = LocationRegistry.instance().by_id(new_loc_id) if new_loc_id else None
+            if new_loc:
                 with get_db() as db:
                     if db:
-                        new_loc = db.query(Location).filter(Location.id == new_loc_id).first()
-                        if new_loc:
-                            self.table.item(row, 4).setText(new_loc.label)
-                            item_db = db.merge(item)
-                            item_db.result = new_loc.label
-                            db.commit()
+                        self.table.item(row, 4).setText(new_loc.label)
+                        item_db = db.merge(item)
+                        item_db.result = new_loc.label
+                        db.commit()
 
     def validate_list(self):
         if not self.current_list or self.current_list.status != 'closed':
@@ -181,6 +186,7 @@ class ValidationWidget(QWidget):
             if not db: return
             
             self.current_list = db.merge(self.current_list)
+            items_by_id = {item.id: item for item in self.current_list.items}
             
             # Process items
             for i in range(self.table.rowCount()):
@@ -193,7 +199,9 @@ class ValidationWidget(QWidget):
                 # Note: We need to identify the specific product instance.
                 # SupplyListItem stores product_code_1 and barcode_1.
                 
-                item = self.current_list.items[i]
+                item = items_by_id.get(self.table.item(i, 0).data(Qt.ItemDataRole.UserRole))
+                if item is None:
+                    continue
                 
                 if result in ['S', 'X']:
                     # Delete logic
@@ -218,22 +226,13 @@ class ValidationWidget(QWidget):
                             # It was the last one
                             designation = prod.nomenclature.designation if prod.nomenclature else "Inconnu"
                             
-                            # Check if already in missing
-                            existing_missing = db.query(MissingItem).filter(MissingItem.product_code == code).first()
-                            if not existing_missing:
-                                new_missing = MissingItem(
-                                    product_code=code,
-                                    source="Validation",
-                                    reported_at=datetime.now()
-                                )
-                                db.add(new_missing)
-                                # We can't easily show a message for each item in a loop, maybe log it or just do it silently.
-                                # Or accumulate messages? For now, let's just do it.
-                                logger.info(f"Auto-added {designation} to missing list during validation.")
+                            # Part of the validation transaction
+                            upsert_missing(db, code, "Validation")
+                            logger.info(f"Auto-added {designation} to missing list during validation.")
                 
                 elif result != 'V':
                     # Assume it's a location label
-                    new_loc = db.query(Location).filter(Location.label == result).first()
+                    new_loc = LocationRegistry.instance().by_label(result)
                     if new_loc:
                          prod = db.query(Product).join(Location).filter(Product.barcode == item.barcode_1, Location.label == item.location_1).first()
                          if prod:
@@ -4,15 +4,17 @@ from PyQt6.QtWidgets import (
     QAbstractItemView, QMessageBox, QApplication, QFrame, QStyle
 )
 from PyQt6.QtCore import Qt
-from database.connection import get_xpertpharm_connection
+from database.streaming import StreamQueryThread
+from database.sql_templates import get_template
+from database import sales_warehouse
 import logging
-import os
 
 logger = logging.getLogger(__name__)
 
 class XpMissingWidget(QWidget):
     def __init__(self):
         super().__init__()
+        self._stream = None
         self.init_ui()
 
     def init_ui(self):
@@ -116,6 +118,9 @@ class XpMissingWidget(QWidget):
         self.setLayout(layout)
 
     def run_query(self):
+        if self._stream and self._stream.isRunning():
+            return
+        
         self.table.setRowCount(0)
         self.status_label.setText("Recherche en cours...")
         QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
@@ -126,43 +131,25 @@ class XpMissingWidget(QWidget):
             stock_min = self.min_stock_spin.value()
             stock_max = self.max_stock_spin.value()
             
-            sql_file_path = os.path.join(os.getcwd(), "manquants.sql")
-            if not os.path.exists(sql_file_path):
-                 QMessageBox.critical(self, "Erreur", f"Fichier SQL introuvable: {sql_file_path}")
-                 return
-
-            with open(sql_file_path, 'r', encoding='utf-8') as f:
-                sql_query = f.read()
-                
-            import re
-            sql_query = re.sub(r"DECLARE @NbJours INT = \d+;", f"DECLARE @NbJours INT = {nb_jours};", sql_query)
-            sql_query = re.sub(r"DECLARE @StockMin INT = \d+;", f"DECLARE @StockMin INT = {stock_min};", sql_query)
-            sql_query = re.sub(r"DECLARE @StockMax INT = \d+;", f"DECLARE @StockMax INT = {stock_max};", sql_query)
+            if sales_warehouse.is_available():
+                self.run_local_query(nb_jours, stock_min, stock_max)
+                return
             
-            conn = get_xpertpharm_connection()
-            if not conn:
-                QMessageBox.critical(self, "Erreur", "Impossible de se connecter à XpertPharm.")
+            self.table.setHorizontalHeaderLabels(["Désignation", "Stock", "Dernière Vente", "Vendu Par"])
+            try:
+                template = get_template("manquants.sql")
+            except FileNotFoundError as e:
+                QMessageBox.critical(self, "Erreur", str(e))
                 return
-                
-            cursor = conn.cursor()
-            cursor.execute(sql_query)
             
-            rows = cursor.fetchall()
-            self.table.setRowCount(len(rows))
+            sql_query, params = template.bind(NbJours=nb_jours, StockMin=stock_min, StockMax=stock_max)
             
-            for r, row in enumerate(rows):
-                self.table.setItem(r, 0, QTableWidgetItem(str(row[3]))) # Designation Produit
-                
-                # Center align numbers
-                stock_item = QTableWidgetItem(str(row[4]))
-                stock_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.table.setItem(r, 1, stock_item) # Stock
-                
-                self.table.setItem(r, 2, QTableWidgetItem(str(row[1]))) # Date Doc
-                self.table.setItem(r, 3, QTableWidgetItem(str(row[2]))) # Created By
-                
-            conn.close()
-            self.status_label.setText(f"{len(rows)} résultats trouvés.")
+            # Rows are appended as they arrive from the server
+            self._stream = StreamQueryThread("SET NOCOUNT ON;\n" + sql_query, params, size=200)
+            self._stream.chunk.connect(self.append_rows)
+            self._stream.done.connect(self.on_stream_done)
+            self._stream.error.connect(self.on_stream_error)
+            self._stream.start()
             
         except Exception as e:
             logger.error(f"Error executing query: {e}")
@@ -170,3 +157,51 @@ class XpMissingWidget(QWidget):
             QMessageBox.critical(self, "Erreur", f"Erreur lors de l'exécution: {e}")
         finally:
             QApplication.restoreOverrideCursor()
+
+    def append_rows(self, rows):
+        start = self.table.rowCount()
+        self.table.setRowCount(start + len(rows))
+        
+        for r, row in enumerate(rows, start=start):
+            self.table.setItem(r, 0, QTableWidgetItem(str(row[3]))) # Designation Produit
+            
+            # Center align numbers
+            stock_item = QTableWidgetItem(str(row[4]))
+            stock_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.table.setItem(r, 1, stock_item) # Stock
+            
+            self.table.setItem(r, 2, QTableWidgetItem(str(row[1]))) # Date Doc
+            self.table.setItem(r, 3, QTableWidgetItem(str(row[2]))) # Created By
+        
+        self.status_label.setText(f"Recherche en cours... {self.table.rowCount()} résultats.")
+
+    def on_stream_done(self, total):
+        self.status_label.setText(f"{total} résultats trouvés.")
+
+    def on_stream_error(self, message):
+        self.status_label.setText("Erreur lors de la recherche.")
+        QMessageBox.critical(self, "Erreur", f"Erreur lors de l'exécution: {message}")
+
+    def run_local_query(self, nb_jours, stock_min, stock_max):
+        """Same search on the local sales warehouse (no load on XpertPharm)."""
+        self.table.setHorizontalHeaderLabels(["Désignation", "Stock", "Dernière Vente", "Qté Vendue"])
+        
+        rows = sales_warehouse.recent_low_stock(nb_jours, stock_min, stock_max)
+        self.table.setRowCount(len(rows))
+        
+        for r, (designation, stock, last_sale, sold) in enumerate(rows):
+            self.table.setItem(r, 0, QTableWidgetItem(str(designation)))
+            
+            stock_item = QTableWidgetItem(f"{stock:g}")
+            stock_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.table.setItem(r, 1, stock_item)
+            
+            self.table.setItem(r, 2, QTableWidgetItem(str(last_sale)))
+            
+            sold_item = QTableWidgetItem(f"{sold or 0:g}")
+            sold_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.table.setItem(r, 3, sold_item)
+        
+        synced_at = sales_warehouse.last_sync_time()
+        synced_str = f" (données du {synced_at.strftime('%d/%m %H:%M')})" if synced_at else ""
+        self.status_label.setText(f"{len(rows)} résultats trouvés{synced_str}.")
@@ -0,0 +1,125 @@
+"""
+Code128 encoder and vector painter for QPainter.
+
+Bars are drawn as filled rectangles snapped to whole device pixels, so a
+203/300 dpi thermal printer receives sharp edges instead of a scaled
+bitmap, and the print job only carries a few dozen rectangles per label.
+"""
+from PyQt6.QtCore import Qt, QRectF
+from PyQt6.QtGui import QPainter
+from functools import lru_cache
+
+# Bar/space widths (in modules) of the 107 Code128 symbols, bar first
+PATTERNS = (
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312", "132212", "221213",
+    "221312", "231212", "112232", "122132", "122231", "113222", "123122", "123221", "223211", "221132",
+    "221231", "213212", "223112", "312131", "311222", "321122", "321221", "312212", "322112", "322211",
+    "212123", "212321", "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121", "313121", "211331",
+    "231131", "213113", "213311", "213131", "311123", "311321", "331121", "312113", "312311", "332111",
+    "314111", "221411", "431111", "111224", "111422", "121124", "121421", "141122", "141221", "112214",
+    "112412", "122114", "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112", "421211", "212141",
+    "214121", "412121", "111143", "111341", "131141", "114113", "114311", "411113", "411311", "113141",
+    "114131", "311141", "411131", "211412", "211214", "211232", "2331112",
+)
+
+CODE_C = 99
+CODE_B = 100
+START_B = 104
+START_C = 105
+STOP = 106
+
+# Quiet zone on each side, in modules (python-barcode used 1mm = 4 modules of 0.25mm)
+QUIET_ZONE = 4
+
+
+def _digit_run(value, start):
+    end = start
+    while end < len(value) and value[end].isdigit():
+        end += 1
+    return end - start
+
+def _symbols(value):
+    """Code128 symbol values (start, data, checksum, stop) using code sets B and C."""
+    for char in value:
+        if not 32 <= ord(char) <= 127:
+            raise ValueError(f"Caractère non encodable en Code128: {char!r}")
+
+    symbols = []
+    code_set = None
+    i = 0
+    while i < len(value):
+        run = _digit_run(value, i)
+        # Set C packs two digits per symbol, worth switching for 4+ digits
+        # (2 digits when they are the whole remaining value)
+        use_c = run >= 4 or (run >= 2 and run == len(value) - i and code_set != 'B')
+        if use_c:
+            if run % 2:
+                # Odd run: the first digit goes in set B so the rest pairs up
+                if code_set is None:
+                    symbols.append(START_B)
+                    code_set = 'B'
+                elif code_set != 'B':
+                    symbols.append(CODE_B)
+                    code_set = 'B'
+                symbols.append(ord(value[i]) - 32)
+                i += 1
+                run -= 1
+            if code_set is None:
+                symbols.append(START_C)
+            elif code_set != 'C':
+                symbols.append(CODE_C)
+            code_set = 'C'
+            for j in range(i, i + run, 2):
+                symbols.append(int(value[j:j + 2]))
+            i += run
+        else:
+            if code_set is None:
+                symbols.append(START_B)
+            elif code_set != 'B':
+                symbols.append(CODE_B)
+            code_set = 'B'
+            symbols.append(ord(value[i]) - 32)
+            i += 1
+
+    checksum = symbols[0] + sum(position * symbol for position, symbol in enumerate(symbols[1:], start=1))
+    symbols.append(checksum % 103)
+    symbols.append(STOP)
+    return symbols
+
+@lru_cache(maxsize=4096)
+def encode(value):
+    """Module widths, alternating bar/space starting with a bar, without quiet zones."""
+    if not value:
+        raise ValueError("Code-barres vide")
+    return tuple(int(width) for symbol in _symbols(value) for width in PATTERNS[symbol])
+
+def module_count(value, quiet_zone=QUIET_ZONE):
+    return sum(encode(value)) + 2 * quiet_zone
+
+
+def draw_code128(painter, rect, value, quiet_zone=QUIET_ZONE):
+    """
+    Draws value as Code128 bars filling rect (device coordinates), centered.
+    The module width is rounded down to whole device pixels when the rect is
+    at least one pixel per module, so every bar has the same printed width.
+    """
+    widths = encode(value)
+    modules = sum(widths) + 2 * quiet_zone
+    module = rect.width() / modules
+    if module >= 1:
+        module = int(module)
+    x = rect.left() + (rect.width() - module * modules) / 2 + quiet_zone * module
+    if module >= 1:
+        x = round(x)
+
+    painter.save()
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+    painter.setPen(Qt.PenStyle.NoPen)
+    painter.setBrush(Qt.GlobalColor.black)
+    for index, width in enumerate(widths):
+        if index % 2 == 0:
+            painter.drawRect(QRectF(x, rect.top(), width * module, rect.height()))
+        x += width * module
+    painter.restore()
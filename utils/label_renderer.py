@@ -0,0 +1,80 @@
+"""
+Label rendering engine for the QPrinter label jobs (products, locations).
+
+Layouts come from the compiled label templates (utils/label_templates) and
+barcodes are vector Code128 bars. Pages are painted by the print spooler
+thread (utils/print_spooler) so the GUI keeps responding while hundreds of
+labels are sent to the printer.
+"""
+from PyQt6.QtGui import QPainter
+from utils.label_templates import get_plan, render_qt, TEMPLATE_PRODUCT
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def format_expiry(expiry_date):
+    if not expiry_date:
+        return ""
+    try:
+        if isinstance(expiry_date, str):
+            return expiry_date
+        return expiry_date.strftime('%m/%y')
+    except Exception:
+        return str(expiry_date)
+
+def _apply_label_page(printer, plan):
+    from PyQt6.QtGui import QPageSize, QPageLayout
+    from PyQt6.QtCore import QSizeF, QMarginsF
+
+    printer.setPageSize(QPageSize(QSizeF(plan.page_width, plan.page_height), QPageSize.Unit.Millimeter))
+    printer.setPageOrientation(QPageLayout.Orientation.Landscape if plan.landscape else QPageLayout.Orientation.Portrait)
+    printer.setPageMargins(QMarginsF(0, 0, 0, 0), QPageLayout.Unit.Millimeter)
+
+def ask_label_printer(parent=None, template=TEMPLATE_PRODUCT):
+    """Name of the printer chosen in the native print dialog for a label template, None if cancelled."""
+    from PyQt6.QtPrintSupport import QPrinter, QPrintDialog
+
+    printer = QPrinter(QPrinter.PrinterMode.HighResolution)
+    _apply_label_page(printer, get_plan(template))
+    dialog = QPrintDialog(printer, parent)
+    if dialog.exec() != QPrintDialog.DialogCode.Accepted:
+        return None
+    return printer.printerName()
+
+def label_printer(printer_name, template):
+    """QPrinter set up for a label template on the named printer (may be created outside the GUI thread)."""
+    from PyQt6.QtPrintSupport import QPrinter
+
+    printer = QPrinter(QPrinter.PrinterMode.HighResolution)
+    if printer_name:
+        printer.setPrinterName(printer_name)
+    _apply_label_page(printer, get_plan(template))
+    return printer
+
+def print_labels(printer, template, labels, progress=None):
+    """
+    Paints labels with a template on printer, filling each page with as many
+    labels as the template grid holds. Pages are handed to the print system
+    as they are painted. labels: plain dicts (no ORM objects).
+    Returns the number of labels printed, raises on failure.
+    """
+    plan = get_plan(template)
+    painter = QPainter()
+    if not painter.begin(printer):
+        raise RuntimeError("Impossible de démarrer l'impression.")
+
+    printed = 0
+    try:
+        dpi = printer.resolution()
+        total = len(labels)
+        for index, page in enumerate(plan.pages(labels)):
+            if index:
+                printer.newPage()
+            render_qt(painter, plan, page, dpi)
+            printed += len(page)
+            if progress:
+                progress(printed, total)
+    finally:
+        painter.end()
+    return printed
@@ -0,0 +1,335 @@
+"""
+Declarative label templates.
+
+A template describes the page (roll label or sheet), the grid of labels on
+the page and the fields of one label (text, barcode) with their boxes in
+millimetres from the top-left corner of the label. Each template is
+compiled once into a LabelPlan; the Qt backend (QPrinter/QPainter) and the
+reportlab backend (PDF) then only format values and draw.
+
+New formats can be added without code by dropping a JSON file with the
+same structure in the label_templates/ folder next to the application.
+"""
+from functools import lru_cache
+import json
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = 'label_templates'
+
+TEMPLATE_PRODUCT = 'product_40x20'
+TEMPLATE_LOCATION = 'location_40x20'
+TEMPLATE_PARCEL = 'parcel_a4_2x2'
+
+BUILTIN_TEMPLATES = {
+    # Thermal roll, one product label per page
+    TEMPLATE_PRODUCT: {
+        'page': {'width_mm': 40, 'height_mm': 20, 'landscape': True},
+        'fields': [
+            {'type': 'text', 'source': 'designation', 'box': [0, 0, 40, 4], 'font': 'Arial', 'size': 10, 'bold': True, 'align': 'center'},
+            {'type': 'barcode', 'source': 'barcode', 'box': [1, 5, 38, 6]},
+            {'type': 'text', 'source': 'expiry_date', 'box': [0, 14, 16, 6], 'font': 'Arial', 'size': 8, 'align': 'left'},
+            {'type': 'text', 'source': 'barcode', 'box': [24, 14, 16, 6], 'font': 'Arial', 'size': 8, 'align': 'right'},
+        ],
+    },
+    # Thermal roll, one shelf label per page
+    TEMPLATE_LOCATION: {
+        'page': {'width_mm': 40, 'height_mm': 20, 'landscape': True},
+        'fields': [
+            {'type': 'text', 'source': 'label', 'box': [2, 0, 20, 6], 'font': 'Arial', 'size': 24, 'bold': True, 'align': 'left'},
+            {'type': 'text', 'source': 'barcode', 'box': [16, 0, 22, 6], 'font': 'Arial', 'size': 16, 'align': 'right'},
+            {'type': 'barcode', 'source': 'barcode', 'box': [1, 6, 38, 13]},
+        ],
+    },
+    # A4 landscape sheet, 2x2 parcel labels
+    TEMPLATE_PARCEL: {
+        'page': {'width_mm': 297, 'height_mm': 210},
+        'grid': {'columns': 2, 'rows': 2, 'border': True},
+        'fields': [
+            {'type': 'text', 'source': 'designation', 'box': [5, 5, 138.5, 66], 'font': 'Helvetica', 'size': 72, 'bold': True,
+             'align': 'left', 'valign': 'top', 'fit': {'max_lines': 3, 'min_size': 40, 'step': 4}},
+            {'type': 'text', 'text': "Imp: {print_date}", 'box': [0, 62, 148.5, 10], 'font': 'Helvetica', 'size': 24,
+             'align': 'center', 'valign': 'bottom'},
+            {'type': 'barcode', 'source': 'barcode', 'box': [5, 77, 100, 15], 'bar_width_mm': 0.65, 'align': 'left',
+             'human_readable': {'font': 'Helvetica', 'size': 16, 'gap_mm': 8}},
+            {'type': 'text', 'text': "E: {expiry_date}", 'box': [60, 72, 83.5, 20], 'font': 'Helvetica', 'size': 48, 'bold': True,
+             'align': 'right', 'valign': 'bottom'},
+        ],
+    },
+}
+
+
+class Field:
+    __slots__ = ('type', 'source', 'text', 'x', 'y', 'w', 'h', 'font', 'size', 'bold', 'align', 'valign',
+                 'fit', 'bar_width_mm', 'human_readable')
+
+    def __init__(self, spec):
+        self.type = spec.get('type', 'text')
+        self.source = spec.get('source')
+        self.text = spec.get('text')
+        self.x, self.y, self.w, self.h = (float(v) for v in spec['box'])
+        self.font = spec.get('font', 'Arial')
+        self.size = float(spec.get('size', 10))
+        self.bold = bool(spec.get('bold', False))
+        self.align = spec.get('align', 'center' if self.type == 'barcode' else 'left')
+        self.valign = spec.get('valign', 'center')
+        self.fit = spec.get('fit')
+        self.bar_width_mm = spec.get('bar_width_mm')  # None: bars stretched over the box
+        self.human_readable = spec.get('human_readable')
+
+    def value(self, label):
+        if self.text is not None:
+            return self.text.format_map(_Values(label))
+        value = label.get(self.source)
+        return "" if value is None else str(value)
+
+
+class _Values(dict):
+    def __init__(self, label):
+        super().__init__(label)
+
+    def __missing__(self, key):
+        return ""
+
+
+class LabelPlan:
+    """Compiled template: page geometry, label origins on the page and fields."""
+
+    def __init__(self, name, spec):
+        page = spec['page']
+        grid = spec.get('grid', {})
+        self.name = name
+        self.page_width = float(page['width_mm'])
+        self.page_height = float(page['height_mm'])
+        self.landscape = bool(page.get('landscape', False))
+
+        columns = int(grid.get('columns', 1))
+        rows = int(grid.get('rows', 1))
+        margin = float(grid.get('margin_mm', 0))
+        gap = float(grid.get('gap_mm', 0))
+        self.border = bool(grid.get('border', False))
+
+        # Label size derived from the page unless given (multi-up sheets with fixed label size)
+        self.label_width = float(grid.get('label_width_mm') or (self.page_width - 2 * margin - (columns - 1) * gap) / columns)
+        self.label_height = float(grid.get('label_height_mm') or (self.page_height - 2 * margin - (rows - 1) * gap) / rows)
+        self.origins = [
+            (margin + c * (self.label_width + gap), margin + r * (self.label_height + gap))
+            for r in range(rows) for c in range(columns)
+        ]
+        self.fields = tuple(Field(f) for f in spec['fields'])
+
+    @property
+    def per_page(self):
+        return len(self.origins)
+
+    def pages(self, labels):
+        """Yields lists of (origin, label) for each page."""
+        labels = list(labels)
+        for start in range(0, len(labels), self.per_page):
+            yield list(zip(self.origins, labels[start:start + self.per_page]))
+
+
+def load_templates():
+    """Built-in templates, overridden or extended by label_templates/*.json."""
+    templates = dict(BUILTIN_TEMPLATES)
+    if os.path.isdir(TEMPLATE_DIR):
+        for filename in sorted(os.listdir(TEMPLATE_DIR)):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(TEMPLATE_DIR, filename), 'r', encoding='utf-8') as f:
+                    templates[filename[:-5]] = json.load(f)
+            except Exception as e:
+                logger.error(f"Label template {filename} ignored: {e}")
+    return templates
+
+@lru_cache(maxsize=None)
+def get_plan(name):
+    """Compiled plan of a template, built once per process."""
+    templates = load_templates()
+    if name not in templates:
+        raise KeyError(f"Modèle d'étiquette inconnu: {name}")
+    return LabelPlan(name, templates[name])
+
+def reload_templates():
+    get_plan.cache_clear()
+    _qt_plan.cache_clear()
+
+
+# ----------------------------------------------------------------------------
+# Qt backend (QPrinter / QPainter, device pixels)
+# ----------------------------------------------------------------------------
+
+@lru_cache(maxsize=32)
+def _qt_plan(plan, dpi):
+    """Fields of a plan converted once to device pixels, fonts and alignment flags."""
+    from PyQt6.QtCore import Qt, QRectF
+    from PyQt6.QtGui import QFont
+
+    px = dpi / 25.4
+    halign = {'left': Qt.AlignmentFlag.AlignLeft, 'center': Qt.AlignmentFlag.AlignHCenter, 'right': Qt.AlignmentFlag.AlignRight}
+    valign = {'top': Qt.AlignmentFlag.AlignTop, 'center': Qt.AlignmentFlag.AlignVCenter, 'bottom': Qt.AlignmentFlag.AlignBottom}
+    ops = []
+    for field in plan.fields:
+        rect = QRectF(field.x * px, field.y * px, field.w * px, field.h * px)
+        font = QFont(field.font)
+        font.setPointSizeF(field.size)
+        font.setBold(field.bold)
+        # Plain int: alignment and text flags are distinct enums in PyQt6
+        flags = halign.get(field.align, Qt.AlignmentFlag.AlignLeft).value | valign.get(field.valign, Qt.AlignmentFlag.AlignVCenter).value
+        if field.fit:
+            flags |= Qt.TextFlag.TextWordWrap.value
+        ops.append((field, rect, font, flags))
+    return px, tuple(ops)
+
+def _fit_qt_font(painter, field, font, rect, text):
+    """Shrinks font until the wrapped text fits in rect (fit fields only)."""
+    from PyQt6.QtGui import QFontMetricsF, QFont
+    from PyQt6.QtCore import Qt
+
+    fit = field.fit
+    size = field.size
+    fitted = QFont(font)
+    while True:
+        metrics = QFontMetricsF(fitted, painter.device())
+        bounds = metrics.boundingRect(rect, Qt.TextFlag.TextWordWrap.value, text)
+        if bounds.height() <= rect.height() or size <= fit.get('min_size', size):
+            return fitted
+        size -= fit.get('step', 2)
+        fitted = QFont(fitted)
+        fitted.setPointSizeF(size)
+
+def render_qt(painter, plan, page, dpi):
+    """Draws one page (list of (origin, label) from plan.pages) with a QPainter."""
+    from PyQt6.QtCore import QRectF
+    from PyQt6.QtGui import QColor
+    from utils.code128 import draw_code128
+
+    px, ops = _qt_plan(plan, dpi)
+    for (ox, oy), label in page:
+        dx, dy = ox * px, oy * px
+        for field, rect, font, flags in ops:
+            target = rect.translated(dx, dy)
+            value = field.value(label)
+            if not value:
+                continue
+            if field.type == 'barcode':
+                draw_code128(painter, target, value)
+            else:
+                painter.setFont(_fit_qt_font(painter, field, font, target, value) if field.fit else font)
+                painter.drawText(target, flags, value)
+        if plan.border:
+            painter.save()
+            painter.setPen(QColor(204, 204, 204))
+            painter.drawRect(QRectF(dx, dy, plan.label_width * px, plan.label_height * px))
+            painter.restore()
+
+
+# ----------------------------------------------------------------------------
+# reportlab backend (PDF, points, origin bottom-left)
+# ----------------------------------------------------------------------------
+
+_PDF_FONTS = {
+    ('Helvetica', False): 'Helvetica', ('Helvetica', True): 'Helvetica-Bold',
+    ('Arial', False): 'Helvetica', ('Arial', True): 'Helvetica-Bold',
+    ('Times', False): 'Times-Roman', ('Times', True): 'Times-Bold',
+    ('Courier', False): 'Courier', ('Courier', True): 'Courier-Bold',
+}
+
+@lru_cache(maxsize=4096)
+def fit_lines(text, font_name, width, max_lines=3, start_size=72, min_size=40, step=4):
+    """
+    Largest font size (down to min_size) wrapping text in at most max_lines
+    within width points, and the wrapped lines (truncated with '...' if they
+    still do not fit). Memoized: parcels often repeat the same designation.
+    """
+    from reportlab.lib.utils import simpleSplit
+
+    font_size = start_size
+    lines = simpleSplit(text, font_name, font_size, width)
+    while len(lines) > max_lines and font_size > min_size:
+        font_size -= step
+        lines = simpleSplit(text, font_name, font_size, width)
+
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        lines[-1] += "..."
+    return font_size, tuple(lines)
+
+def _pdf_font(field):
+    return _PDF_FONTS.get((field.font, field.bold), 'Helvetica-Bold' if field.bold else 'Helvetica')
+
+def render_pdf(c, plan, page):
+    """Draws one page (list of (origin, label) from plan.pages) on a reportlab canvas."""
+    from reportlab.lib.units import mm
+    from reportlab.graphics.barcode import code128
+
+    page_height = plan.page_height * mm
+    for (ox, oy), label in page:
+        for field in plan.fields:
+            value = field.value(label)
+            if not value:
+                continue
+            left = (ox + field.x) * mm
+            top = page_height - (oy + field.y) * mm
+            width, height = field.w * mm, field.h * mm
+            bottom = top - height
+
+            if field.type == 'barcode':
+                kwargs = {'barHeight': height}
+                if field.bar_width_mm:
+                    kwargs['barWidth'] = field.bar_width_mm * mm
+                bc = code128.Code128(value, **kwargs)
+                if not field.bar_width_mm:
+                    bc = code128.Code128(value, barHeight=height, barWidth=width / max(bc.width / bc.barWidth, 1))
+                x = left if field.align == 'left' else (left + width - bc.width if field.align == 'right' else left + (width - bc.width) / 2)
+                bc.drawOn(c, x, bottom)
+                if field.human_readable:
+                    hr = field.human_readable
+                    c.setFont(_PDF_FONTS.get((hr.get('font', 'Helvetica'), False), 'Helvetica'), hr.get('size', 10))
+                    c.drawCentredString(x + bc.width / 2, bottom - hr.get('gap_mm', 3) * mm, value)
+                continue
+
+            font_name = _pdf_font(field)
+            if field.fit:
+                size, lines = fit_lines(value, font_name, width, field.fit.get('max_lines', 3),
+                                        int(field.size), field.fit.get('min_size', int(field.size)), field.fit.get('step', 4))
+            else:
+                size, lines = field.size, (value,)
+            c.setFont(font_name, size)
+
+            block = size * len(lines)
+            if field.valign == 'top':
+                y = top - size
+            elif field.valign == 'bottom':
+                y = bottom + block - size
+            else:
+                y = bottom + (height + block) / 2 - size
+            for line in lines:
+                if field.align == 'right':
+                    c.drawRightString(left + width, y, line)
+                elif field.align == 'center':
+                    c.drawCentredString(left + width / 2, y, line)
+                else:
+                    c.drawString(left, y, line)
+                y -= size
+
+        if plan.border:
+            c.setStrokeColorRGB(0.8, 0.8, 0.8)
+            c.rect(ox * mm, page_height - (oy + plan.label_height) * mm, plan.label_width * mm, plan.label_height * mm)
+            c.setStrokeColorRGB(0, 0, 0)
+
+def generate_pdf(template_name, labels, filename):
+    """Writes labels to a PDF using a template (multi-up sheets are filled in order)."""
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.units import mm
+
+    plan = get_plan(template_name)
+    c = canvas.Canvas(filename, pagesize=(plan.page_width * mm, plan.page_height * mm))
+    for index, page in enumerate(plan.pages(labels)):
+        if index:
+            c.showPage()
+        render_pdf(c, plan, page)
+    c.save()
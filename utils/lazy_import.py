@@ -0,0 +1,80 @@
+"""
+Deferred imports for the heavy dependencies (pandas, numpy, pyodbc,
+reportlab, pyttsx3).
+
+    pd = lazy_import('pandas')
+
+binds a proxy at module import time; the real module is imported the first
+time an attribute is read (pd.DataFrame). warm_up() imports them in a
+background thread once the main window is shown, so the first use does not
+pay the import either.
+"""
+from utils import startup_profiler
+import importlib
+import sys
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Imported in the background after startup, most used first
+WARM_UP_MODULES = ['pyodbc', 'numpy', 'pandas', 'reportlab.pdfgen.canvas', 'reportlab.graphics.barcode.code128']
+
+
+class LazyModule:
+    """Module proxy importing its target on first attribute access."""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            name = self.__dict__['_name']
+            # import_module waits for a module being imported by warm_up instead
+            # of returning it half initialized
+            first_load = name not in sys.modules
+            started = time.perf_counter()
+            module = importlib.import_module(name)
+            if first_load:
+                startup_profiler.record('import', f"{name} (différé)", time.perf_counter() - started)
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__['_module'] is not None else "not loaded"
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_import(name):
+    """Proxy for module name, imported on first attribute access."""
+    return LazyModule(name)
+
+def is_loaded(name):
+    return name in sys.modules
+
+def warm_up(modules=None):
+    """Imports modules one by one in a daemon thread. Missing optional modules are skipped."""
+    modules = list(modules or WARM_UP_MODULES)
+
+    def run():
+        for name in modules:
+            if name in sys.modules:
+                continue
+            try:
+                with startup_profiler.measure(f"{name} (préchargement)", category='import'):
+                    importlib.import_module(name)
+            except Exception as e:
+                logger.debug(f"Warm-up import of {name} skipped: {e}")
+
+    thread = threading.Thread(target=run, name="import-warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,65 @@
+"""
+Location barcode codec: label <-> 000XXYY.
+
+XX is the row (A-Z = 01-26, DD = 27, II = 28, JJ = 29, KK = 30) and YY the
+floor (01-99). The whole label space is small (30 rows x 99 floors), so both
+directions are precomputed once into dicts; encode/decode are a single
+lookup and the batch versions map the lookup over the input without any
+per-item Python branching. Anything outside the table (unknown row, floor
+00, lowercase, extra characters) decodes/encodes to None.
+"""
+
+PREFIX = "000"
+BARCODE_LENGTH = 7
+
+# Row letters and their XX code
+ROW_CODES = {chr(64 + i): i for i in range(1, 27)}
+ROW_CODES.update({'DD': 27, 'II': 28, 'JJ': 29, 'KK': 30})
+
+MIN_FLOOR = 1
+MAX_FLOOR = 99
+
+_BARCODE_BY_LABEL = {
+    f"{row}{floor}": f"{PREFIX}{code:02d}{floor:02d}"
+    for row, code in ROW_CODES.items()
+    for floor in range(MIN_FLOOR, MAX_FLOOR + 1)
+}
+_LABEL_BY_BARCODE = {barcode: label for label, barcode in _BARCODE_BY_LABEL.items()}
+
+
+def is_barcode_format(barcode) -> bool:
+    """000 followed by 4 digits, whether or not it maps to a known row/floor."""
+    return (
+        isinstance(barcode, str)
+        and len(barcode) == BARCODE_LENGTH
+        and barcode.startswith(PREFIX)
+        and barcode.isdigit()
+    )
+
+def encode(label):
+    """'A1' -> '0000101'. None if the label is not a valid location label."""
+    return _BARCODE_BY_LABEL.get(label)
+
+def decode(barcode):
+    """'0000101' -> 'A1'. None if the barcode is not a valid location barcode."""
+    return _LABEL_BY_BARCODE.get(barcode)
+
+def is_valid_label(label) -> bool:
+    return label in _BARCODE_BY_LABEL
+
+def is_valid_barcode(barcode) -> bool:
+    return barcode in _LABEL_BY_BARCODE
+
+def encode_many(labels):
+    """Encodes a sequence of labels (None for the invalid ones), in input order."""
+    return list(map(_BARCODE_BY_LABEL.get, labels))
+
+def decode_many(barcodes):
+    """Decodes a sequence of barcodes (None for the invalid ones), in input order."""
+    return list(map(_LABEL_BY_BARCODE.get, barcodes))
+
+def all_labels(rows=None, floors=None):
+    """Labels of the given rows x floors (default: whole label space), row by row."""
+    rows = ROW_CODES if rows is None else rows
+    floors = range(MIN_FLOOR, MAX_FLOOR + 1) if floors is None else floors
+    return [f"{row}{floor}" for row in rows for floor in floors if f"{row}{floor}" in _BARCODE_BY_LABEL]
@@ -0,0 +1,202 @@
+"""
+Pick route: walking order of a supply list through the shelves.
+
+The shelf topology groups the location rows into aisles, walked in the
+configured order from a front cross-aisle where the preparer starts. Floors
+go from the front (1) to the back of their aisle, so changing aisles means
+walking back to the front. For a list, the distances between its locations
+(and the start) are computed once into a table. Up to EXACT_ROUTE_MAX
+locations the shortest route is computed exactly (Held-Karp); above, 2-opt
+improves both the nearest neighbour tour and the aisle/floor order and the
+shorter one is kept, so the route is never longer than the plain shelf
+order. Items are grouped by location along the route. Locations outside
+the topology come last, by label.
+"""
+from utils import location_codec
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cost of crossing an aisle to the facing row, in floor steps
+ROW_CROSS_STEPS = 1
+# 2-opt passes over the route (each pass is O(n^2))
+MAX_2OPT_PASSES = 10
+# Exact search up to this many distinct locations (O(2^n * n^2))
+EXACT_ROUTE_MAX = 10
+
+
+def parse_aisles(spec):
+    """'A,B;C,D' -> [['A', 'B'], ['C', 'D']] (unknown rows are ignored)."""
+    aisles = []
+    for group in (spec or "").split(';'):
+        rows = []
+        for row in group.split(','):
+            row = row.strip().upper()
+            if not row:
+                continue
+            if row in location_codec.ROW_CODES:
+                rows.append(row)
+            else:
+                logger.warning(f"Pick route: unknown row '{row}' ignored.")
+        if rows:
+            aisles.append(rows)
+    return aisles
+
+
+class ShelfTopology:
+    def __init__(self, aisles=None, aisle_spacing=2.0, floor_spacing=0.5):
+        """
+        aisles: lists of rows sharing an aisle, in walking order. Rows not
+        listed get an aisle of their own after them, in barcode order.
+        """
+        aisles = [list(rows) for rows in (aisles or [])]
+        listed = {row for rows in aisles for row in rows}
+        aisles += [[row] for row in location_codec.ROW_CODES if row not in listed]
+        self.aisles = aisles
+        self.aisle_spacing = aisle_spacing
+        self.floor_spacing = floor_spacing
+        # Row code (XX of the barcode) -> aisle index
+        self._aisle_by_code = {
+            location_codec.ROW_CODES[row]: i for i, rows in enumerate(aisles) for row in rows
+        }
+
+    @staticmethod
+    def from_config():
+        from config import config
+        return ShelfTopology(parse_aisles(config.PICK_ROUTE_AISLES),
+                             config.PICK_ROUTE_AISLE_SPACING, config.PICK_ROUTE_FLOOR_SPACING)
+
+    def position(self, label):
+        """(aisle, row code, floor) of a location label, None if not a shelf location."""
+        barcode = location_codec.encode(label)
+        if barcode is None:
+            return None
+        code, floor = int(barcode[3:5]), int(barcode[5:7])
+        return (self._aisle_by_code[code], code, floor)
+
+    def distance(self, a, b):
+        """Walking distance between two positions (the start is (0, None, 0))."""
+        aisle_a, code_a, floor_a = a
+        aisle_b, code_b, floor_b = b
+        if aisle_a == aisle_b:
+            cross = ROW_CROSS_STEPS if code_a != code_b and None not in (code_a, code_b) else 0
+            return (abs(floor_a - floor_b) + cross) * self.floor_spacing
+        # Back to the front cross-aisle, along it, then into the other aisle
+        return (floor_a + floor_b) * self.floor_spacing + abs(aisle_a - aisle_b) * self.aisle_spacing
+
+
+START = (0, None, 0)
+
+_default_topology = None
+
+def default_topology():
+    global _default_topology
+    if _default_topology is None:
+        _default_topology = ShelfTopology.from_config()
+    return _default_topology
+
+def reset_default_topology():
+    """Rebuilds the default topology from config on next use (after the settings changed)."""
+    global _default_topology
+    _default_topology = None
+
+
+class DistanceTable:
+    """Distances between the start (index 0) and the given locations (index 1..n)."""
+
+    def __init__(self, topology, labels):
+        self.labels = list(labels)
+        positions = [START] + [topology.position(label) for label in self.labels]
+        self.matrix = [[topology.distance(a, b) for b in positions] for a in positions]
+
+    def route_length(self, route):
+        return sum(self.matrix[a][b] for a, b in zip(route, route[1:]))
+
+
+def _exact_route(matrix):
+    """Shortest open path from the start visiting every location (Held-Karp)."""
+    n = len(matrix) - 1
+    # best[(mask, j)]: (length, previous) of the shortest path from the start over mask ending at j
+    best = {(1 << j, j): (matrix[0][j + 1], None) for j in range(n)}
+    for mask in range(1, 1 << n):
+        for j in range(n):
+            if (mask, j) not in best:
+                continue
+            length = best[(mask, j)][0]
+            for k in range(n):
+                if mask & (1 << k):
+                    continue
+                key = (mask | (1 << k), k)
+                candidate = length + matrix[j + 1][k + 1]
+                if key not in best or candidate < best[key][0] - 1e-9:
+                    best[key] = (candidate, j)
+
+    full = (1 << n) - 1
+    last = min(range(n), key=lambda j: (best[(full, j)][0], j))
+    route, mask = [], full
+    while last is not None:
+        route.append(last + 1)
+        last, mask = best[(mask, last)][1], mask & ~(1 << last)
+    return [0] + route[::-1]
+
+def _nearest_neighbour(matrix):
+    route = [0]
+    remaining = set(range(1, len(matrix)))
+    while remaining:
+        last = matrix[route[-1]]
+        # Ties go to the lowest index (locations are sorted beforehand)
+        nearest = min(remaining, key=lambda j: (last[j], j))
+        route.append(nearest)
+        remaining.remove(nearest)
+    return route
+
+def _two_opt(route, matrix):
+    """Reverses route segments while it shortens the walk (open path, start fixed)."""
+    n = len(route)
+    for _ in range(MAX_2OPT_PASSES):
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                a, b = route[i - 1], route[i]
+                c = route[j]
+                d = route[j + 1] if j + 1 < n else None
+                before = matrix[a][b] + (matrix[c][d] if d is not None else 0)
+                after = matrix[a][c] + (matrix[b][d] if d is not None else 0)
+                if after < before - 1e-9:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    improved = True
+        if not improved:
+            break
+    return route
+
+def optimize_route(labels, topology=None):
+    """Distinct labels in walking order (labels outside the topology last, by label)."""
+    topology = topology or default_topology()
+    distinct = list(dict.fromkeys(label for label in labels if label))
+    known = sorted((label for label in distinct if topology.position(label) is not None),
+                   key=topology.position)
+    unknown = sorted(label for label in distinct if topology.position(label) is None)
+    if not known:
+        return unknown
+
+    table = DistanceTable(topology, known)
+    if len(known) <= EXACT_ROUTE_MAX:
+        route = _exact_route(table.matrix)
+    else:
+        # known is in aisle/floor order: list(range(...)) is the plain shelf order
+        candidates = [
+            _two_opt(_nearest_neighbour(table.matrix), table.matrix),
+            _two_opt(list(range(len(known) + 1)), table.matrix),
+        ]
+        route = min(candidates, key=table.route_length)
+    return [table.labels[i - 1] for i in route[1:]] + unknown
+
+def sort_items(items, location=lambda item: item.location_1, topology=None):
+    """
+    Items grouped by location in walking order; items of the same location
+    (or without one, at the end) keep their order.
+    """
+    items = list(items)
+    order = {label: i for i, label in enumerate(optimize_route([location(item) for item in items], topology))}
+    last = len(order)
+    return sorted(items, key=lambda item: order.get(location(item), last))
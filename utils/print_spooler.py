@@ -0,0 +1,216 @@
+"""
+Print spooler: label jobs are queued and printed by a background thread so
+operators can keep scanning. The queue is saved to disk, small jobs sent
+to the same printer are merged into one document, and failed jobs are
+retried before being reported as errors.
+"""
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
+from datetime import datetime
+import json
+import os
+import tempfile
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUEUE_FILE = 'print_queue.json'
+
+KIND_PARCEL = 'parcel'      # A4 parcel sheets (reportlab PDF)
+KIND_PRODUCT = 'product'    # 40x20mm product labels (QPrinter)
+KIND_LOCATION = 'location'  # 40x20mm shelf labels (QPrinter)
+
+STATUS_PENDING = 'pending'
+STATUS_PRINTING = 'printing'
+STATUS_DONE = 'done'
+STATUS_ERROR = 'error'
+
+# Jobs submitted within this delay are merged with the ones already waiting
+COALESCE_DELAY_MS = 1500
+MAX_ATTEMPTS = 3
+RETRY_DELAY_SEC = 30  # multiplied by the attempt number
+# Finished jobs kept for the status display
+KEEP_FINISHED = 50
+
+
+def print_batch(kind, printer_name, items):
+    """Renders and sends one document. Runs in the spooler thread, raises on failure."""
+    if kind == KIND_PARCEL:
+        from utils.printer_utils import generate_parcel_pdf, send_pdf_to_printer
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        generate_parcel_pdf(items, path)
+        send_pdf_to_printer(path, printer_name)
+        return len(items)
+
+    from utils.label_renderer import label_printer, print_labels
+    from utils.label_templates import TEMPLATE_LOCATION, TEMPLATE_PRODUCT
+    template = TEMPLATE_LOCATION if kind == KIND_LOCATION else TEMPLATE_PRODUCT
+    return print_labels(label_printer(printer_name, template), template, items)
+
+
+class SpoolThread(QThread):
+    completed = pyqtSignal(object, bool, str) # job ids, success, message
+
+    def __init__(self, job_ids, kind, printer_name, items):
+        super().__init__()
+        self.job_ids = job_ids
+        self.kind = kind
+        self.printer_name = printer_name
+        self.items = items
+
+    def run(self):
+        try:
+            count = print_batch(self.kind, self.printer_name, self.items)
+            self.completed.emit(self.job_ids, True, f"{count} étiquette(s) imprimée(s)")
+        except Exception as e:
+            logger.error(f"Print job failed ({self.kind} on {self.printer_name or 'default'}): {e}")
+            self.completed.emit(self.job_ids, False, str(e))
+
+
+class PrintSpooler(QObject):
+    """Persistent print queue, one document at a time."""
+    _instance = None
+    queue_changed = pyqtSignal()
+    job_finished = pyqtSignal(str, bool, str) # job id, success, message
+
+    @staticmethod
+    def instance():
+        if PrintSpooler._instance is None:
+            PrintSpooler._instance = PrintSpooler()
+        return PrintSpooler._instance
+
+    def __init__(self):
+        super().__init__()
+        self.jobs = []
+        self._thread = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.process)
+        self._load()
+        if self.pending_count():
+            # Jobs left over by the previous session
+            self._timer.start(COALESCE_DELAY_MS)
+
+    # -- persistence ---------------------------------------------------------
+
+    def _load(self):
+        if not os.path.exists(QUEUE_FILE):
+            return
+        try:
+            with open(QUEUE_FILE, 'r', encoding='utf-8') as f:
+                self.jobs = json.load(f)
+        except Exception as e:
+            logger.error(f"Print queue could not be read, starting empty: {e}")
+            self.jobs = []
+        for job in self.jobs:
+            # Interrupted while printing: print again
+            if job['status'] == STATUS_PRINTING:
+                job['status'] = STATUS_PENDING
+
+    def _save(self):
+        finished = [j for j in self.jobs if j['status'] in (STATUS_DONE, STATUS_ERROR)]
+        if len(finished) > KEEP_FINISHED:
+            drop = {j['id'] for j in finished[:len(finished) - KEEP_FINISHED]}
+            self.jobs = [j for j in self.jobs if j['id'] not in drop]
+        try:
+            tmp_file = QUEUE_FILE + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.jobs, f, ensure_ascii=False, default=str)
+            os.replace(tmp_file, QUEUE_FILE)
+        except Exception as e:
+            logger.error(f"Print queue could not be saved: {e}")
+        self.queue_changed.emit()
+
+    # -- public API ----------------------------------------------------------
+
+    def submit(self, kind, items, printer_name="", title=""):
+        """Queues items (JSON serializable dicts) for printing. Returns the job id."""
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'printer': printer_name or "",
+            'title': title,
+            'items': list(items),
+            'status': STATUS_PENDING,
+            'attempts': 0,
+            'retry_at': None,
+            'message': "",
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self.jobs.append(job)
+        self._save()
+        # Restarting the timer lets jobs submitted in a burst be merged
+        if not self.is_printing():
+            self._timer.start(COALESCE_DELAY_MS)
+        return job['id']
+
+    def is_printing(self):
+        return self._thread is not None and self._thread.isRunning()
+
+    def pending_count(self):
+        return sum(1 for j in self.jobs if j['status'] in (STATUS_PENDING, STATUS_PRINTING))
+
+    def retry(self, job_id):
+        for job in self.jobs:
+            if job['id'] == job_id and job['status'] == STATUS_ERROR:
+                job.update(status=STATUS_PENDING, attempts=0, retry_at=None, message="")
+        self._save()
+        if not self.is_printing():
+            self._timer.start(0)
+
+    def clear_finished(self):
+        self.jobs = [j for j in self.jobs if j['status'] not in (STATUS_DONE, STATUS_ERROR)]
+        self._save()
+
+    # -- processing ----------------------------------------------------------
+
+    def process(self):
+        if self.is_printing():
+            return
+
+        now = datetime.now().isoformat(timespec='seconds')
+        ready = [j for j in self.jobs if j['status'] == STATUS_PENDING and (not j['retry_at'] or j['retry_at'] <= now)]
+        if not ready:
+            self._schedule_retry()
+            return
+
+        # Oldest job first, merged with every ready job of the same kind and printer
+        first = ready[0]
+        batch = [j for j in ready if j['kind'] == first['kind'] and j['printer'] == first['printer']]
+        items = [item for job in batch for item in job['items']]
+        for job in batch:
+            job['status'] = STATUS_PRINTING
+            job['attempts'] += 1
+        self._save()
+
+        self._thread = SpoolThread([j['id'] for j in batch], first['kind'], first['printer'], items)
+        self._thread.completed.connect(self._on_completed)
+        self._thread.start()
+
+    def _on_completed(self, job_ids, success, message):
+        ids = set(job_ids)
+        finished = []
+        for job in self.jobs:
+            if job['id'] not in ids:
+                continue
+            if success:
+                job.update(status=STATUS_DONE, message=message, items=[])
+            elif job['attempts'] < MAX_ATTEMPTS:
+                retry_at = datetime.now().timestamp() + RETRY_DELAY_SEC * job['attempts']
+                job.update(status=STATUS_PENDING, message=message,
+                           retry_at=datetime.fromtimestamp(retry_at).isoformat(timespec='seconds'))
+                continue
+            else:
+                job.update(status=STATUS_ERROR, message=message)
+            finished.append(job['id'])
+        self._save()
+        for job_id in finished:
+            self.job_finished.emit(job_id, success, message)
+        self._timer.start(0)
+
+    def _schedule_retry(self):
+        retries = [j['retry_at'] for j in self.jobs if j['status'] == STATUS_PENDING and j['retry_at']]
+        if retries:
+            delay = (datetime.fromisoformat(min(retries)) - datetime.now()).total_seconds()
+            self._timer.start(max(int(delay * 1000), 1000))
@@ -0,0 +1,177 @@
+from PyQt6.QtCore import QObject, QThread, QCoreApplication
+import heapq
+import itertools
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Priorities (lower value = spoken first)
+PRIORITY_HIGH = 0    # Errors / urgent requests
+PRIORITY_NORMAL = 1  # Location labels, "Suivant"
+PRIORITY_LOW = 2     # Informative messages
+
+# Beyond this many waiting utterances, low-value ones are dropped so
+# feedback never lags behind rapid scans.
+MAX_PENDING = 5
+
+try:
+    import winsound  # Windows only: plays WAV buffers straight from memory
+except ImportError:
+    winsound = None
+
+
+class SpeechWorker(QThread):
+    """
+    Owns a single pyttsx3 engine for the whole application lifetime.
+    Utterances are taken from a prioritized, de-duplicated queue.
+    Idle time is used to pre-render frequent phrases to WAV buffers which
+    are then played back instantly instead of being synthesized again.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._cond = threading.Condition()
+        self._queue = []       # heap of (priority, seq, text)
+        self._pending = {}     # text -> priority currently queued
+        self._to_render = []   # phrases waiting for pre-synthesis
+        self._audio_cache = {} # text -> WAV bytes
+        self._seq = itertools.count()
+        self._running = True
+        self._engine = None
+
+    def enqueue(self, text, priority=PRIORITY_NORMAL):
+        with self._cond:
+            queued_priority = self._pending.get(text)
+            if queued_priority is not None and queued_priority <= priority:
+                return  # Already waiting to be spoken
+
+            if queued_priority is None and len(self._pending) >= MAX_PENDING:
+                if not self._drop_lowest(priority):
+                    return
+
+            self._pending[text] = priority
+            heapq.heappush(self._queue, (priority, next(self._seq), text))
+            self._cond.notify()
+
+    def _drop_lowest(self, priority):
+        """Drop the least urgent pending utterance to make room. Caller holds the lock."""
+        worst = max(self._pending.items(), key=lambda kv: kv[1])
+        if worst[1] < priority:
+            return False
+        del self._pending[worst[0]]
+        return True
+
+    def preload(self, phrases):
+        if winsound is None:
+            return  # No in-memory playback available, nothing to gain
+        with self._cond:
+            for phrase in phrases:
+                if phrase and phrase not in self._audio_cache and phrase not in self._to_render:
+                    self._to_render.append(phrase)
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def _next_task(self):
+        with self._cond:
+            while self._running and not self._queue and not self._to_render:
+                self._cond.wait()
+            if not self._running:
+                return None, None
+
+            while self._queue:
+                priority, _, text = heapq.heappop(self._queue)
+                # Skip entries superseded by a higher priority push or dropped
+                if self._pending.get(text) == priority:
+                    del self._pending[text]
+                    return 'speak', text
+
+            return 'render', self._to_render.pop(0)
+
+    def run(self):
+        try:
+            import pyttsx3
+            self._engine = pyttsx3.init()
+        except Exception as e:
+            logger.error(f"TTS engine init failed: {e}")
+            return
+
+        while True:
+            action, text = self._next_task()
+            if action is None:
+                break
+            try:
+                if action == 'speak':
+                    self._speak(text)
+                else:
+                    self._render(text)
+            except Exception as e:
+                # TTS errors are not critical
+                logger.debug(f"TTS error: {e}")
+
+        try:
+            self._engine.stop()
+        except Exception:
+            pass
+        self._engine = None
+
+    def _speak(self, text):
+        audio = self._audio_cache.get(text)
+        if audio is not None:
+            winsound.PlaySound(audio, winsound.SND_MEMORY)
+            return
+        self._engine.say(text)
+        self._engine.runAndWait()
+
+    def _render(self, text):
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            self._engine.save_to_file(text, path)
+            self._engine.runAndWait()
+            with open(path, 'rb') as f:
+                data = f.read()
+            if data:
+                self._audio_cache[text] = data
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class SpeechService(QObject):
+    _instance = None
+
+    @staticmethod
+    def instance():
+        if SpeechService._instance is None:
+            SpeechService._instance = SpeechService()
+        return SpeechService._instance
+
+    def __init__(self):
+        super().__init__()
+        self._worker = SpeechWorker()
+        self._worker.start()
+
+        app = QCoreApplication.instance()
+        if app:
+            app.aboutToQuit.connect(self.shutdown)
+
+    def speak(self, text, priority=PRIORITY_NORMAL):
+        if text:
+            self._worker.enqueue(str(text), priority)
+
+    def preload(self, phrases):
+        """Pre-synthesize phrases in the background so they play without delay."""
+        self._worker.preload([str(p) for p in phrases if p])
+
+    def shutdown(self):
+        self._worker.stop()
+        self._worker.wait(2000)
@@ -0,0 +1,67 @@
+"""
+Startup profiler: records how long each startup phase, module import and
+tab construction takes, and appends a report to startup_profile.log once
+the main window is usable.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+import importlib
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+LOG_FILE = 'startup_profile.log'
+
+_t0 = time.perf_counter()
+_entries = []   # (category, name, duration in seconds, offset from start)
+
+
+def start():
+    """Resets the clock (call first thing in main)."""
+    global _t0
+    _t0 = time.perf_counter()
+    _entries.clear()
+
+def elapsed():
+    return time.perf_counter() - _t0
+
+def record(category, name, duration):
+    _entries.append((category, name, duration, elapsed()))
+
+@contextmanager
+def measure(name, category='phase'):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(category, name, time.perf_counter() - started)
+
+def timed_import(module_name):
+    """Imports a module and records the time it took (0 if it was already loaded)."""
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    record('import', module_name, time.perf_counter() - started)
+    return module
+
+def mark(name):
+    """Point in time (no duration), e.g. 'first scan possible'."""
+    record('mark', name, 0.0)
+
+def report(title="Démarrage"):
+    """Logs the entries and appends them to LOG_FILE. Later calls add only new entries."""
+    lines = [f"=== {title} {datetime.now():%Y-%m-%d %H:%M:%S} (t={elapsed():.3f}s) ==="]
+    for category, name, duration, offset in _entries:
+        if category == 'mark':
+            lines.append(f"  [{offset:7.3f}s] {name}")
+        else:
+            lines.append(f"  [{offset:7.3f}s] {category:<7} {name:<40} {duration * 1000:8.1f} ms")
+    _entries.clear()
+
+    text = "\n".join(lines)
+    logger.info(text)
+    try:
+        with open(LOG_FILE, 'a', encoding='utf-8') as f:
+            f.write(text + "\n")
+    except Exception as e:
+        logger.error(f"Startup profile could not be written: {e}")